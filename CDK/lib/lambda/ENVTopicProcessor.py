@@ -1,41 +1,47 @@
 import json
-import boto3
-from datetime import datetime
 from decimal import Decimal
+from compact_codec import decode_event, snapshots
+from dynamo_batch import write_items, device_timestamp, claim_message, release_message
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('EnvDataTable')  # Use the new table for environmental data
+TABLE_NAME = 'EnvDataTable'  # Use the new table for environmental data
 
 def lambda_handler(event, context):
+    event = decode_event(event)  # Compact messages from the '<topic>/bin' rule arrive base64-encoded
+
     # Log the entire incoming event to understand its structure
     print(f"Received event: {json.dumps(event)}")
     
     # Safely access 'payload' and 'topic' from the event (since IoT Core sends data inside 'payload')
-    payload = event.get('payload', [])  # Extract ENV data list from 'payload'
+    ticks = snapshots(event)  # One payload, or several publish ticks coalesced into one message
     topic = event.get('topic', 'unknown_topic')  # Extract 'topic'
-    timestamp = datetime.utcnow().isoformat()
+    message_id = event.get('messageId')
     # Check if payload contains ENV data
-    if payload:
+    if any(tick['payload'] for tick in ticks):
+        # Skip IoT Core retries / duplicate deliveries of a message we already stored
+        if not claim_message(message_id, topic):
+            return {'written': 0, 'duplicates': 1}
+
         try:
-            for env_data in payload:
-                # Extract the individual sensor data
-                sensor_id = env_data.get('sensor_id')
-                lat = env_data.get('lat')
-                lon = env_data.get('lon')
-                temperature = env_data.get('temperature')
-                humidity = env_data.get('humidity')
-                wind_direction = env_data.get('wind_direction')
-
-                # Convert float values to Decimal for DynamoDB
-                lat = Decimal(str(lat))
-                lon = Decimal(str(lon))
-                temperature = Decimal(str(temperature))
-                humidity = Decimal(str(humidity))
+            items = []
+            for tick in ticks:
+                timestamp = device_timestamp(tick)  # Key rows on the device-side timestamp so re-deliveries overwrite instead of adding rows
+                for env_data in tick['payload']:
+                    # Extract the individual sensor data
+                    sensor_id = env_data.get('sensor_id')
+                    lat = env_data.get('lat')
+                    lon = env_data.get('lon')
+                    temperature = env_data.get('temperature')
+                    humidity = env_data.get('humidity')
+                    wind_direction = env_data.get('wind_direction')
+
+                    # Convert float values to Decimal for DynamoDB
+                    lat = Decimal(str(lat))
+                    lon = Decimal(str(lon))
+                    temperature = Decimal(str(temperature))
+                    humidity = Decimal(str(humidity))
                 
-                # Store each sensor's data in DynamoDB
-                table.put_item(
-                    Item={
+                    # Collect each sensor's data for a single batched write
+                    items.append({
                         'SensorId': str(sensor_id),  # Store sensor_id as string
                         'Topic': topic,
                         'Timestamp': str(timestamp),
@@ -44,12 +50,16 @@ def lambda_handler(event, context):
                         'Temperature': temperature,
                         'Humidity': humidity,
                         'WindDirection': wind_direction
-                    }
-                )
-                print(f"✅ SensorId {sensor_id} data written to DynamoDB (from IoT Topic: {topic})")
+                    })
+
+            stats = write_items(TABLE_NAME, items)
+            print(f"✅ {stats['items']} sensor records written to DynamoDB in {stats['batches']} batches (from IoT Topic: {topic})")
+            return {'written': stats['items'], 'duplicates': 0}
 
 
         except Exception as e:
             print(f"Error storing data in DynamoDB: {str(e)}")
+            release_message(message_id)
+            raise  # Fail the invocation so Lambda's async retry redelivers the message
     else:
         print("No ENV data found in the event.")
@@ -1,47 +1,63 @@
 import json
-import boto3
-from datetime import datetime
 from decimal import Decimal
+from compact_codec import decode_event, snapshots
+import geohash
+from dynamo_batch import write_items, device_timestamp, claim_message, release_message
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('GpsDataTable')
+TABLE_NAME = 'GpsDataTable'
 
 def lambda_handler(event, context):
+    event = decode_event(event)  # Compact messages from the '<topic>/bin' rule arrive base64-encoded
+
     # Log the entire incoming event to understand its structure
     print(f"Received event: {json.dumps(event)}")
     
     # Safely access 'payload' and 'topic' from the event (since IoT Core sends data inside 'payload')
-    payload = event.get('payload', [])  # Extract GPS data list from 'payload'
+    ticks = snapshots(event)  # One payload, or several publish ticks coalesced into one message
     topic = event.get('topic', 'unknown_topic')  # Extract 'topic'
-    timestamp = datetime.utcnow().isoformat()
+    message_id = event.get('messageId')
 
     # Check if payload contains GPS data
-    if payload:
+    if any(tick['payload'] for tick in ticks):
+        # Skip IoT Core retries / duplicate deliveries of a message we already stored
+        if not claim_message(message_id, topic):
+            return {'written': 0, 'duplicates': 1}
+
         try:
-            for gps_data in payload:
-                # Extract the individual elk data (lat, lon, elk_id)
-                elk_id = gps_data.get('elk_id')
-                lat = gps_data.get('lat')
-                lon = gps_data.get('lon')
-
-                # Convert float values to Decimal for DynamoDB
-                lat = Decimal(str(lat))
-                lon = Decimal(str(lon))
+            items = []
+            for tick in ticks:
+                timestamp = device_timestamp(tick)  # Key rows on the device-side timestamp so re-deliveries overwrite instead of adding rows
+                for gps_data in tick['payload']:
+                    # Extract the individual elk data (lat, lon, elk_id)
+                    elk_id = gps_data.get('elk_id')
+                    lat = gps_data.get('lat')
+                    lon = gps_data.get('lon')
+
+                    # Convert float values to Decimal for DynamoDB
+                    lat = Decimal(str(lat))
+                    lon = Decimal(str(lon))
                 
-                # Store each elk's data in DynamoDB
-                table.put_item(
-                    Item={
+                    # Geohash attributes for the GeoIndex GSI (bounding-box queries)
+                    cell = geohash.encode(float(lat), float(lon))
+
+                    # Collect each elk's data for a single batched write
+                    items.append({
                         'SensorId': str(elk_id),  # Store elk_id as SensorId since that's what the dynamodDb requires string
                         'Topic': topic,
                         'Timestamp': str(timestamp),
                         'Latitude': lat,
-                        'Longitude': lon
-                    }
-                )
-                print(f"✅ ElkId {elk_id} GPS data written to DynamoDB (from IoT Topic: {topic})")
+                        'Longitude': lon,
+                        'GeoCell': cell,
+                        'GeoBucket': geohash.geo_bucket(cell, timestamp)
+                    })
+
+            stats = write_items(TABLE_NAME, items)
+            print(f"✅ {stats['items']} elk GPS records written to DynamoDB in {stats['batches']} batches (from IoT Topic: {topic})")
+            return {'written': stats['items'], 'duplicates': 0}
 
         except Exception as e:
             print(f"Error storing data in DynamoDB: {str(e)}")
+            release_message(message_id)
+            raise  # Fail the invocation so Lambda's async retry redelivers the message
     else:
         print("No GPS data found in the event.")
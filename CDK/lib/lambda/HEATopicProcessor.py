@@ -1,13 +1,13 @@
 import json
-import boto3
 import decimal
 from datetime import datetime
 from decimal import Decimal
 import traceback  # Added for better debugging
+from compact_codec import decode_event, snapshots
+from dynamo_batch import write_items, claim_message, release_message
+from vitals_detector import detect
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('HeaDataTable')  # Use the table for elk health data
+TABLE_NAME = 'HeaDataTable'  # Use the table for elk health data
 
 # Safe Decimal conversion function
 def safe_decimal(value, default=0):
@@ -18,16 +18,25 @@ def safe_decimal(value, default=0):
         return Decimal(default)  # Default to 0 if invalid
 
 def lambda_handler(event, context):
+    event = decode_event(event)  # Compact messages from the '<topic>/bin' rule arrive base64-encoded
+
     # Log the entire incoming event to understand its structure
     print(f"Received event: {json.dumps(event)}")
     
     # Safely access 'payload' and 'topic' from the event
-    payload = event.get('payload', [])  # Extract elk health data list
+    # Extract elk health data list; a coalesced message carries several ticks, each record has its own timestamp
+    payload = [record for tick in snapshots(event) for record in tick['payload']]
     topic = event.get('topic', 'unknown_topic')  # Extract 'topic'
+    message_id = event.get('messageId')
     
     # Check if payload contains elk health data
     if payload:
+        # Skip IoT Core retries / duplicate deliveries of a message we already stored
+        if not claim_message(message_id, topic):
+            return {'written': 0, 'duplicates': 1}
+
         try:
+            items = []
             for elk_data in payload:
                 # Extract the individual elk's health data
                 sensor_id = elk_data.get('sensor_id')
@@ -51,25 +60,35 @@ def lambda_handler(event, context):
                 hydration_level = safe_decimal(elk_data.get('hydration_level'))
                 stress_level = safe_decimal(elk_data.get('stress_level'))
 
-                # Store each elk's health data in DynamoDB
-                table.put_item(
-                    Item={
-                        'SensorId': str(sensor_id),  # Ensure this matches your table PK
-                        'ElkId': str(elk_id),  # Ensure IDs are stored as strings
-                        'Topic': topic,
-                        'Timestamp': timestamp,  # Ensure timestamp is stored as a string
-                        'BodyTemperature': body_temperature,
-                        'HeartRate': heart_rate,
-                        'RespirationRate': respiration_rate,
-                        'ActivityLevel': activity_level,
-                        'Posture': elk_data.get('posture', 'Unknown'),  # Default to 'Unknown' if missing
-                        'HydrationLevel': hydration_level,
-                        'StressLevel': stress_level
-                    }
-                )
-                print(f"✅ ElkId {elk_id} health data written to DynamoDB (from IoT Topic: {topic})")
+                # Collect each elk's health data for a single batched write
+                items.append({
+                    'SensorId': str(sensor_id),  # Ensure this matches your table PK
+                    'ElkId': str(elk_id),  # Ensure IDs are stored as strings
+                    'Topic': topic,
+                    'Timestamp': timestamp,  # Ensure timestamp is stored as a string
+                    'BodyTemperature': body_temperature,
+                    'HeartRate': heart_rate,
+                    'RespirationRate': respiration_rate,
+                    'ActivityLevel': activity_level,
+                    'Posture': elk_data.get('posture', 'Unknown'),  # Default to 'Unknown' if missing
+                    'HydrationLevel': hydration_level,
+                    'StressLevel': stress_level
+                })
+
+            stats = write_items(TABLE_NAME, items)
+            print(f"✅ {stats['items']} elk health records written to DynamoDB in {stats['batches']} batches (from IoT Topic: {topic})")
+
+            # Readings are stored; a detector failure must not make IoT Core redeliver them
+            try:
+                alerts = detect(items)
+            except Exception:
+                print(f"Vital-sign anomaly detection failed: {traceback.format_exc()}")
+                alerts = []
+            return {'written': stats['items'], 'duplicates': 0, 'alerts': len(alerts)}
 
         except Exception as e:
             print(f"Error storing data in DynamoDB: {traceback.format_exc()}")  # Full error traceback
+            release_message(message_id)
+            raise  # Fail the invocation so Lambda's async retry redelivers the message
     else:
         print("No elk health data found in the event.")
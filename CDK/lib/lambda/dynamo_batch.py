@@ -0,0 +1,163 @@
+"""
+dynamo_batch.py
+
+Shared DynamoDB write path for the *TopicProcessor Lambdas:
+- Collects a whole IoT payload into BatchWriteItem requests of up to 25 items
+- Retries UnprocessedItems with exponential backoff and jitter, and raises if any remain
+- Reports per-batch write latency and item counts
+- De-duplicates re-delivered IoT messages on their messageId with a conditional put
+"""
+
+import os
+import random
+import time
+from datetime import datetime, timezone
+import boto3
+from botocore.exceptions import ClientError
+
+BATCH_SIZE = 25  # Hard limit for a single BatchWriteItem request
+MAX_RETRIES = 8  # Attempts per batch before giving up on UnprocessedItems
+BASE_BACKOFF = 0.05  # Seconds, doubled on every retry
+MAX_BACKOFF = 2.0  # Seconds, cap for a single backoff sleep
+KEY_ATTRIBUTES = ('SensorId', 'Timestamp')  # Partition/sort key shared by the sensor tables
+DEDUP_TABLE_NAME = os.environ.get('DEDUP_TABLE_NAME', 'IngestDedupTable')  # One marker row per processed messageId
+DEDUP_TTL_SECONDS = 7 * 24 * 3600  # Markers expire (DynamoDB TTL) once IoT Core can no longer retry
+
+duplicates_dropped = 0  # Re-delivered messages skipped by this Lambda container
+
+# Initialize DynamoDB resource (the resource layer serializes Decimal/str for us)
+dynamodb = boto3.resource('dynamodb')
+
+
+class UnprocessedItemsError(Exception):
+    """Raised by write_items when some items were still unprocessed after every retry."""
+
+    def __init__(self, table_name, stats):
+        super().__init__(f"{stats['unprocessed']} of {stats['items']} items not written to {table_name}")
+        self.stats = stats
+
+
+def chunk_items(items, size=BATCH_SIZE):
+    """Yield successive slices of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def dedupe_items(items, key_attributes=KEY_ATTRIBUTES):
+    """
+    Drop repeated primary keys, keeping the last item for each key.
+
+    BatchWriteItem rejects a request that contains the same key twice, whereas
+    a put_item loop would simply overwrite, so the last write wins here too.
+    """
+    unique = {}
+    for item in items:
+        unique[tuple(item.get(k) for k in key_attributes)] = item
+    return list(unique.values())
+
+
+def backoff_delay(attempt):
+    """Sleep time for a retry attempt: capped exponential backoff with full jitter."""
+    return random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt)))
+
+
+def write_items(table_name, items, resource=None, key_attributes=KEY_ATTRIBUTES):
+    """
+    Write `items` to `table_name` with BatchWriteItem in chunks of 25.
+
+    Parameters:
+        table_name (str): DynamoDB table to write to.
+        items (list): Items already converted to DynamoDB types (str/Decimal).
+        resource: Optional boto3 DynamoDB service resource (defaults to the module one).
+        key_attributes (tuple): Primary key attribute names used for de-duplication.
+
+    Returns:
+        dict: {'items', 'batches', 'retries', 'unprocessed', 'latency_ms'} where
+              'latency_ms' holds the wall time of every batch including retries.
+
+    Raises:
+        UnprocessedItemsError: Some items were still unprocessed after MAX_RETRIES; every
+            batch is still attempted first, and the error carries the stats.
+    """
+    resource = resource or dynamodb
+    items = dedupe_items(items, key_attributes)
+    stats = {'items': len(items), 'batches': 0, 'retries': 0, 'unprocessed': 0, 'latency_ms': []}
+
+    for batch_number, batch in enumerate(chunk_items(items), start=1):
+        request = {table_name: [{'PutRequest': {'Item': item}} for item in batch]}
+        started = time.perf_counter()
+        attempt = 0
+        dropped = 0
+
+        while request:
+            response = resource.batch_write_item(RequestItems=request)
+            request = response.get('UnprocessedItems') or {}
+            if not request:
+                break
+            if attempt >= MAX_RETRIES:
+                dropped = len(request.get(table_name, []))
+                stats['unprocessed'] += dropped
+                print(f"⚠️ {table_name} batch {batch_number}: giving up on {dropped} unprocessed items")
+                break
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+            stats['retries'] += 1
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        stats['batches'] += 1
+        stats['latency_ms'].append(round(latency_ms, 2))
+        print(f"✅ {table_name} batch {batch_number}: {len(batch) - dropped} items in {latency_ms:.1f} ms ({attempt} retries)")
+
+    if stats['unprocessed']:
+        raise UnprocessedItemsError(table_name, stats)
+    return stats
+
+
+def device_timestamp(event):
+    """
+    Row timestamp taken from the device's epoch `timestamp` in the IoT message.
+
+    Uses the same naive UTC ISO-8601 format the processors always wrote, and falls
+    back to the server clock when the device did not send a usable value.
+    """
+    try:
+        moment = datetime.fromtimestamp(float(event.get('timestamp')), tz=timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        moment = datetime.now(timezone.utc)
+    return moment.replace(tzinfo=None).isoformat()
+
+
+def claim_message(message_id, topic, resource=None):
+    """
+    Record `message_id` as processed; return False if it was already claimed.
+
+    The marker is written with attribute_not_exists so only the first delivery of
+    a message wins. Messages without an id are always processed.
+    """
+    global duplicates_dropped
+    if not message_id:
+        return True
+
+    table = (resource or dynamodb).Table(DEDUP_TABLE_NAME)
+    try:
+        table.put_item(
+            Item={
+                'MessageId': str(message_id),
+                'Topic': topic,
+                'ExpiresAt': int(time.time()) + DEDUP_TTL_SECONDS
+            },
+            ConditionExpression='attribute_not_exists(MessageId)'
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        duplicates_dropped += 1
+        print(f"⚠️ Duplicate messageId {message_id} dropped ({duplicates_dropped} duplicates in this container)")
+        return False
+
+
+def release_message(message_id, resource=None):
+    """Remove the marker for `message_id` so a retry of a failed write is not treated as a duplicate."""
+    if message_id:
+        (resource or dynamodb).Table(DEDUP_TABLE_NAME).delete_item(Key={'MessageId': str(message_id)})
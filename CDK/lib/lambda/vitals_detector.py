@@ -0,0 +1,176 @@
+"""
+vitals_detector.py
+
+Streaming vital-sign anomaly detection for HEATopicProcessor:
+- Keeps an exponentially weighted mean and variance per elk and vital (O(1) state per elk)
+- Scores every reading as a z-score against that elk's own baseline before updating it
+- Flags vitals beyond Z_THRESHOLD once the elk has WARMUP_READINGS of history
+- Loads and saves the state of a whole payload with BatchGetItem / BatchWriteItem
+- Writes one compact alert row per flagged reading
+
+Flagged values move the baseline mean with a much smaller weight (FLAGGED_ALPHA),
+so a fever keeps alerting for many readings instead of becoming the new normal at once,
+while a lasting level shift (a refitted collar, the season) is absorbed in the end
+instead of alerting forever. Two invocations updating the same elk at the same moment
+resolve last-writer-wins; with one HEA message per collar interval that is rare
+and costs one reading of history.
+"""
+
+import math
+import os
+import time
+from decimal import Decimal
+import dynamo_batch
+from dynamo_batch import write_items, backoff_delay, MAX_RETRIES
+
+STATE_TABLE_NAME = os.environ.get('VITALS_STATE_TABLE_NAME', 'HeaVitalsStateTable')  # One row per elk
+ALERT_TABLE_NAME = os.environ.get('VITALS_ALERT_TABLE_NAME', 'HeaAlertTable')  # One row per flagged reading
+ALPHA = float(os.environ.get('VITALS_EWMA_ALPHA', 0.05))  # Weight of the newest reading in the baseline
+FLAGGED_ALPHA = float(os.environ.get('VITALS_FLAGGED_ALPHA', 0.005))  # Same, for a value that raised an alert
+Z_THRESHOLD = float(os.environ.get('VITALS_Z_THRESHOLD', 4.0))  # |z| at or above this raises an alert
+WARMUP_READINGS = 20  # Readings an elk needs before it can be flagged
+ALERT_TTL_SECONDS = 30 * 24 * 3600  # Alert rows expire (DynamoDB TTL) after 30 days
+BATCH_GET_SIZE = 100  # Hard limit for a single BatchGetItem request
+
+# Item attribute -> smallest standard deviation used when scoring it (sensor resolution / normal jitter)
+VITALS = {
+    'BodyTemperature': 0.2,
+    'HeartRate': 2.0,
+    'RespirationRate': 2.0,
+    'StressLevel': 0.5,
+}
+
+
+def new_state(elk_id):
+    """Empty baseline for an elk seen for the first time."""
+    state = {'ElkId': elk_id, 'Count': 0}
+    for vital in VITALS:
+        state[f'{vital}Mean'] = 0.0
+        state[f'{vital}Var'] = 0.0
+    return state
+
+
+def score(state, reading):
+    """
+    Z-score of each vital in `reading` against the elk's baseline.
+
+    Returns {vital: (value, z)}; z is None while the elk is still warming up.
+    """
+    scores = {}
+    for vital, min_std in VITALS.items():
+        if reading.get(vital) is None:
+            continue
+        value = float(reading[vital])
+        z = None
+        if state['Count'] >= WARMUP_READINGS:
+            std = max(math.sqrt(state[f'{vital}Var']), min_std)
+            z = (value - state[f'{vital}Mean']) / std
+        scores[vital] = (value, z)
+    return scores
+
+
+def update(state, scores, flagged):
+    """
+    Fold one reading into the baseline (EWMA mean/variance).
+
+    A flagged value only nudges the mean, by FLAGGED_ALPHA, and leaves the variance alone:
+    widening the band by an outlier's full distance would hide the next ones.
+    """
+    state['Count'] += 1
+    # Plain running mean/variance for the first readings, then a fixed EWMA weight
+    alpha = max(ALPHA, 1.0 / state['Count'])
+    for vital, (value, _) in scores.items():
+        mean_key, var_key = f'{vital}Mean', f'{vital}Var'
+        diff = value - state[mean_key]
+        if vital in flagged:
+            state[mean_key] += FLAGGED_ALPHA * diff
+            continue
+        increment = alpha * diff
+        state[mean_key] += increment
+        state[var_key] = (1 - alpha) * (state[var_key] + diff * increment)
+
+
+def _to_decimal(value, places=6):
+    return Decimal(str(round(value, places)))
+
+
+def load_states(elk_ids, resource=None):
+    """
+    Fetch the baselines for `elk_ids` with BatchGetItem; unknown elk get a new state.
+    Elk whose keys are still unprocessed after MAX_RETRIES are left out, so the caller
+    neither scores them against nor overwrites their stored baseline.
+    """
+    resource = resource or dynamo_batch.dynamodb
+    states = {elk_id: new_state(elk_id) for elk_id in elk_ids}
+    keys = [{'ElkId': elk_id} for elk_id in elk_ids]
+
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {STATE_TABLE_NAME: {'Keys': keys[start:start + BATCH_GET_SIZE]}}
+        attempt = 0
+        while request:
+            response = resource.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(STATE_TABLE_NAME, []):
+                states[item['ElkId']] = {k: v if k == 'ElkId' else float(v) for k, v in item.items()}
+                states[item['ElkId']]['Count'] = int(item['Count'])
+            request = response.get('UnprocessedKeys') or {}
+            if request:
+                if attempt >= MAX_RETRIES:
+                    unprocessed = request[STATE_TABLE_NAME]['Keys']
+                    for key in unprocessed:
+                        del states[key['ElkId']]
+                    print(f"⚠️ {STATE_TABLE_NAME}: skipping {len(unprocessed)} elk whose baselines could not be read")
+                    break
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+    return states
+
+
+def save_states(states, resource=None):
+    """Write the updated baselines back in batches of 25."""
+    items = [{k: v if k == 'ElkId' else (int(v) if k == 'Count' else _to_decimal(v)) for k, v in s.items()}
+             for s in states.values()]
+    return write_items(STATE_TABLE_NAME, items, resource=resource, key_attributes=('ElkId',))
+
+
+def detect(readings, resource=None):
+    """
+    Score a batch of HEA table items, update the per-elk baselines and store alerts.
+
+    Parameters:
+        readings (list): Items as written to HeaDataTable (ElkId, Timestamp and the VITALS attributes).
+        resource: Optional boto3 DynamoDB service resource (defaults to the dynamo_batch one).
+
+    Returns:
+        list: The alert items written (empty when nothing was out of band).
+    """
+    readings = [r for r in readings if r.get('ElkId') is not None]
+    if not readings:
+        return []
+    states = load_states(sorted({str(r['ElkId']) for r in readings}), resource)
+
+    alerts = []
+    expires_at = int(time.time()) + ALERT_TTL_SECONDS
+    for reading in sorted(readings, key=lambda r: str(r.get('Timestamp'))):
+        state = states.get(str(reading['ElkId']))
+        if state is None:  # Baseline unreadable (throttled): skip rather than reset it
+            continue
+        scores = score(state, reading)
+        flagged = [vital for vital, (_, z) in scores.items() if z is not None and abs(z) >= Z_THRESHOLD]
+        if flagged:
+            alerts.append({
+                'ElkId': str(reading['ElkId']),
+                'Timestamp': str(reading.get('Timestamp')),
+                'Flags': flagged,
+                'Values': {vital: _to_decimal(scores[vital][0], 3) for vital in flagged},
+                'ZScores': {vital: _to_decimal(scores[vital][1], 2) for vital in flagged},
+                'ExpiresAt': expires_at,
+            })
+        update(state, scores, flagged)
+
+    save_states(states, resource)
+    if alerts:
+        write_items(ALERT_TABLE_NAME, alerts, resource=resource, key_attributes=('ElkId', 'Timestamp'))
+        for alert in alerts:
+            print(f"🚨 Elk {alert['ElkId']} at {alert['Timestamp']}: "
+                  + ", ".join(f"{v}={alert['Values'][v]} (z={alert['ZScores'][v]})" for v in alert['Flags']))
+    return alerts
@@ -45,10 +45,17 @@ export class DataAnalyticsStack extends Stack {
              {
               path: `s3://${s3JSONBucket.bucketName}/hea_data/`, // Point to the env_data folder where JSON files are located
             },
+            {
+              path: `s3://${s3JSONBucket.bucketName}/fact_elk_observations/`, // Elk observations fact table (etl_FactElkObservations.py)
+            },
           ],
         },
         name: 'S3ResultsCrawler',
         tablePrefix: 'processed_', // Optional table prefix
+        // Fallback only: the export jobs register their tables and partitions as they write.
+        // When it does run, it only looks at folders added since its last crawl.
+        recrawlPolicy: { recrawlBehavior: 'CRAWL_NEW_FOLDERS_ONLY' },
+        schemaChangePolicy: { updateBehavior: 'LOG', deleteBehavior: 'LOG' },
       });
   }
 }
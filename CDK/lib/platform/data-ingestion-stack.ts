@@ -11,7 +11,7 @@ import { CfnParameter, CfnCondition, Fn } from 'aws-cdk-lib';
 import * as athena from 'aws-cdk-lib/aws-athena';
 import * as glue from 'aws-cdk-lib/aws-glue';
 import * as s3Deployment from 'aws-cdk-lib/aws-s3-deployment'; // Import S3 Deployment
-import { createGlueJob } from './helpers/glue-job-factory'; // Import the factory function
+import { createGlueJob, createFactGlueJob } from './helpers/glue-job-factory'; // Import the factory functions
 import * as s3n from 'aws-cdk-lib/aws-s3-notifications';
 //import { checkFileExists } from './helpers/check-glue'; // Import the factory function
 
@@ -106,6 +106,7 @@ export class DataIngestionStack extends cdk.Stack {
     // Output the bucket name for verification
     new cdk.CfnOutput(this, 'GlueTempBucketNameOutput', {
       value: glueTempBucket.bucketName,
+      exportName: 'GlueTempBucketName', // EtlOrchestrationStack reads the export watermarks from it
     });
 
     //Create Roles
@@ -120,11 +121,39 @@ export class DataIngestionStack extends cdk.Stack {
         iam.ManagedPolicy.fromAwsManagedPolicyName('CloudWatchFullAccess'),
       ],
     });
-    
-    
+
+    // One marker row per processed IoT messageId so the topic processors can drop duplicate deliveries
+    new dynamodb.Table(this, 'IngestDedupTable', {
+      tableName: 'IngestDedupTable',
+      partitionKey: { name: 'MessageId', type: dynamodb.AttributeType.STRING },
+      timeToLiveAttribute: 'ExpiresAt', // Markers expire once IoT Core can no longer redeliver the message
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST, // On-demand billing
+      removalPolicy: cdk.RemovalPolicy.DESTROY, // Automatically delete the table when the stack is destroyed
+    });
+
+    // Per-elk EWMA baselines kept by HEATopicProcessor's vital-sign anomaly detector (vitals_detector.py)
+    new dynamodb.Table(this, 'HeaVitalsStateTable', {
+      tableName: 'HeaVitalsStateTable',
+      partitionKey: { name: 'ElkId', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST, // On-demand billing
+      removalPolicy: cdk.RemovalPolicy.DESTROY, // Automatically delete the table when the stack is destroyed
+    });
+
+    // One compact row per out-of-band HEA reading
+    new dynamodb.Table(this, 'HeaAlertTable', {
+      tableName: 'HeaAlertTable',
+      partitionKey: { name: 'ElkId', type: dynamodb.AttributeType.STRING },
+      sortKey: { name: 'Timestamp', type: dynamodb.AttributeType.STRING },
+      timeToLiveAttribute: 'ExpiresAt', // Alerts are kept for 30 days
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST, // On-demand billing
+      removalPolicy: cdk.RemovalPolicy.DESTROY, // Automatically delete the table when the stack is destroyed
+    });
+
     createGlueJob(this, lambdaDynamoDBAccessRole, etlScriptBucketName, glueTempS3BucketName, dynamoDbS3ResultsBucketName, 'etl_GPStoDb.py', 'gps');
     createGlueJob(this, lambdaDynamoDBAccessRole, etlScriptBucketName, glueTempS3BucketName, dynamoDbS3ResultsBucketName, 'etl_ENVtoDb.py', 'env');
     createGlueJob(this, lambdaDynamoDBAccessRole, etlScriptBucketName, glueTempS3BucketName, dynamoDbS3ResultsBucketName, 'etl_HEAtoDb.py', 'hea');
+    // Elk observations fact table: HEA readings joined to their GPS fix and nearest ENV reading
+    createFactGlueJob(this, etlScriptBucketName, glueTempS3BucketName, dynamoDbS3ResultsBucketName);
 
     /* File upload Stack for field workers */
 
@@ -148,10 +177,14 @@ export class DataIngestionStack extends cdk.Stack {
         runtime: lambda.Runtime.PYTHON_3_9,
         handler: 'unzip_and_store.lambda_handler',
         code: lambda.Code.fromAsset('lib/platform/lambdas'),
+        memorySize: 1024, // Archives are streamed, so this only bounds in-flight upload parts (see upzip_and_store.py)
+        timeout: cdk.Duration.minutes(15),
         environment: {
           S3_BUCKET_NAME: processedImagesBucket.bucketName
         }
       });
+      rawUploadsBucket.grantRead(unzipLambda); // Ranged GETs of the uploaded archive
+      processedImagesBucket.grantPut(unzipLambda); // Includes the multipart upload actions
 
       // Add permission for S3 to invoke Lambda
       unzipLambda.addPermission('AllowS3Invoke', {
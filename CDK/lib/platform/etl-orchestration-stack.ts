@@ -24,6 +24,8 @@ export class EtlOrchestrationStack extends cdk.Stack {
         'glue:GetCrawlerMetrics',
         'glue:StartJobRun',
         'glue:GetJobRun',
+        'glue:GetJobRuns',
+        'glue:GetJob',
         'logs:CreateLogGroup',
         'logs:CreateLogStream',
         'logs:PutLogEvents'
@@ -31,6 +33,21 @@ export class EtlOrchestrationStack extends cdk.Stack {
   resources: ['*'] // You can restrict this later
 }));
 
+    // Exported by DataIngestionStack: the Glue temp bucket and the export job names
+    const glueTempBucketName = cdk.Fn.importValue('GlueTempBucketName');
+
+    // The orchestrator reads each export's watermark to tell whether the run produced new rows
+    lambdaRole.addToPolicy(new iam.PolicyStatement({
+      actions: ['s3:GetObject'],
+      resources: [`arn:aws:s3:::${glueTempBucketName}/watermarks/*`],
+    }));
+    // ListBucket turns a missing watermark into NoSuchKey instead of AccessDenied
+    lambdaRole.addToPolicy(new iam.PolicyStatement({
+      actions: ['s3:ListBucket'],
+      resources: [`arn:aws:s3:::${glueTempBucketName}`],
+      conditions: { StringLike: { 's3:prefix': ['watermarks/*'] } },
+    }));
+
 
     const startCrawlerFn = new lambda.Function(this, 'StartCrawlerFn', {
         runtime: lambda.Runtime.PYTHON_3_11,
@@ -60,6 +77,23 @@ export class EtlOrchestrationStack extends cdk.Stack {
         role: lambdaRole,
     });
 
+    // Starts the three exports together, then the fact job, crawls the tables that got new rows; re-invoke with an
+    // IN_PROGRESS response to keep waiting on jobs that outlast the Lambda timeout
+    const orchestrateEtlFn = new lambda.Function(this, 'OrchestrateEtlFn', {
+        runtime: lambda.Runtime.PYTHON_3_11,
+        handler: 'orchestrator.handler',
+        code: lambda.Code.fromAsset(lambdaPath),
+        role: lambdaRole,
+        timeout: cdk.Duration.minutes(15),
+        environment: {
+            // Glue job names exported by the data ingestion stack (createGlueJob)
+            GPS_JOB_NAME: cdk.Fn.importValue('GPSGlueJobName'),
+            ENV_JOB_NAME: cdk.Fn.importValue('ENVGlueJobName'),
+            HEA_JOB_NAME: cdk.Fn.importValue('HEAGlueJobName'),
+            FACT_JOB_NAME: cdk.Fn.importValue('FactGlueJobName'),  // Run after the three exports
+        },
+    });
+
 
   }
 }
\ No newline at end of file
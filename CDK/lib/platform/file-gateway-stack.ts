@@ -64,6 +64,7 @@ export class FileGatewayStack extends Stack {
           ],
         },
       }),
+      timeout: Duration.minutes(5), // One listing per prefix, then concurrent uploads of new/changed assets
       environment: {
         S3_BUCKET_NAME: fileGatewayBucket.bucketName,
       },
@@ -68,7 +68,19 @@ export function createGlueJob(
           billingMode: dynamodb.BillingMode.PAY_PER_REQUEST, // On-demand billing
           removalPolicy: cdk.RemovalPolicy.DESTROY, // Automatically delete the table when the stack is destroyed
         });
-      
+
+        if (prefix_upper === 'GPS') {
+          // Spatial index for /gps-data/bbox: GPSTopicProcessor writes GeoBucket ('<geohash4>#<day>')
+          // and GeoCell (9-char geohash); only rows that have both appear in the index
+          dnyamoDataTable.addGlobalSecondaryIndex({
+            indexName: 'GeoIndex',
+            partitionKey: { name: 'GeoBucket', type: dynamodb.AttributeType.STRING },
+            sortKey: { name: 'GeoCell', type: dynamodb.AttributeType.STRING },
+            projectionType: dynamodb.ProjectionType.INCLUDE,
+            nonKeyAttributes: ['Latitude', 'Longitude'], // SensorId/Timestamp are projected as table keys
+          });
+        }
+
         // Create Lambda function for processing GPS data (Topic to DynamoDB)
         const topicProcessorLambda = new lambda.Function(scope, topicProcessorLambdaName, {
           functionName:  topicProcessorFunctionName,
@@ -102,6 +114,25 @@ export function createGlueJob(
     
         // EXPLICIT: Add Deletion Policy for the IoT Rule
         gpsIotRule.applyRemovalPolicy(cdk.RemovalPolicy.DESTROY);
+
+        // Compact binary messages (PAYLOAD_ENCODING=compact) are published on 'IoT/<PREFIX>/bin'.
+        // Non-JSON payloads must be base64-encoded for the Lambda action; compact_codec.decode_event unpacks them.
+        const binaryIotRule = new iot.CfnTopicRule(scope, `${prefix_upper}BinaryIotRule`, {
+          topicRulePayload: {
+            description: `Processes compact binary messages on the ${prefix_upper} topic`,
+            sql: `SELECT encode(*, 'base64') AS payload_b64, topic() AS topic FROM 'IoT/${prefix_upper}/bin'`,
+            awsIotSqlVersion: '2016-03-23',
+            actions: [
+              {
+                lambda: {
+                  functionArn: topicProcessorLambda.functionArn,
+                },
+              },
+            ],
+            ruleDisabled: false,
+          },
+        });
+        binaryIotRule.applyRemovalPolicy(cdk.RemovalPolicy.DESTROY);
     
         // Grant IoT Core permissions to invoke the Lambda function
         topicProcessorLambda.grantInvoke(new iam.ServicePrincipal('iot.amazonaws.com'));
@@ -189,6 +220,16 @@ export function createGlueJob(
             '--enable-metrics': '',  // Enables metrics tracking
             '--enable-continuous-cloudwatch-log': 'true',  // Logs to CloudWatch
             '--s3_output_path': `s3://${s3BucketDynamoDbName}/${prefix_lower}_data/`,  // Pass the S3 bucket path to your Glue job
+            '--extra-py-files': `s3://${etlScriptBucketName}/scripts/etl_common.py`,  // Shared ETL helpers deployed next to the job scripts
+            '--output_format': 'parquet',  // 'json' for the legacy single-file export
+            '--compression': 'snappy',  // Parquet codec: snappy or zstd
+            '--target_file_mb': '128',  // Approximate Parquet file size inside each sensor_type/dt partition
+            '--export_mode': 'incremental',  // Only rewrite the dates since the watermark; pass 'full' for a backfill/rebuild
+            '--watermark_path': `s3://${glueTempBucketName}/watermarks/${prefix_lower}.json`,  // Per-table high-water mark
+            '--lookback_hours': '24',  // Rows arriving up to this late (outbox replays) are still exported
+            '--read_percent': '0.5',  // Leave half the table's read capacity to production traffic during the export
+            '--catalog_database': 'gps_data_analytics_db',  // Register the table + new partitions directly (DataAnalyticsStack database)
+            '--catalog_table': `processed_${prefix_lower}_data`,  // Same name S3ResultsCrawler gives the <prefix>_data folder
             '--Dlog4j2.formatMsgNoLookups': 'true',  // Disable Log4j lookups for security
             '--JOB_NAME': `${prefix}DnyamoDb-to-JSON`,  // Pass the job name dynamically
           },
@@ -207,5 +248,66 @@ export function createGlueJob(
         // Output the Glue Job Name
         new cdk.CfnOutput(scope, `${prefix}GlueJobNameOutput`, {
           value: glueJob.ref,
+          exportName: `${prefix_upper}GlueJobName`,  // Imported by EtlOrchestrationStack (GPS_JOB_NAME etc.)
+        });
+  }
+
+// Glue job that joins the GPS, ENV and HEA exports into the elk observations fact table
+// (lib/scripts/etl_FactElkObservations.py); it reads the <prefix>_data/ folders the jobs above write
+export function createFactGlueJob(
+    scope: Construct,
+    etlScriptBucketName: string,
+    glueTempBucketName: string,
+    s3BucketDynamoDbName: string
+  ) {
+        const glueRole = new Role(scope, 'FactElkObservationsGlueRole', {
+          assumedBy: new ServicePrincipal('glue.amazonaws.com'),
+        });
+        glueRole.addManagedPolicy(ManagedPolicy.fromAwsManagedPolicyName('service-role/AWSGlueServiceRole'));
+        glueRole.addManagedPolicy(ManagedPolicy.fromAwsManagedPolicyName('AmazonS3FullAccess'));
+
+        const glueJob = new glue.CfnJob(scope, 'FactElkObservationsGlueJob', {
+          role: glueRole.roleArn,
+          command: {
+            name: 'glueetl',
+            scriptLocation: `s3://${etlScriptBucketName}/scripts/etl_FactElkObservations.py`,
+            pythonVersion: '3',
+          },
+          defaultArguments: {
+            '--job-language': 'python',
+            '--TempDir': `s3://${glueTempBucketName}/tmp/`,
+            '--enable-metrics': '',
+            '--enable-continuous-cloudwatch-log': 'true',
+            '--gps_input_path': `s3://${s3BucketDynamoDbName}/gps_data/`,  // Parquet exports of the GPS/ENV/HEA jobs
+            '--env_input_path': `s3://${s3BucketDynamoDbName}/env_data/`,
+            '--hea_input_path': `s3://${s3BucketDynamoDbName}/hea_data/`,
+            '--s3_output_path': `s3://${s3BucketDynamoDbName}/fact_elk_observations/`,
+            '--extra-py-files': `s3://${etlScriptBucketName}/scripts/etl_common.py,s3://${etlScriptBucketName}/scripts/etl_fact.py`,
+            '--input_format': 'parquet',  // Must match the exports' --output_format
+            '--output_format': 'parquet',
+            '--compression': 'snappy',
+            '--target_file_mb': '128',
+            '--approx_row_bytes': '96',  // Fact rows carry about twice the columns of an export row
+            '--export_mode': 'incremental',  // Recompute the dates inside the lookback window; pass 'full' to rebuild
+            '--watermark_path': `s3://${glueTempBucketName}/watermarks/fact_elk_observations.json`,
+            '--lookback_hours': '48',  // Covers the exports' own 24 h lookback plus a day between runs
+            '--gps_tolerance_seconds': '900',  // Oldest GPS fix / ENV reading attached to a health reading
+            '--env_tolerance_seconds': '3600',
+            '--env_max_km': '10',  // Farthest ENV sensor attached to a health reading
+            '--catalog_database': 'gps_data_analytics_db',  // Register the table + new partitions directly (DataAnalyticsStack database)
+            '--catalog_table': 'processed_fact_elk_observations',  // Same name S3ResultsCrawler gives the folder
+            '--Dlog4j2.formatMsgNoLookups': 'true',
+            '--JOB_NAME': 'FactElkObservations',
+          },
+          maxRetries: 0,
+          glueVersion: '3.0',
+          numberOfWorkers: 2,
+          workerType: 'G.1X',
+          timeout: 30,  // Three exports in, one table out: a little longer than the export jobs
+        });
+
+        new cdk.CfnOutput(scope, 'FactElkObservationsGlueJobNameOutput', {
+          value: glueJob.ref,
+          exportName: 'FactGlueJobName',  // Imported by EtlOrchestrationStack (FACT_JOB_NAME)
         });
-  }
\ No newline at end of file
+  }
@@ -0,0 +1,368 @@
+"""
+orchestrator.py
+
+Runs the GPS, ENV and HEA Glue exports, then the elk observations fact job that joins
+them, and refreshes their catalog tables:
+- The export runs are started together (StartJobRun returns at once), so they take as
+  long as the slowest job rather than the sum of all three
+- A pipeline with 'after' (the fact job) starts once those pipelines' jobs have ended;
+  it is not run when one of them failed, nor when none of them exported new rows
+- Each run is polled on its own jittered exponential backoff schedule (backoff_delay),
+  all from one loop
+- A run that produced new output (a full export, or an incremental one that moved the
+  watermark: etl_common.export_table only writes it when rows were exported) is normally
+  queryable already, because jobs with --catalog_database register their table and
+  partitions themselves. The crawler is only started as a fallback: for jobs without
+  catalog registration, or when the watermark records dates the job could not register
+- A crawler is started once for all the pipelines that need it, after every job sharing
+  it has finished, so the shared S3ResultsCrawler runs one crawl rather than one per table
+- Per-stage timings (start, job run, crawler) are printed and returned
+
+A Glue job may run longer than a Lambda invocation can, so shortly before the invocation
+times out the handler returns its state with status IN_PROGRESS; invoking it again with
+that response as the event resumes polling without starting anything twice.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+from start_job import running_job_run, start_job_run
+from wait_for_crawler import crawler_status
+from wait_for_job import TERMINAL_STATES, backoff_delay, job_run_status
+
+SENSORS = ('gps', 'env', 'hea')
+FACT = 'fact'  # Pipeline of the elk observations fact job, run after the SENSORS exports
+DEADLINE_MARGIN_SECONDS = 30  # Time left when the handler hands back its state
+CRAWLER_POLL_BASE_SECONDS = float(os.environ.get('CRAWLER_POLL_BASE_SECONDS', 15))
+
+CRAWLING = ('RUNNING', 'WAITING_FOR_PREVIOUS')  # Crawl states that are still polled
+
+
+def default_pipelines():
+    """
+    One pipeline per sensor plus the fact job after them; job names come from
+    GPS_JOB_NAME / ENV_JOB_NAME / HEA_JOB_NAME / FACT_JOB_NAME.
+    """
+    return [{'sensor': sensor,
+             'job_name': os.environ.get(f"{sensor.upper()}_JOB_NAME", ''),
+             'crawler_name': 'S3ResultsCrawler',  # Crawls the export output (DataAnalyticsStack)
+             'after': list(SENSORS) if sensor == FACT else []}
+            for sensor in SENSORS + (FACT,)]
+
+
+def new_pipeline(spec, arguments=None):
+    """Orchestration state of one job + crawler (JSON-serialisable, so it survives a re-invocation)."""
+    return {
+        'sensor': spec['sensor'],
+        'job_name': spec['job_name'],
+        'crawler_name': spec['crawler_name'],
+        'arguments': spec.get('arguments', arguments) or {},
+        'after': spec.get('after', []),  # Sensors whose jobs must end before this one starts
+        'status': 'PENDING',
+        'job': {},
+        'crawler': {},
+    }
+
+
+def read_watermark_state(s3, path):
+    """Stored watermark document of an export (same format as etl_common), or {}."""
+    bucket, key = path[len('s3://'):].split('/', 1)
+    try:
+        body = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+    except s3.exceptions.NoSuchKey:
+        return {}
+    return json.loads(body)
+
+
+def export_settings(glue, job_name, arguments):
+    """
+    (export_mode, watermark_path, registers_partitions) for the run: the job's defaults
+    overridden by `arguments`, with etl_common's defaults for anything unset.
+    """
+    settings = dict(glue.get_job(JobName=job_name)['Job'].get('DefaultArguments', {}))
+    settings.update(arguments)
+    registers = bool(settings.get('--catalog_database')) and settings.get('--output_format', 'json') == 'parquet'
+    return settings.get('--export_mode', 'full'), settings.get('--watermark_path', ''), registers
+
+
+def start_pipeline(pipeline, glue, s3, clock):
+    """Record where the watermark stands, then start the job (or attach to a run already in progress)."""
+    job = pipeline['job']
+    started = clock()
+    try:
+        mode, watermark_path, registers = export_settings(glue, pipeline['job_name'], pipeline['arguments'])
+        job.update(export_mode=mode, watermark_path=watermark_path, registers_partitions=registers)
+        if mode == 'incremental' and watermark_path.startswith('s3://'):
+            job['watermark_before'] = read_watermark_state(s3, watermark_path).get('watermark')
+        try:
+            job['run_id'] = start_job_run(glue, pipeline['job_name'], pipeline['arguments'])
+        except glue.exceptions.ConcurrentRunsExceededException:
+            job['run_id'] = running_job_run(glue, pipeline['job_name'])
+            if job['run_id'] is None:
+                raise
+            print(f"⚠️ Job already running: {pipeline['job_name']}, waiting for {job['run_id']}")
+    except Exception as e:
+        print(f"❌ Failed to start job: {pipeline['job_name']} — {str(e)}")
+        pipeline['status'] = 'FAILED'
+        job['error'] = str(e)
+        return
+    now = clock()
+    job.update(started_at=started, start_seconds=round(now - started, 3), polls=0,
+               next_poll=now + backoff_delay(0))
+    pipeline['status'] = 'JOB_RUNNING'
+    print(f"🚀 Started job: {pipeline['job_name']} ({job['run_id']})")
+
+
+def start_after_upstream(pipelines, glue, s3, clock):
+    """
+    Start the PENDING pipelines whose 'after' pipelines have all ended their job run.
+    One that ran after a failed job is failed without starting; one whose upstream jobs
+    all exported nothing new is done without starting.
+    """
+    by_sensor = {pipeline['sensor']: pipeline for pipeline in pipelines}
+    for pipeline in pipelines:
+        if pipeline['status'] != 'PENDING':
+            continue
+        upstream = [by_sensor[sensor] for sensor in pipeline.get('after', []) if sensor in by_sensor]
+        if any(other['status'] in ('PENDING', 'JOB_RUNNING') for other in upstream):
+            continue
+        failed = [other['sensor'] for other in upstream if other['job'].get('state') != 'SUCCEEDED']
+        if failed:
+            pipeline['status'] = 'FAILED'
+            pipeline['job']['error'] = f"not started: {', '.join(failed)} did not succeed"
+            print(f"❌ Not starting {pipeline['job_name']}: {', '.join(failed)} did not succeed")
+        elif upstream and all(other['crawler'].get('status') == 'SKIPPED' for other in upstream):
+            pipeline['status'] = 'DONE'
+            pipeline['job']['state'] = 'SKIPPED'
+            pipeline['crawler'] = {'status': 'SKIPPED'}
+            print(f"✅ No new rows upstream of {pipeline['job_name']} — skipping it")
+        else:
+            start_pipeline(pipeline, glue, s3, clock)
+
+
+def check_output(pipeline, s3):
+    """
+    (new output, registered) for a succeeded run: whether it wrote anything, and whether
+    the job registered all of it in the catalog itself.
+    """
+    job = pipeline['job']
+    if not job['watermark_path'].startswith('s3://'):
+        # No watermark to tell from, nor to record registration failures in (those fail the job)
+        return True, job['registers_partitions']
+    state = read_watermark_state(s3, job['watermark_path'])
+    job['watermark_after'] = state.get('watermark')
+    job['unregistered_dates'] = len(state.get('unregistered_dates', []))
+    new_output = job['export_mode'] != 'incremental' or job['watermark_after'] != job.get('watermark_before')
+    return new_output, job['registers_partitions'] and not job['unregistered_dates']
+
+
+def start_crawler(crawl, glue, clock):
+    started = clock()
+    try:
+        glue.start_crawler(Name=crawl['crawler_name'])
+    except glue.exceptions.CrawlerRunningException:
+        # A scheduled crawl is already going; the export may have landed after it started, so run another
+        print(f"⚠️ Crawler already running: {crawl['crawler_name']}, starting ours once it finishes")
+        crawl.update(status='WAITING_FOR_PREVIOUS', started_at=crawl.get('started_at', started), polls=0,
+                     next_poll=clock() + backoff_delay(0, base=CRAWLER_POLL_BASE_SECONDS))
+        return
+    crawl.update(status='RUNNING', started_at=crawl.get('started_at', started), since=started, polls=0,
+                 next_poll=clock() + backoff_delay(0, base=CRAWLER_POLL_BASE_SECONDS))
+    print(f"🚀 Started crawler: {crawl['crawler_name']} for {', '.join(crawl['sensors'])}")
+
+
+def start_crawls(pipelines, crawls, glue, clock):
+    """
+    Start one crawl per crawler for the pipelines queued on it, once no pipeline sharing
+    that crawler is still exporting; the new crawls are appended to `crawls`.
+    """
+    queued = {}
+    for pipeline in pipelines:
+        if pipeline['status'] == 'CRAWL_QUEUED':
+            queued.setdefault(pipeline['crawler_name'], []).append(pipeline)
+    for crawler_name, waiting in queued.items():
+        if any(pipeline['crawler_name'] == crawler_name and pipeline['status'] in ('PENDING', 'JOB_RUNNING')
+               for pipeline in pipelines):
+            continue
+        crawl = {'crawler_name': crawler_name, 'sensors': [pipeline['sensor'] for pipeline in waiting]}
+        crawls.append(crawl)
+        for pipeline in waiting:
+            pipeline['status'] = 'CRAWLER_RUNNING'
+            pipeline['crawler'] = {'status': 'RUNNING'}
+        try:
+            start_crawler(crawl, glue, clock)
+        except Exception as e:
+            print(f"❌ Failed to start crawler: {crawler_name} — {str(e)}")
+            crawl['started_at'] = clock()
+            finish_crawl(crawl, pipelines, 'FAILED', clock)
+
+
+def finish_crawl(crawl, pipelines, status, clock):
+    """Record the crawl's outcome on it and on every pipeline it crawled for."""
+    crawl.update(status=status, seconds=round(clock() - crawl['started_at'], 1))
+    crawl.pop('next_poll', None)
+    for pipeline in pipelines:
+        if pipeline['sensor'] in crawl['sensors']:
+            pipeline['crawler'] = {key: crawl[key] for key in ('status', 'started_at', 'seconds', 'polls')
+                                   if key in crawl}
+            pipeline['status'] = 'DONE' if status == 'SUCCEEDED' else 'FAILED'
+
+
+def poll_job(pipeline, glue, s3, clock):
+    job = pipeline['job']
+    state, run = job_run_status(glue, pipeline['job_name'], job['run_id'])
+    job['polls'] += 1
+    now = clock()
+    if state not in TERMINAL_STATES:
+        job['next_poll'] = now + backoff_delay(job['polls'])
+        return
+    job.update(state=state, seconds=round(now - job['started_at'], 1),
+               execution_seconds=run.get('ExecutionTime', 0))
+    job.pop('next_poll')
+    if state != 'SUCCEEDED':
+        job['error'] = run.get('ErrorMessage', state)
+        pipeline['status'] = 'FAILED'
+        print(f"❌ Job {pipeline['job_name']} ended {state}: {job['error']} — not crawling")
+        return
+    new_output, registered = check_output(pipeline, s3)
+    if not new_output:
+        pipeline['crawler'] = {'status': 'SKIPPED'}
+        pipeline['status'] = 'DONE'
+        print(f"✅ Job {pipeline['job_name']} succeeded with no new rows — skipping crawler")
+    elif registered:
+        pipeline['crawler'] = {'status': 'REGISTERED'}
+        pipeline['status'] = 'DONE'
+        print(f"✅ Job {pipeline['job_name']} succeeded in {job['seconds']}s and registered its partitions "
+              f"— skipping crawler")
+    else:
+        # Crawled by start_crawls once every job sharing the crawler is done
+        print(f"✅ Job {pipeline['job_name']} succeeded with new output in {job['seconds']}s")
+        pipeline['crawler'] = {'status': 'QUEUED'}
+        pipeline['status'] = 'CRAWL_QUEUED'
+
+
+def poll_crawler(crawl, pipelines, glue, clock):
+    crawl['polls'] += 1
+    if crawl['status'] == 'WAITING_FOR_PREVIOUS':
+        state, _ = crawler_status(glue, crawl['crawler_name'])
+        if state == 'READY':
+            start_crawler(crawl, glue, clock)
+        else:
+            crawl['next_poll'] = clock() + backoff_delay(crawl['polls'], base=CRAWLER_POLL_BASE_SECONDS)
+        return
+
+    state, last_status = crawler_status(glue, crawl['crawler_name'], crawl['since'])
+    if state != 'READY' or last_status is None:
+        crawl['next_poll'] = clock() + backoff_delay(crawl['polls'], base=CRAWLER_POLL_BASE_SECONDS)
+        return
+    finish_crawl(crawl, pipelines, last_status, clock)
+    print(f"{'✅' if last_status == 'SUCCEEDED' else '❌'} Crawler {crawl['crawler_name']} ended "
+          f"{last_status} after {crawl['seconds']}s")
+
+
+def run_pipelines(pipelines, glue, s3, deadline=None, clock=time.time, sleep=time.sleep, crawls=None):
+    """
+    Drive `pipelines` (and the crawls started for them, appended to `crawls`) until every
+    pipeline is DONE or FAILED, or until the next poll would fall after `deadline` (same
+    clock). Returns True when all have finished.
+    """
+    crawls = [] if crawls is None else crawls
+    pending = [pipeline for pipeline in pipelines if pipeline['status'] == 'PENDING' and not pipeline.get('after')]
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+            list(pool.map(lambda pipeline: start_pipeline(pipeline, glue, s3, clock), pending))
+
+    while True:
+        start_after_upstream(pipelines, glue, s3, clock)
+        start_crawls(pipelines, crawls, glue, clock)
+        # (polled state, name for messages, poll) of every job run and crawl still going
+        active = ([(pipeline['job'], pipeline['sensor'], lambda pipeline=pipeline: poll_job(pipeline, glue, s3, clock))
+                   for pipeline in pipelines if pipeline['status'] == 'JOB_RUNNING']
+                  + [(crawl, crawl['crawler_name'], lambda crawl=crawl: poll_crawler(crawl, pipelines, glue, clock))
+                     for crawl in crawls if crawl['status'] in CRAWLING])
+        if not active:
+            return True
+        due = min(state['next_poll'] for state, _, _ in active)
+        if deadline is not None and due > deadline:
+            return False
+        sleep(max(0.0, due - clock()))
+        for state, name, poll in active:
+            if state['next_poll'] > clock():
+                continue
+            try:
+                poll()
+            except Exception as e:
+                # Throttling or a transient API error: keep the stage, back off further
+                print(f"⚠️ Poll failed for {name}: {str(e)}")
+                state['next_poll'] = clock() + backoff_delay(state['polls'])
+
+
+def timings(pipelines):
+    """{sensor: {stage: seconds}} plus the wall time from the first start to the last finish."""
+    report = {}
+    starts, ends = [], []
+    for pipeline in pipelines:
+        job, crawler = pipeline['job'], pipeline['crawler']
+        report[pipeline['sensor']] = {
+            'start_seconds': job.get('start_seconds'),
+            'job_seconds': job.get('seconds'),
+            'job_execution_seconds': job.get('execution_seconds'),
+            'job_polls': job.get('polls'),
+            'crawler_seconds': crawler.get('seconds'),
+            'crawler_polls': crawler.get('polls'),
+        }
+        if 'started_at' in job:
+            starts.append(job['started_at'])
+            ends.append(job['started_at'] + (job.get('seconds') or 0))
+        if 'started_at' in crawler:
+            ends.append(crawler['started_at'] + (crawler.get('seconds') or 0))
+    report['total_seconds'] = round(max(ends) - min(starts), 1) if starts else 0
+    return report
+
+
+def orchestrate(event, glue, s3, deadline=None, clock=time.time, sleep=time.sleep):
+    """Start (or resume, for an IN_PROGRESS response) the pipelines described by `event`."""
+    crawls = []
+    if event.get('status') == 'IN_PROGRESS':
+        pipelines = event['pipelines']
+        crawls = event.get('crawls', [])
+    else:
+        specs = event.get('pipelines') or default_pipelines()
+        missing = [spec['sensor'] for spec in specs if not spec.get('job_name')]
+        if missing:
+            raise ValueError(f"No Glue job name for {missing}; set <SENSOR>_JOB_NAME / FACT_JOB_NAME or pass 'pipelines'")
+        pipelines = [new_pipeline(spec, event.get('arguments')) for spec in specs]
+
+    finished = run_pipelines(pipelines, glue, s3, deadline, clock, sleep, crawls)
+    report = timings(pipelines)
+    for pipeline in pipelines:
+        row = report[pipeline['sensor']]
+        print(f"⏱️ {pipeline['sensor']}: {pipeline['status']}, job {row['job_seconds']}s "
+              f"({row['job_polls']} polls), crawler {pipeline['crawler'].get('status', '-')} "
+              f"{row['crawler_seconds'] or 0}s")
+    if not finished:
+        status = 'IN_PROGRESS'
+    else:
+        status = 'FAILED' if any(pipeline['status'] == 'FAILED' for pipeline in pipelines) else 'SUCCEEDED'
+    print(f"{'⏳' if status == 'IN_PROGRESS' else '✅' if status == 'SUCCEEDED' else '❌'} ETL {status} "
+          f"after {report['total_seconds']}s")
+    return {'status': status, 'pipelines': pipelines, 'crawls': crawls, 'timings': report}
+
+
+def handler(event, context):
+    """
+    Expects input: {} (job names from GPS_JOB_NAME / ENV_JOB_NAME / HEA_JOB_NAME / FACT_JOB_NAME), or
+    { "pipelines": [{ "sensor": "gps", "job_name": "...", "crawler_name": "S3ResultsCrawler" },
+                    { "sensor": "fact", "job_name": "...", "crawler_name": "S3ResultsCrawler",
+                      "after": ["gps", "env", "hea"] }],
+      "arguments": { "--export_mode": "full" } }, or the IN_PROGRESS response of a previous
+    invocation to resume it.
+    """
+    deadline = None
+    if context is not None:
+        deadline = time.time() + context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS
+    return orchestrate(event, boto3.client('glue'), boto3.client('s3'), deadline)
@@ -0,0 +1,52 @@
+import boto3
+
+
+def start_job_run(glue, job_name, arguments=None):
+    """Start one run of a Glue job and return its JobRunId (StartJobRun does not wait for the run)."""
+    kwargs = {'JobName': job_name}
+    if arguments:
+        kwargs['Arguments'] = arguments
+    return glue.start_job_run(**kwargs)['JobRunId']
+
+
+def running_job_run(glue, job_name):
+    """JobRunId of a run of this job that is still in progress, or None."""
+    for run in glue.get_job_runs(JobName=job_name, MaxResults=10)['JobRuns']:
+        if run['JobRunState'] in ('STARTING', 'RUNNING', 'WAITING'):
+            return run['Id']
+    return None
+
+
+def handler(event, context):
+    """
+    Expects input: { "job_name": "GpsDynamoDBToS3GlueJob-...", "arguments": { "--export_mode": "full" } }
+    ("arguments" is optional and overrides the job's default arguments for this run)
+    """
+    job_name = event['job_name']
+    glue = boto3.client('glue')
+
+    print(f"🚀 Starting job: {job_name}")
+
+    try:
+        run_id = start_job_run(glue, job_name, event.get('arguments'))
+        print(f"✅ Successfully started job: {job_name} ({run_id})")
+        return {
+            'status': 'STARTED',
+            'job': job_name,
+            'run_id': run_id
+        }
+    except glue.exceptions.ConcurrentRunsExceededException:
+        run_id = running_job_run(glue, job_name)
+        print(f"⚠️ Job already running: {job_name} ({run_id})")
+        return {
+            'status': 'ALREADY_RUNNING',
+            'job': job_name,
+            'run_id': run_id
+        }
+    except Exception as e:
+        print(f"❌ Failed to start job: {job_name} — {str(e)}")
+        return {
+            'status': 'ERROR',
+            'job': job_name,
+            'error': str(e)
+        }
@@ -0,0 +1,53 @@
+import boto3
+
+from wait_for_job import backoff_delay
+
+
+def crawler_status(glue, crawler_name, since=None):
+    """
+    (State, LastCrawl status) of a crawler. The last crawl only counts if it started at or
+    after `since` (epoch seconds), so a crawl that finished before ours was started is not
+    mistaken for it.
+    """
+    crawler = glue.get_crawler(Name=crawler_name)['Crawler']
+    last_crawl = crawler.get('LastCrawl') or {}
+    if since is not None and ('StartTime' not in last_crawl or last_crawl['StartTime'].timestamp() < since - 1):
+        last_crawl = {}
+    return crawler['State'], last_crawl.get('Status')
+
+
+def handler(event, context):
+    """
+    Expects input: { "crawler_name": "DynamoDBenv", "since": 1760000000, "attempt": 0 }
+    ("since" is the epoch time the crawler was started; optional)
+    """
+    crawler_name = event['crawler_name']
+    attempt = event.get('attempt', 0)
+    glue = boto3.client('glue')
+
+    try:
+        state, last_status = crawler_status(glue, crawler_name, event.get('since'))
+    except Exception as e:
+        print(f"❌ Failed to get crawler: {crawler_name} — {str(e)}")
+        return {
+            'status': 'ERROR',
+            'done': True,
+            'crawler': crawler_name,
+            'error': str(e)
+        }
+
+    done = state == 'READY' and last_status is not None
+    if not done:
+        print(f"⏳ Crawler {crawler_name} is {state}")
+    elif last_status == 'SUCCEEDED':
+        print(f"✅ Crawler {crawler_name} finished")
+    else:
+        print(f"❌ Crawler {crawler_name} ended {last_status}")
+
+    return {
+        'status': last_status if done else state,
+        'done': done,
+        'crawler': crawler_name,
+        'attempt': attempt + 1,
+        'wait_seconds': 0 if done else round(backoff_delay(attempt), 1)
+    }
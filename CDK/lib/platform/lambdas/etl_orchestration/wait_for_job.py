@@ -0,0 +1,69 @@
+import os
+import random
+
+import boto3
+
+# States a job run does not leave; anything else is still in progress
+TERMINAL_STATES = {'SUCCEEDED', 'FAILED', 'STOPPED', 'TIMEOUT', 'ERROR', 'EXPIRED'}
+
+POLL_BASE_SECONDS = float(os.environ.get('POLL_BASE_SECONDS', 10))  # First wait after a start
+POLL_CAP_SECONDS = float(os.environ.get('POLL_CAP_SECONDS', 60))  # Longest wait between two polls
+
+
+def backoff_delay(attempt, base=POLL_BASE_SECONDS, cap=POLL_CAP_SECONDS, rng=random):
+    """
+    Seconds to wait before poll number `attempt` (0-based): exponential, capped, with
+    "equal jitter" (between half and all of the step) so runs started together do not
+    keep polling in lockstep.
+    """
+    step = min(cap, base * 2 ** attempt)
+    return step / 2 + rng.uniform(0, step / 2)
+
+
+def job_run_status(glue, job_name, run_id):
+    """(JobRunState, JobRun) of one run."""
+    run = glue.get_job_run(JobName=job_name, RunId=run_id, PredecessorsIncluded=False)['JobRun']
+    return run['JobRunState'], run
+
+
+def handler(event, context):
+    """
+    Expects input: { "job_name": "GpsDynamoDBToS3GlueJob-...", "run_id": "jr_...", "attempt": 0 }
+    Checks the run once; while it is not done, "wait_seconds" is how long to wait before
+    calling again with the returned "attempt".
+    """
+    job_name = event['job_name']
+    run_id = event['run_id']
+    attempt = event.get('attempt', 0)
+    glue = boto3.client('glue')
+
+    try:
+        state, run = job_run_status(glue, job_name, run_id)
+    except Exception as e:
+        print(f"❌ Failed to get job run: {job_name} ({run_id}) — {str(e)}")
+        return {
+            'status': 'ERROR',
+            'done': True,
+            'job': job_name,
+            'run_id': run_id,
+            'error': str(e)
+        }
+
+    done = state in TERMINAL_STATES
+    if not done:
+        print(f"⏳ Job {job_name} ({run_id}) is {state}")
+    elif state == 'SUCCEEDED':
+        print(f"✅ Job {job_name} ({run_id}) succeeded in {run.get('ExecutionTime', 0)}s")
+    else:
+        print(f"❌ Job {job_name} ({run_id}) ended {state}: {run.get('ErrorMessage', '')}")
+
+    return {
+        'status': state,
+        'done': done,
+        'job': job_name,
+        'run_id': run_id,
+        'execution_seconds': run.get('ExecutionTime', 0),
+        'error': run.get('ErrorMessage'),
+        'attempt': attempt + 1,
+        'wait_seconds': 0 if done else round(backoff_delay(attempt), 1)
+    }
@@ -1,42 +1,98 @@
+import hashlib
 import os
+import time
+from collections import Counter
+
 import boto3
+from boto3.s3.transfer import TransferConfig, create_transfer_manager
 
 s3 = boto3.client('s3')
 
+# Every S3 request the sync makes, by operation (reported in the response)
+api_calls = Counter()
+s3.meta.events.register('before-call.s3.*', lambda model, **kwargs: api_calls.update([model.name]))
+
+TASK_ROOT = os.environ.get('LAMBDA_TASK_ROOT', '/var/task')
+
+# S3 prefix -> (local directory inside the Lambda package, file extensions to upload)
+ASSETS = {
+    'images': ('images', (".jpg", ".png")),
+    'metadata': ('metadata', (".json",)),
+}
+
+MiB = 1024 * 1024
+PART_BYTES = 8 * MiB  # Multipart threshold and part size; local ETags are computed with the same split
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=PART_BYTES,
+    multipart_chunksize=PART_BYTES,
+    max_concurrency=int(os.environ.get('UPLOAD_CONCURRENCY', 32)),
+)
+
+
+def local_etag(path, size):
+    """The ETag S3 gives this file when uploaded with TRANSFER_CONFIG (plain MD5, or MD5-of-MD5s-N)."""
+    with open(path, 'rb') as f:
+        if size < PART_BYTES:
+            return hashlib.md5(f.read()).hexdigest()
+        parts = [hashlib.md5(chunk).digest() for chunk in iter(lambda: f.read(PART_BYTES), b'')]
+    return f"{hashlib.md5(b''.join(parts)).hexdigest()}-{len(parts)}"
+
+
+def list_remote(bucket_name, prefix):
+    """Return {key: (size, etag)} for everything under `prefix`, one paginated listing."""
+    remote = {}
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket_name, Prefix=f"{prefix}/"):
+        for obj in page.get('Contents', []):
+            remote[obj['Key']] = (obj['Size'], obj['ETag'].strip('"'))
+    return remote
+
+
+def plan_uploads(bucket_name):
+    """Diff the packaged assets against the bucket. Returns ([(path, key)], unchanged count)."""
+    uploads, unchanged = [], 0
+    for prefix, (directory, extensions) in ASSETS.items():
+        local_dir = os.path.join(TASK_ROOT, directory)
+        remote = list_remote(bucket_name, prefix)
+        for filename in os.listdir(local_dir):
+            if not filename.endswith(extensions):
+                continue
+            path = os.path.join(local_dir, filename)
+            s3_key = f"{prefix}/{filename}"
+            size = os.path.getsize(path)
+            # Sizes are compared first so only same-size files are hashed
+            if s3_key in remote and remote[s3_key][0] == size and remote[s3_key][1] == local_etag(path, size):
+                unchanged += 1
+            else:
+                uploads.append((path, s3_key))
+    return uploads, unchanged
+
+
 def handler(event, context):
     bucket_name = os.getenv('S3_BUCKET_NAME')
-    
-    # Local image and metadata directories inside Lambda package
-    image_dir = '/var/task/images'
-    metadata_dir = '/var/task/metadata'
-    
-    # Log directory contents
-    print("Contents of /var/task/images:", os.listdir(image_dir))
-    print("Contents of /var/task/metadata:", os.listdir(metadata_dir))
-    
-    # Upload images
-    for filename in os.listdir(image_dir):
-        if filename.endswith((".jpg", ".png")):
-            s3_key = f"images/{filename}"
-            try:
-                s3.head_object(Bucket=bucket_name, Key=s3_key)
-                print(f"{filename} already exists, skipping upload.")
-            except s3.exceptions.ClientError:
-                file_path = os.path.join(image_dir, filename)
-                s3.upload_file(file_path, bucket_name, s3_key)
-                print(f"Uploaded {filename} to {bucket_name}")
-    
-    # Upload metadata
-    for filename in os.listdir(metadata_dir):
-        if filename.endswith(".json"):
-            s3_key = f"metadata/{filename}"
+    started = time.time()
+    api_calls.clear()
+
+    uploads, unchanged = plan_uploads(bucket_name)
+    print(f"{len(uploads)} files to upload, {unchanged} already up to date "
+          f"(diffed in {time.time() - started:.1f}s)")
+
+    failed = []
+    with create_transfer_manager(s3, TRANSFER_CONFIG) as manager:
+        futures = [(s3_key, manager.upload(path, bucket_name, s3_key)) for path, s3_key in uploads]
+        for s3_key, future in futures:
             try:
-                s3.head_object(Bucket=bucket_name, Key=s3_key)
-                print(f"{filename} already exists, skipping upload.")
-            except s3.exceptions.ClientError:
-                file_path = os.path.join(metadata_dir, filename)
-                s3.upload_file(file_path, bucket_name, s3_key)
-                print(f"Uploaded {filename} to {bucket_name}")
-    
-    print("Lambda handler invoked")
-    return {"statusCode": 200, "body": "File upload check complete"}
+                future.result()
+            except Exception as e:
+                print(f"❌ Failed to upload {s3_key}: {e}")
+                failed.append(s3_key)
+
+    print(f"Uploaded {len(uploads) - len(failed)} files to {bucket_name} in {time.time() - started:.1f}s, "
+          f"S3 calls: {dict(api_calls)}")
+    return {
+        "statusCode": 500 if failed else 200,
+        "body": "File upload check complete",
+        "uploaded": len(uploads) - len(failed),
+        "unchanged": unchanged,
+        "failed": failed,
+        "apiCalls": dict(api_calls),
+    }
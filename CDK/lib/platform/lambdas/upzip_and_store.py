@@ -1,25 +1,225 @@
-import boto3
-import zipfile
+"""
+upzip_and_store.py
+
+Extracts ZIP archives uploaded to the raw uploads bucket into PROCESSED_BUCKET/extracted/:
+- Small archives (<= IN_MEMORY_MAX_BYTES) are read with a single GET, as before
+- Larger ones are never downloaded whole: S3RangeReader gives zipfile a seekable view of
+  the object backed by ranged GETs: one for the central directory, then one streamed GET
+  per member
+- Each member is streamed into S3 (multipart above PART_BYTES) by a bounded pool of
+  MEMBER_WORKERS threads shared by all records; the records of an event run concurrently
+
+Memory stays around MEMBER_WORKERS x (PART_CONCURRENCY + 1) x PART_BYTES
+whatever the archive size.
+"""
+
+import bisect
+import functools
 import io
+import os
+import struct
+import time
+import urllib.parse
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from boto3.s3.transfer import TransferConfig
 
 s3 = boto3.client('s3')
 
 RAW_BUCKET = "lab-sample-uploads"
-PROCESSED_BUCKET = "lab-processed-images"
+PROCESSED_BUCKET = os.environ.get('S3_BUCKET_NAME', "lab-processed-images")
+
+MiB = 1024 * 1024
+IN_MEMORY_MAX_BYTES = int(os.environ.get('UNZIP_IN_MEMORY_MAX_MB', 8)) * MiB
+TAIL_BYTES = 1 * MiB  # End of the archive fetched at once: the central directory of all but huge archives
+PART_BYTES = int(os.environ.get('UNZIP_PART_MB', 8)) * MiB  # Multipart threshold and part size
+PART_CONCURRENCY = int(os.environ.get('UNZIP_PART_CONCURRENCY', 2))  # Parts in flight per member
+MEMBER_WORKERS = int(os.environ.get('UNZIP_MEMBER_WORKERS', 8))  # Members uploading at once, across records
+RECORD_WORKERS = int(os.environ.get('UNZIP_RECORD_WORKERS', 4))  # Archives handled at once
+
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=PART_BYTES,
+    multipart_chunksize=PART_BYTES,
+    max_concurrency=PART_CONCURRENCY,
+)
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Read-only, seekable file over an S3 object, backed by streaming ranged GETs.
+
+    Sequential reads continue the open response body, so extracting a member costs one
+    GET however large it is. A GET stops at the next of `boundaries` (member offsets, once
+    the central directory is known). Until then, the last TAIL_BYTES of the object (where
+    the central directory lives) are fetched once and cached. Not thread-safe: one reader per
+    member.
+    """
+
+    def __init__(self, bucket, key, size=None, client=None):
+        self.client = client or s3
+        self.bucket = bucket
+        self.key = key
+        self.size = size if size is not None else self.client.head_object(Bucket=bucket, Key=key)['ContentLength']
+        self.position = 0
+        self.boundaries = [self.size]
+        self.body = None
+        self.body_position = self.body_end = 0
+        self.tail_start = self.size
+        self.tail = b''
+        self.cache_tail = True
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        self.position = max(0, self.position)
+        return self.position
+
+    def set_boundaries(self, offsets):
+        """Offsets a single GET should not read past (each member's local header, the central directory)."""
+        self.boundaries = sorted(set(offsets) | {self.size})
+        self.cache_tail = False  # Member reads stop at the central directory and never need the tail
+
+    def _get(self, start, end):
+        return self.client.get_object(Bucket=self.bucket, Key=self.key, Range=f"bytes={start}-{end - 1}")['Body']
+
+    def _open(self):
+        """Start a GET at the current position, up to the next boundary."""
+        self.close_body()
+        self.body_end = min(self.tail_start, self.boundaries[bisect.bisect_right(self.boundaries, self.position)])
+        self.body = self._get(self.position, self.body_end)
+        self.body_position = self.position
+
+    def close_body(self):
+        if self.body is not None:
+            self.body.close()
+            self.body = None
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self.position
+        end = min(self.position + size, self.size)
+        if end <= self.position:
+            return b''
+
+        if self.cache_tail and not self.tail and end > self.size - TAIL_BYTES:
+            self.tail_start = max(0, self.size - TAIL_BYTES)
+            self.tail = self._get(self.tail_start, self.size).read()
+        chunks = []
+        while self.position < end:
+            if self.position >= self.tail_start:
+                data = self.tail[self.position - self.tail_start:end - self.tail_start]
+            else:
+                if self.body is None or self.body_position != self.position or self.position >= self.body_end:
+                    self._open()
+                data = self.body.read(min(end, self.body_end) - self.position)
+                if not data:
+                    raise IOError(f"s3://{self.bucket}/{self.key}: stream ended at byte {self.position}")
+                self.body_position += len(data)
+            chunks.append(data)
+            self.position += len(data)
+        return b''.join(chunks)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self.close_body()
+        super().close()
+
+
+class ForwardOnly:
+    """
+    Hides seek() from s3transfer, which otherwise sizes a seekable file by seeking to its
+    end and back; on a ZipExtFile that means extracting (and downloading) each member twice.
+    """
+
+    def __init__(self, fileobj):
+        self.read = fileobj.read
+
+
+def open_ranged_member(bucket, key, size, boundaries, info):
+    """Open one member of a ZIP on S3 with its own reader: one GET from its local header to its end."""
+    if info.flag_bits & 0x1:
+        raise zipfile.BadZipFile(f"{info.filename}: encrypted members are not supported")
+    reader = S3RangeReader(bucket, key, size)
+    reader.set_boundaries(boundaries)
+    reader.seek(info.header_offset)
+    header = struct.unpack(zipfile.structFileHeader, reader.read(zipfile.sizeFileHeader))
+    if header[0] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"{info.filename}: bad local file header")
+    reader.read(header[10] + header[11])  # File name and extra field; read rather than seek to keep the stream
+    return zipfile.ZipExtFile(reader, 'rb', info, close_fileobj=True)
+
+
+def upload_member(open_member, member):
+    """Stream one member to PROCESSED_BUCKET."""
+    with open_member(member) as extracted_file:
+        s3.upload_fileobj(ForwardOnly(extracted_file), PROCESSED_BUCKET, f"extracted/{member.filename}",
+                          Config=TRANSFER_CONFIG)
+    return member.file_size
+
+
+def extract_archive(record, member_pool):
+    """Extract every file of the archive named by one S3 event record. Returns (members, bytes)."""
+    bucket = record['s3'].get('bucket', {}).get('name', RAW_BUCKET)
+    zip_key = urllib.parse.unquote_plus(record['s3']['object']['key'])
+    size = record['s3']['object'].get('size')
+    started = time.time()
+
+    if size is not None and size <= IN_MEMORY_MAX_BYTES:
+        # Download ZIP from S3; ZipFile.open is safe to share between the upload threads
+        zip_obj = s3.get_object(Bucket=bucket, Key=zip_key)
+        zip_ref = zipfile.ZipFile(io.BytesIO(zip_obj['Body'].read()), 'r')
+        open_member = zip_ref.open
+    else:
+        # Read the central directory once; each member then gets its own ranged GET
+        with zipfile.ZipFile(S3RangeReader(bucket, zip_key, size), 'r') as zip_ref:
+            size = zip_ref.fp.size
+            boundaries = [info.header_offset for info in zip_ref.infolist()] + [zip_ref.start_dir]
+        open_member = functools.partial(open_ranged_member, bucket, zip_key, size, boundaries)
+
+    with zip_ref:
+        members = [info for info in zip_ref.infolist() if not info.is_dir()]
+        futures = [member_pool.submit(upload_member, open_member, member) for member in members]
+        extracted = sum(future.result() for future in futures)
+    print(f"✅ Successfully extracted {len(members)} files ({extracted / MiB:.1f} MiB) from {zip_key} "
+          f"in {time.time() - started:.1f}s")
+    return len(members), extracted
+
 
 def lambda_handler(event, context):
-    for record in event['Records']:
-        zip_key = record['s3']['object']['key']
-
-        # Download ZIP from S3
-        zip_obj = s3.get_object(Bucket=RAW_BUCKET, Key=zip_key)
-        buffer = io.BytesIO(zip_obj['Body'].read())
-
-        # Extract ZIP contents
-        with zipfile.ZipFile(buffer, 'r') as zip_ref:
-            for file_name in zip_ref.namelist():
-                with zip_ref.open(file_name) as extracted_file:
-                    s3.upload_fileobj(
-                        extracted_file, PROCESSED_BUCKET, f"extracted/{file_name}"
-                    )
-        print(f"✅ Successfully extracted files from {zip_key}")
+    records = event.get('Records', [])
+    failures = []
+
+    with ThreadPoolExecutor(max_workers=MEMBER_WORKERS) as member_pool, \
+            ThreadPoolExecutor(max_workers=max(1, min(RECORD_WORKERS, len(records)))) as record_pool:
+        futures = {record_pool.submit(extract_archive, record, member_pool): record for record in records}
+        for future, record in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                print(f"❌ Failed to extract {record['s3']['object']['key']}: {e}")
+                failures.append(record['s3']['object']['key'])
+
+    if failures:
+        # Fail the invocation so S3 retries; extraction overwrites, so reprocessing is safe
+        raise RuntimeError(f"Failed to extract {len(failures)} of {len(records)} archives: {failures}")
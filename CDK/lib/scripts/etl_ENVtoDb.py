@@ -4,31 +4,29 @@ from awsglue.context import GlueContext
 from awsglue.job import Job
 from awsglue.transforms import *
 from awsglue.utils import getResolvedOptions
+from etl_common import CATALOG_DEFAULTS, EXPORT_DEFAULTS, OUTPUT_DEFAULTS, export_table, get_job_options
 
 # Initialize Glue job
 args = getResolvedOptions(sys.argv, ['JOB_NAME', 's3_output_path'])  # Get the s3_output_path argument
+options = get_job_options(sys.argv, {**OUTPUT_DEFAULTS, **EXPORT_DEFAULTS, **CATALOG_DEFAULTS})  # Optional output / incremental export / catalog settings
 sc = SparkContext()
 glueContext = GlueContext(sc)
 spark = glueContext.spark_session
 job = Job(glueContext)
 job.init(args['JOB_NAME'], args)
 
-# Read from DynamoDB table
+# Read from DynamoDB table (a full scan on every run, incremental or not: the connector has no key filter)
 dynamo_frame = glueContext.create_dynamic_frame.from_options(
     connection_type="dynamodb",
     connection_options={
         "dynamodb.input.tableName": "EnvDataTable",  # Replace with your table name
-        "dynamodb.throughput.read.percent": "1.0"   # Adjust throughput usage as needed
+        "dynamodb.throughput.read.percent": options['read_percent']   # Adjust throughput usage as needed
     }
 )
 
-# Step 3: Combine all data into a single JSON file and write it to S3
+# Step 3: Write the export to S3 (full rebuild, or only the dates inside the watermark lookback window)
 s3_output_path = args['s3_output_path']  # Use the passed S3 output path
-
-# Convert the AWS Glue DynamicFrame to a Spark DataFrame, reduce the output to a single partition 
-# (so the result is written as a single JSON file), and append the new data to the existing files 
-# in the specified S3 path without overwriting any existing data.
-dynamo_frame.toDF().coalesce(1).write.mode('overwrite').json(s3_output_path)
+export_table(dynamo_frame.toDF(), s3_output_path, 'env', options)
 
 # Step 4: Commit the job to signal completion
 job.commit()
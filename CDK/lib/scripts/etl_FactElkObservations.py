@@ -0,0 +1,31 @@
+import sys
+from pyspark.context import SparkContext
+from awsglue.context import GlueContext
+from awsglue.job import Job
+from awsglue.utils import getResolvedOptions
+from etl_common import CATALOG_DEFAULTS, EXPORT_DEFAULTS, OUTPUT_DEFAULTS, export_table, get_job_options, read_watermark
+from etl_fact import FACT_DEFAULTS, SENSOR_TYPE, build_fact, input_start, read_export
+
+# Initialize Glue job
+args = getResolvedOptions(sys.argv, ['JOB_NAME', 's3_output_path', 'gps_input_path', 'env_input_path', 'hea_input_path'])
+options = get_job_options(sys.argv, {**OUTPUT_DEFAULTS, **EXPORT_DEFAULTS, **CATALOG_DEFAULTS, **FACT_DEFAULTS})  # Optional output / incremental / catalog / join settings
+sc = SparkContext()
+glueContext = GlueContext(sc)
+spark = glueContext.spark_session
+job = Job(glueContext)
+job.init(args['JOB_NAME'], args)
+
+# Read the exports written by the etl_*toDb.py jobs; an incremental run only reads the dates it recomputes
+incremental = options['export_mode'] == 'incremental' and options['watermark_path']
+since = input_start(read_watermark(options['watermark_path']), options['lookback_hours']) if incremental else None
+hea = read_export(spark, args['hea_input_path'], options['input_format'], since)
+gps = read_export(spark, args['gps_input_path'], options['input_format'], since)
+env = read_export(spark, args['env_input_path'], options['input_format'], since)
+
+# One row per HEA reading with the elk's latest GPS fix and the nearest ENV sensor's latest reading
+fact = build_fact(hea, gps, env, options)
+
+# Write the fact table to S3 (full rebuild, or rewrite the dates inside the watermark lookback window)
+export_table(fact, args['s3_output_path'], SENSOR_TYPE, options)
+
+job.commit()
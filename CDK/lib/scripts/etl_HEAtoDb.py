@@ -5,9 +5,11 @@ from awsglue.job import Job
 from awsglue.utils import getResolvedOptions
 from pyspark.sql.functions import col, when
 from pyspark.sql.types import DoubleType, IntegerType, StringType
+from etl_common import CATALOG_DEFAULTS, EXPORT_DEFAULTS, OUTPUT_DEFAULTS, export_table, get_job_options
 
 # Glue’s insane parameter dance — because it refuses to just take config like a normal job
 args = getResolvedOptions(sys.argv, ['JOB_NAME', 's3_output_path'])
+options = get_job_options(sys.argv, {**OUTPUT_DEFAULTS, **EXPORT_DEFAULTS, **CATALOG_DEFAULTS})  # Optional output / incremental export / catalog settings
 
 # SparkContext is required because Glue runs on Spark under the hood (and it's weirdly verbose about it)
 sc = SparkContext()
@@ -17,12 +19,12 @@ job = Job(glueContext)
 job.init(args['JOB_NAME'], args)
 
 # Read from DynamoDB — and yes, Glue can't infer schema or flatten nested fields automatically, 
-# so you're gonna suffer if your JSON isn't simple
+# so you're gonna suffer if your JSON isn't simple. This is a full scan on every run, incremental or not
 dynamo_frame = glueContext.create_dynamic_frame.from_options(
     connection_type="dynamodb",
     connection_options={
         "dynamodb.input.tableName": "HeaDataTable",
-        "dynamodb.throughput.read.percent": "1.0"
+        "dynamodb.throughput.read.percent": options['read_percent']
     }
 )
 
@@ -47,7 +49,7 @@ df_clean = df.select(
 )
 
 
-# Write cleaned data to S3 as compact JSON
-df_clean.coalesce(1).write.mode('overwrite').json(args['s3_output_path'])
+# Write cleaned data to S3 — a full rebuild, or only the dates inside the last watermark's lookback window
+export_table(df_clean, args['s3_output_path'], 'hea', options)
 
 job.commit()
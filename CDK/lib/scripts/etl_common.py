@@ -0,0 +1,352 @@
+"""
+etl_common.py
+
+Helpers shared by the etl_*toDb.py Glue jobs. Only plain PySpark is used here so the
+same code runs under a local SparkSession (see CDK/testing) and inside Glue, where it
+is shipped alongside the job scripts with --extra-py-files.
+
+- Optional job arguments with defaults (getResolvedOptions only handles required ones)
+- JSON (legacy) or Parquet output, partitioned by sensor type and date
+- Incremental exports driven by a per-table Timestamp high-water mark, rewriting the
+  dates inside a lookback window so rows that reach DynamoDB late are still exported
+- Registering the Parquet output's table and partitions in the Glue Data Catalog as it is
+  written, so it is queryable without waiting for a crawler
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from pyspark.sql.functions import col, lit, max as spark_max, substring
+
+# Defaults for the optional job arguments; every key can be overridden with --<key> <value>
+OUTPUT_DEFAULTS = {
+    'output_format': 'json',  # 'json' keeps the single-file export, 'parquet' writes a partitioned dataset
+    'compression': 'snappy',  # Parquet codec: snappy or zstd
+    'target_file_mb': '128',  # Aim for files of roughly this size inside each partition
+    'approx_row_bytes': '48',  # Compressed bytes per row, used to turn target_file_mb into a row count
+}
+
+# Defaults for the incremental export arguments
+EXPORT_DEFAULTS = {
+    'export_mode': 'full',  # 'incremental' rewrites the dates since the watermark, 'full' rebuilds everything
+    'watermark_path': '',  # s3://bucket/key.json (or a local path) holding the table's high-water mark
+    'lookback_hours': '24',  # Incremental runs rewrite the dates from this long before the watermark (late rows)
+    'read_percent': '1.0',  # dynamodb.throughput.read.percent for the DynamoDB read
+}
+
+# Defaults for direct catalog registration; with no database the output is left to a crawler
+CATALOG_DEFAULTS = {
+    'catalog_database': '',  # Glue database holding the export tables (DataAnalyticsStack)
+    'catalog_table': '',  # Table name, e.g. processed_gps_data (what S3ResultsCrawler would call it)
+}
+
+PARTITION_COLUMNS = ['sensor_type', 'dt']
+PARTITION_BATCH = 100  # Most partitions BatchCreatePartition accepts per call
+
+PARQUET_FORMATS = {
+    'InputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat',
+    'OutputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat',
+    'SerdeInfo': {'SerializationLibrary': 'org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe'},
+}
+
+
+def get_job_options(argv, defaults):
+    """
+    Read optional `--key value` job arguments from argv, falling back to `defaults`.
+
+    Parameters:
+        argv (list): Usually sys.argv as passed to the Glue job.
+        defaults (dict): Option names (without leading dashes) and default values.
+
+    Returns:
+        dict: The resolved options.
+    """
+    options = dict(defaults)
+    for key in defaults:
+        flag = f'--{key}'
+        if flag in argv and argv.index(flag) + 1 < len(argv):
+            options[key] = argv[argv.index(flag) + 1]
+    return options
+
+
+def add_partition_columns(df, sensor_type):
+    """Add `sensor_type` and `dt` (YYYY-MM-DD taken from the Timestamp string) columns."""
+    return (df
+            .withColumn('sensor_type', lit(sensor_type))
+            .withColumn('dt', substring(col('Timestamp'), 1, 10)))
+
+
+def max_records_per_file(options):
+    """Rows per output file that approximate target_file_mb for this dataset."""
+    target_bytes = int(options['target_file_mb']) * 1024 * 1024
+    return max(1, target_bytes // max(1, int(options['approx_row_bytes'])))
+
+
+def write_output(df, output_path, sensor_type, options, mode='overwrite'):
+    """
+    Write a cleaned export DataFrame to `output_path` in the configured format.
+
+    JSON keeps the historical behaviour (one file, whole-path overwrite). Parquet is
+    written as sensor_type=<type>/dt=<date>/ partitions, one task per date so each
+    partition gets large files instead of one file per Spark partition, capped at
+    roughly target_file_mb each. In overwrite mode only the dates present in `df`
+    are replaced (dynamic partition overwrite).
+    """
+    if options['output_format'] == 'json':
+        df.coalesce(1).write.mode(mode).json(output_path)
+        return
+
+    if options['output_format'] != 'parquet':
+        raise ValueError(f"Unsupported output_format: {options['output_format']}")
+
+    df.sparkSession.conf.set('spark.sql.sources.partitionOverwriteMode', 'dynamic')
+    (add_partition_columns(df, sensor_type)
+        .repartition(*PARTITION_COLUMNS)
+        .write
+        .mode(mode)
+        .partitionBy(*PARTITION_COLUMNS)
+        .option('compression', options['compression'])
+        .option('maxRecordsPerFile', max_records_per_file(options))
+        .parquet(output_path))
+
+
+def read_watermark_state(path):
+    """Return the stored watermark document ({'watermark': ..., 'unregistered_dates': [...]}), or {}."""
+    if not path:
+        return {}
+    if path.startswith('s3://'):
+        import boto3
+        bucket, key = path[len('s3://'):].split('/', 1)
+        s3 = boto3.client('s3')
+        try:
+            body = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+        except s3.exceptions.NoSuchKey:
+            return {}
+    else:
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'rb') as f:
+            body = f.read()
+    return json.loads(body)
+
+
+def read_watermark(path):
+    """Return the stored high-water mark Timestamp, or None if there is none yet."""
+    return read_watermark_state(path).get('watermark')
+
+
+def write_watermark(path, watermark, unregistered_dates=None):
+    """
+    Persist the high-water mark Timestamp for the next incremental run, along with the
+    dates whose catalog partitions could not be registered (retried by the next run; the
+    orchestrator falls back to the crawler while there are any).
+    """
+    state = {'watermark': watermark}
+    if unregistered_dates:
+        state['unregistered_dates'] = sorted(unregistered_dates)
+    body = json.dumps(state).encode()
+    if path.startswith('s3://'):
+        import boto3
+        bucket, key = path[len('s3://'):].split('/', 1)
+        boto3.client('s3').put_object(Bucket=bucket, Key=key, Body=body)
+    else:
+        with open(path, 'wb') as f:
+            f.write(body)
+
+
+def rewrite_start(watermark, lookback_hours):
+    """
+    First date ('YYYY-MM-DD') an incremental run rewrites: the day `lookback_hours` before
+    `watermark`. Rows stored after the last run but older than the watermark (a collar
+    replaying its outbox, IoT Core retries) are picked up when they fall in those dates.
+    """
+    moment = datetime.fromisoformat(watermark[:19].replace(' ', 'T')) - timedelta(hours=float(lookback_hours))
+    return moment.date().isoformat()
+
+
+def catalog_columns(schema):
+    """Glue column list for a Spark schema (Hive type names; partition columns are keys, not columns)."""
+    return [{'Name': field.name, 'Type': field.dataType.simpleString()}
+            for field in schema.fields if field.name not in PARTITION_COLUMNS]
+
+
+def storage_descriptor(location, columns, compression):
+    return {
+        'Columns': columns,
+        'Location': location,
+        **PARQUET_FORMATS,
+        'Parameters': {'classification': 'parquet', 'compressionType': compression},
+    }
+
+
+def ensure_table(glue, database, table, location, columns, compression):
+    """
+    Create the export table, or add/retype columns when the export schema changed.
+    Columns that are no longer exported are kept so older partitions stay readable.
+
+    Returns:
+        str: 'created', 'updated' or 'unchanged'.
+    """
+    table_input = {
+        'Name': table,
+        'TableType': 'EXTERNAL_TABLE',
+        'PartitionKeys': [{'Name': name, 'Type': 'string'} for name in PARTITION_COLUMNS],
+        'Parameters': {'classification': 'parquet', 'EXTERNAL': 'TRUE'},
+    }
+    try:
+        current = glue.get_table(DatabaseName=database, Name=table)['Table']
+    except glue.exceptions.EntityNotFoundException:
+        glue.create_table(DatabaseName=database,
+                          TableInput={**table_input, 'StorageDescriptor': storage_descriptor(location, columns, compression)})
+        return 'created'
+
+    # The catalog stores column names lower-cased
+    merged = {column['Name'].lower(): column for column in current['StorageDescriptor']['Columns']}
+    changed = False
+    for column in columns:
+        name = column['Name'].lower()
+        if name not in merged or merged[name]['Type'] != column['Type']:
+            merged[name] = column
+            changed = True
+    if not changed:
+        return 'unchanged'
+    glue.update_table(DatabaseName=database,
+                      TableInput={**table_input,
+                                  'StorageDescriptor': storage_descriptor(location, list(merged.values()), compression)})
+    return 'updated'
+
+
+def register_partitions(glue, database, table, location, columns, sensor_type, dates, compression):
+    """
+    Add the sensor_type=<type>/dt=<date> partitions for `dates`, PARTITION_BATCH per call.
+    Partitions that are already registered are left as they are.
+
+    Returns:
+        int: Number of partitions added.
+    """
+    added = 0
+    dates = sorted(dates)
+    for start in range(0, len(dates), PARTITION_BATCH):
+        batch = dates[start:start + PARTITION_BATCH]
+        partitions = [{
+            'Values': [sensor_type, dt],
+            'StorageDescriptor': storage_descriptor(f"{location.rstrip('/')}/sensor_type={sensor_type}/dt={dt}/",
+                                                    columns, compression),
+        } for dt in batch]
+        errors = glue.batch_create_partition(DatabaseName=database, TableName=table,
+                                             PartitionInputList=partitions).get('Errors', [])
+        failed = [error for error in errors if error['ErrorDetail']['ErrorCode'] != 'AlreadyExistsException']
+        if failed:
+            raise RuntimeError(f"Failed to register {len(failed)} {sensor_type} partitions, "
+                               f"first: {failed[0]['PartitionValues']} {failed[0]['ErrorDetail']}")
+        added += len(batch) - len(errors)
+    return added
+
+
+def update_catalog(schema, dates, output_path, sensor_type, options, glue=None):
+    """
+    Make the export queryable straight away: create/update its table from `schema` and
+    register the partitions for `dates`. A few catalog calls instead of a crawl over the
+    whole output.
+
+    Returns:
+        tuple: (table change, partitions added).
+    """
+    if glue is None:
+        import boto3
+        glue = boto3.client('glue')
+    database, table = options['catalog_database'], options['catalog_table']
+    columns = catalog_columns(schema)
+    change = ensure_table(glue, database, table, output_path, columns, options['compression'])
+    added = register_partitions(glue, database, table, output_path, columns, sensor_type, dates,
+                                options['compression'])
+    print(f"Catalog {database}.{table}: table {change}, {added} of {len(dates)} partitions added")
+    return change, added
+
+
+def sync_catalog(schema, dates, output_path, sensor_type, options):
+    """
+    update_catalog, but a failure does not fail an export whose data and watermark can
+    still be written: the dates are handed back to be kept with the watermark and retried.
+    Without a watermark there is nowhere to keep them, so the error is raised.
+
+    Returns:
+        list: Dates still unregistered.
+    """
+    if not dates:
+        return []
+    try:
+        update_catalog(schema, dates, output_path, sensor_type, options)
+        return []
+    except Exception as e:
+        if not options['watermark_path']:
+            raise
+        print(f"Catalog registration failed, {len(dates)} {sensor_type} partitions left for the next run "
+              f"or the crawler: {e}")
+        return dates
+
+
+def export_table(df, output_path, sensor_type, options):
+    """
+    Write `df` either as a full rebuild or as an incremental update.
+
+    In incremental mode with Parquet output, every date from lookback_hours before the
+    stored watermark on is rewritten from `df` (dynamic partition overwrite, so the run
+    is idempotent and older dates are left alone), then the watermark moves to the newest
+    Timestamp written. Rows that arrive with a device Timestamp older than the lookback
+    window are not picked up; run with export_mode=full to backfill them. JSON output is
+    a single file, so there incremental runs append only the rows newer than the watermark.
+
+    This bounds what is written, not what is read: `df` is still the whole DynamoDB table,
+    since the Glue DynamoDB reader cannot push the Timestamp filter down to the scan.
+
+    With catalog_database set (Parquet output only) the table and the partitions written
+    are registered in the Glue Data Catalog right after the write.
+
+    Returns:
+        int: Number of rows written.
+    """
+    incremental = options['export_mode'] == 'incremental' and options['watermark_path']
+    state = read_watermark_state(options['watermark_path'])
+    watermark = state.get('watermark') if incremental else None
+    rewrite = watermark and options['output_format'] == 'parquet'
+    catalog = options.get('catalog_database') and options['output_format'] == 'parquet'
+    unregistered = set(state.get('unregistered_dates', [])) if catalog else set()
+
+    if rewrite:
+        since = rewrite_start(watermark, options['lookback_hours'])
+        df = df.filter(substring(col('Timestamp'), 1, 10) >= lit(since))
+        print(f"Incremental export of {sensor_type}: rewriting dates from {since} "
+              f"({options['lookback_hours']} h before watermark {watermark})")
+    elif watermark:
+        df = df.filter(col('Timestamp') > lit(watermark))
+        print(f"Incremental export of {sensor_type} after watermark {watermark}")
+    else:
+        print(f"Full export of {sensor_type}")
+
+    df = df.cache()
+    newest = df.agg(spark_max('Timestamp')).first()[0]
+    if newest is None:
+        print(f"No new {sensor_type} rows to export")
+        df.unpersist()
+        if unregistered:
+            # Nothing new, but partitions from an earlier run still need registering
+            remaining = sync_catalog(df.schema, sorted(unregistered), output_path, sensor_type, options)
+            write_watermark(options['watermark_path'], state['watermark'], remaining)
+        return 0
+
+    rows = df.count()
+    if catalog:
+        dates = {row[0] for row in df.select(substring(col('Timestamp'), 1, 10)).distinct().collect()}
+        unregistered |= dates
+    write_output(df, output_path, sensor_type, options, mode='append' if watermark and not rewrite else 'overwrite')
+    df.unpersist()
+
+    if watermark:
+        newest = max(newest, watermark)
+    if catalog:
+        unregistered = sync_catalog(df.schema, sorted(unregistered), output_path, sensor_type, options)
+    if options['watermark_path']:
+        write_watermark(options['watermark_path'], newest, unregistered)
+    print(f"Exported {rows} {sensor_type} rows, watermark now {newest}")
+    return rows
@@ -0,0 +1,216 @@
+"""
+etl_fact.py
+
+Builds the elk observations fact table from the GPS, ENV and HEA exports, so "what was
+elk X's heart rate, location and ambient temperature at time T" reads one table instead
+of joining all three exports at query time. Plain PySpark like etl_common, so it runs
+under a local SparkSession as well as in the etl_FactElkObservations.py Glue job.
+
+- One row per HEA reading
+- As-of join to the elk's latest GPS fix at or before the reading (within a tolerance)
+- Spatial join to the nearest ENV sensor (within a distance), then as-of join to that
+  sensor's latest reading
+- Written through etl_common.export_table, so it gets the same partitioned Parquet output,
+  incremental mode and catalog registration as the exports. An incremental run recomputes
+  every date in the lookback window, so a reading first joined before its GPS fix or ENV
+  reading was exported gets them filled in by a later run
+"""
+
+import datetime
+import math
+from pyspark.sql import Window
+from pyspark.sql import functions as F
+from pyspark.sql.types import StructType
+from etl_common import rewrite_start
+
+# Defaults for the fact job's own arguments; every key can be overridden with --<key> <value>
+FACT_DEFAULTS = {
+    'input_format': 'parquet',  # Format the exports were written in: 'parquet' or 'json'
+    'gps_tolerance_seconds': '900',  # Oldest GPS fix attached to a reading; older ones leave the position empty
+    'env_tolerance_seconds': '3600',  # Same for the ENV reading
+    'env_max_km': '10',  # Farthest ENV sensor attached to a reading
+    'hea_elk_id_offset': '1',  # HEA ElkId minus GPS elk index (the health collars count elk from 1)
+}
+
+SENSOR_TYPE = 'elk_observations'  # sensor_type partition value of the fact table
+SECONDS_PER_DAY = 86400
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+MAX_CELL_LATITUDE = 85.0  # Longitude cells are sized for this latitude at most
+
+
+def number(df, name):
+    """`name` as a double; Glue's DynamoDB reader sometimes nests numbers as {"double": ...}."""
+    data_type = df.schema[name].dataType
+    if isinstance(data_type, StructType):
+        return F.coalesce(*[F.col(f'{name}.{field.name}').cast('double') for field in data_type.fields])
+    return F.col(name).cast('double')
+
+
+def input_start(watermark, lookback_hours):
+    """
+    First date ('YYYY-MM-DD') to read from the exports when the fact table is already built
+    up to `watermark`: the day before the first date export_table rewrites, whose last
+    fixes the first recomputed readings may match.
+    """
+    if not watermark:
+        return None
+    first = datetime.date.fromisoformat(rewrite_start(watermark, lookback_hours))
+    return (first - datetime.timedelta(days=1)).isoformat()
+
+
+def read_export(spark, path, input_format, since=None):
+    """
+    Read one export written by etl_common.write_output. With `since` ('YYYY-MM-DD') only
+    rows from that date on are read; for Parquet the dt= partitions before it are skipped.
+    """
+    if input_format == 'parquet':
+        df = spark.read.parquet(path)
+        if since:
+            df = df.filter(F.col('dt') >= F.lit(since).cast('date'))
+        return df.drop('sensor_type', 'dt')
+    if input_format == 'json':
+        df = spark.read.json(path)
+        if since:
+            df = df.filter(F.substring(F.col('Timestamp'), 1, 10) >= since)
+        return df
+    raise ValueError(f"Unsupported input_format: {input_format}")
+
+
+def event_time(column='Timestamp'):
+    """Timestamp strings (ISO-8601 from GPS/ENV, 'YYYY-MM-DD HH:MM:SS' from HEA) as timestamps."""
+    return F.regexp_replace(F.col(column), 'T', ' ').cast('timestamp')
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance between two points in degrees."""
+    dlat = F.radians(lat2 - lat1)
+    dlon = F.radians(lon2 - lon1)
+    a = F.sin(dlat / 2) ** 2 + F.cos(F.radians(lat1)) * F.cos(F.radians(lat2)) * F.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * F.asin(F.sqrt(a))
+
+
+def asof_join(left, right, keys, right_time, tolerance_seconds):
+    """
+    Attach to every `left` row the latest `right` row with the same `keys` at or before
+    the left row's EventTime and at most `tolerance_seconds` older; otherwise the right
+    columns are null. `right` has `keys`, the timestamp column `right_time` and the
+    columns to attach, named as they should appear in the output.
+
+    Both sides are unioned and scanned in time order by a window per (keys, day), so no
+    partition holds more than a day of one key. The last right row of each day is also
+    copied into the next day, which is why the tolerance is capped at one day.
+    """
+    if tolerance_seconds > SECONDS_PER_DAY:
+        raise ValueError(f"asof_join tolerance is capped at {SECONDS_PER_DAY} s, got {tolerance_seconds}")
+    values = [name for name in right.columns if name not in keys]
+
+    matches = right.select(*keys, F.col(right_time).alias('_time'), F.to_date(right_time).alias('_day'),
+                           F.struct(*values).alias('_match'))
+    carried = (matches.groupBy(*keys, '_day')
+               .agg(F.max(F.struct('_time', '_match')).alias('_last'))
+               .select(*keys, F.col('_last._time').alias('_time'), F.date_add('_day', 1).alias('_day'),
+                       F.col('_last._match').alias('_match')))
+    rows = left.select(*keys, F.col('EventTime').alias('_time'), F.to_date('EventTime').alias('_day'),
+                       F.struct(*left.columns).alias('_left'))
+
+    # Right rows sort before left rows at the same time, so an exact-time match counts
+    match_type, left_type = matches.schema['_match'].dataType, rows.schema['_left'].dataType
+    combined = (rows.withColumn('_match', F.lit(None).cast(match_type)).withColumn('_side', F.lit(1))
+                .unionByName(matches.unionByName(carried)
+                             .withColumn('_left', F.lit(None).cast(left_type)).withColumn('_side', F.lit(0))))
+    window = (Window.partitionBy(*keys, '_day').orderBy('_time', '_side')
+              .rowsBetween(Window.unboundedPreceding, Window.currentRow))
+    joined = (combined
+              .withColumn('_match', F.last('_match', ignorenulls=True).over(window))
+              .filter(F.col('_side') == 1))
+
+    fresh = (F.col('_time').cast('double') - F.col(f'_match.{right_time}').cast('double')) <= tolerance_seconds
+    return joined.select('_left.*', *[F.when(fresh, F.col(f'_match.{name}')).alias(name) for name in values])
+
+
+def nearest_sensor(points, sensors, keys, max_km):
+    """
+    Attach EnvSensorId, EnvLatitude, EnvLongitude and EnvDistanceKm of the nearest sensor
+    within `max_km` to every row of `points` (which has Latitude, Longitude and the unique
+    `keys`); null when there is none.
+
+    Sensors are bucketed into cells `max_km` across and copied into the 8 cells around
+    their own, so an equi-join on the point's cell finds every sensor within `max_km`
+    without comparing each point with each sensor.
+    """
+    max_abs_latitude = sensors.agg(F.max(F.abs('EnvLatitude'))).first()[0]
+    if max_abs_latitude is None:  # No ENV readings at all
+        return (points.withColumn('EnvSensorId', F.lit(None).cast('string'))
+                .withColumn('EnvLatitude', F.lit(None).cast('double'))
+                .withColumn('EnvLongitude', F.lit(None).cast('double'))
+                .withColumn('EnvDistanceKm', F.lit(None).cast('double')))
+    cell_lat = max_km / KM_PER_DEGREE
+    widest = math.radians(min(MAX_CELL_LATITUDE, max_abs_latitude + cell_lat))
+    cell_lon = max_km / (KM_PER_DEGREE * math.cos(widest))
+
+    def cell(lat, lon):
+        return F.floor(lat / cell_lat).alias('_cell_lat'), F.floor(lon / cell_lon).alias('_cell_lon')
+
+    neighbours = F.array(*[F.lit(offset) for offset in (-1, 0, 1)])
+    candidates = (sensors.select('*', *cell(F.col('EnvLatitude'), F.col('EnvLongitude')))
+                  .withColumn('_up', F.explode(neighbours))
+                  .withColumn('_across', F.explode(neighbours))
+                  .select('*', (F.col('_cell_lat') + F.col('_up')).alias('_near_lat'),
+                          (F.col('_cell_lon') + F.col('_across')).alias('_near_lon'))
+                  .drop('_cell_lat', '_cell_lon', '_up', '_across')
+                  .withColumnRenamed('_near_lat', '_cell_lat')
+                  .withColumnRenamed('_near_lon', '_cell_lon'))
+    distance = distance_km(F.col('Latitude'), F.col('Longitude'), F.col('EnvLatitude'), F.col('EnvLongitude'))
+    nearest = (points.select(*keys, 'Latitude', 'Longitude', *cell(F.col('Latitude'), F.col('Longitude')))
+               .join(candidates, ['_cell_lat', '_cell_lon'])
+               .withColumn('EnvDistanceKm', distance)
+               .filter(F.col('EnvDistanceKm') <= max_km)
+               .groupBy(*keys)
+               .agg(F.min(F.struct('EnvDistanceKm', 'EnvSensorId', 'EnvLatitude', 'EnvLongitude')).alias('_nearest'))
+               .select(*keys, '_nearest.*'))
+    return points.join(nearest, keys, 'left')
+
+
+def build_fact(hea, gps, env, options):
+    """
+    One row per HEA reading with the elk's position and the nearest ambient reading.
+
+    Parameters:
+        hea, gps, env (DataFrame): The exports as written by the etl_*toDb.py jobs.
+        options (dict): FACT_DEFAULTS keys.
+
+    Returns:
+        DataFrame: The fact rows, with the HEA Timestamp string that export_table
+        partitions and watermarks on.
+    """
+    offset = int(options['hea_elk_id_offset'])
+    # SensorId + Timestamp is the HEA table's key; it identifies a reading through the joins
+    readings = hea.dropDuplicates(['SensorId', 'Timestamp']).select(
+        'ElkId', 'SensorId', 'Timestamp', event_time().alias('EventTime'),
+        (F.col('ElkId').cast('long') - offset).cast('string').alias('GpsElk'),
+        'HeartRate', 'RespirationRate', 'BodyTemperature', 'HydrationLevel', 'ActivityLevel', 'StressLevel',
+        'Posture')
+    fixes = gps.select(F.col('SensorId').cast('long').cast('string').alias('GpsElk'),
+                       event_time().alias('GpsTime'),
+                       number(gps, 'Latitude').alias('Latitude'), number(gps, 'Longitude').alias('Longitude'))
+    positioned = asof_join(readings, fixes, ['GpsElk'], 'GpsTime', float(options['gps_tolerance_seconds']))
+
+    ambient = env.select(F.col('SensorId').cast('string').alias('EnvSensorId'), event_time().alias('EnvTime'),
+                         number(env, 'Latitude').alias('EnvLatitude'), number(env, 'Longitude').alias('EnvLongitude'),
+                         number(env, 'Temperature').alias('Temperature'), number(env, 'Humidity').alias('Humidity'),
+                         F.col('WindDirection').cast('string').alias('WindDirection'))
+    # A sensor's position is where its most recent reading came from
+    sensors = (ambient.groupBy('EnvSensorId')
+               .agg(F.max(F.struct('EnvTime', 'EnvLatitude', 'EnvLongitude')).alias('_latest'))
+               .select('EnvSensorId', '_latest.EnvLatitude', '_latest.EnvLongitude')
+               .cache())
+    placed = nearest_sensor(positioned, sensors, ['SensorId', 'Timestamp'], float(options['env_max_km']))
+    observed = asof_join(placed, ambient.select('EnvSensorId', 'EnvTime', 'Temperature', 'Humidity', 'WindDirection'),
+                         ['EnvSensorId'], 'EnvTime', float(options['env_tolerance_seconds']))
+
+    return observed.select(
+        'ElkId', 'SensorId', 'Timestamp',
+        'HeartRate', 'RespirationRate', 'BodyTemperature', 'HydrationLevel', 'ActivityLevel', 'StressLevel', 'Posture',
+        'Latitude', 'Longitude', 'GpsTime',
+        'EnvSensorId', 'EnvDistanceKm', 'EnvTime', 'Temperature', 'Humidity', 'WindDirection')
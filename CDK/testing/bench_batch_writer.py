@@ -0,0 +1,80 @@
+"""
+bench_batch_writer.py
+
+Compares the old per-item put_item loop against the batched writer used by the
+*TopicProcessor Lambdas, against an in-process DynamoDB stand-in (moto).
+
+Usage:
+    pip install boto3 moto
+    python bench_batch_writer.py [--runs 5]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+import uuid
+from decimal import Decimal
+
+import local_dynamo
+import boto3
+from moto import mock_aws
+
+HERD_SIZES = [8, 100, 1000]
+
+
+def make_event(num_collars):
+    """Build a GPS IoT message shaped like configuration.create_topic output."""
+    return {
+        'messageId': str(uuid.uuid4()),
+        'topic': 'IoT/GPS',
+        'timestamp': time.time(),
+        'payload': [
+            {'elk_id': elk_id, 'lat': 53.0 + elk_id * 1e-5, 'lon': -127.0 - elk_id * 1e-5}
+            for elk_id in range(num_collars)
+        ],
+    }
+
+
+def put_item_loop(table, event):
+    """The pre-batching write path: one put_item per collar."""
+    timestamp = str(time.time())
+    for gps_data in event['payload']:
+        table.put_item(Item={
+            'SensorId': str(gps_data['elk_id']),
+            'Topic': event['topic'],
+            'Timestamp': timestamp,
+            'Latitude': Decimal(str(gps_data['lat'])),
+            'Longitude': Decimal(str(gps_data['lon'])),
+        })
+
+
+def time_it(fn, runs):
+    """Return the mean wall time of `fn()` over `runs` calls, in milliseconds (handler output muted)."""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(runs):
+            fn()
+    return (time.perf_counter() - started) * 1000 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Messages per herd size and write path')
+    args = parser.parse_args()
+
+    with mock_aws():
+        resource = boto3.resource('dynamodb')
+        table = local_dynamo.create_ingest_tables(resource)['GpsDataTable']
+        local_dynamo.use_resource(resource)
+        import GPSTopicProcessor
+
+        print(f"{'collars':>8} {'put_item ms/msg':>16} {'batched ms/msg':>15} {'speedup':>8}")
+        for num_collars in HERD_SIZES:
+            before = time_it(lambda: put_item_loop(table, make_event(num_collars)), args.runs)
+            after = time_it(lambda: GPSTopicProcessor.lambda_handler(make_event(num_collars), None), args.runs)
+            print(f"{num_collars:>8} {before:>16.1f} {after:>15.1f} {before / after:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
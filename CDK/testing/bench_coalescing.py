@@ -0,0 +1,173 @@
+"""
+bench_coalescing.py
+
+Local replay of multi-tick coalescing: an hour of GPS, ENV and HEA publish ticks goes
+through the transmitters' Coalescer (IoTMockSensors/IoT_GPS/coalescer.py) for several
+COALESCE_TICKS values, and every resulting message is handed to its topic processor
+against moto, as the IoT rule would. For each K it reports:
+- MQTT messages per second leaving the devices and Lambda invocations per hour
+- handler time per hour and ticks ingested per second of handler time
+- end-to-end delay per tick: waiting in the coalescer, plus a fixed IoT rule -> Lambda
+  dispatch delay (--dispatch-ms), plus the measured handler time
+and checks that every K stores the same rows, for JSON and compact (binary) messages.
+
+Usage:
+    pip install boto3 moto
+    python bench_coalescing.py [--hours 1] [--interval 5] [--ticks 1 2 4 8 16]
+"""
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+import local_dynamo
+import boto3
+from moto import mock_aws
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'IoTMockSensors', 'IoT_GPS'))
+from coalescer import Coalescer  # noqa: E402
+import compact_codec  # noqa: E402  (lib/lambda copy, first on sys.path)
+
+HEA_TIME_FORMAT = compact_codec.HEA_TIME_FORMAT
+
+
+def gps_tick(rng, now, state):
+    state.setdefault('elk', [[53.0 + rng.gauss(0, 0.01), -127.0 + rng.gauss(0, 0.01)] for _ in range(8)])
+    for elk in state['elk']:
+        elk[0] += rng.gauss(0, 1e-4)
+        elk[1] += rng.gauss(0, 1e-4)
+    return [{'elk_id': i, 'lat': round(lat, 6), 'lon': round(lon, 6)} for i, (lat, lon) in enumerate(state['elk'])]
+
+
+def env_tick(rng, now, state):
+    return [{'sensor_id': i, 'lat': 53.0, 'lon': round(-127.0 + i * 1e-3, 6),
+             'temperature': round(12 + rng.gauss(0, 1), 2), 'humidity': round(60 + rng.gauss(0, 5), 2),
+             'wind_direction': rng.choice(compact_codec.WIND_DIRECTIONS)} for i in range(10)]
+
+
+def hea_tick(rng, now, state):
+    stamp = time.strftime(HEA_TIME_FORMAT, time.gmtime(now))
+    return [{'sensor_id': i, 'elk_id': i + 1, 'timestamp': stamp,
+             'body_temperature': round(38.2 + rng.gauss(0, 0.2), 2), 'heart_rate': rng.randint(36, 44),
+             'respiration_rate': rng.randint(16, 24), 'activity_level': round(rng.random(), 3),
+             'posture': rng.choice(compact_codec.POSTURES), 'hydration_level': round(rng.uniform(70, 90), 2),
+             'stress_level': round(rng.uniform(0, 5), 3)} for i in range(8)]
+
+
+SENSORS = {  # kind -> (tick generator, processor module, table)
+    'gps': (gps_tick, 'GPSTopicProcessor', 'GpsDataTable'),
+    'env': (env_tick, 'ENVTopicProcessor', 'EnvDataTable'),
+    'hea': (hea_tick, 'HEATopicProcessor', 'HeaDataTable'),
+}
+
+
+def ticks(kind, count, interval, seed):
+    """create_topic()-shaped messages, one per publish interval, starting at a whole second."""
+    rng, state = random.Random(seed), {}
+    start = 1_760_000_000.0
+    generate = SENSORS[kind][0]
+    return [{'messageId': str(uuid.UUID(int=rng.getrandbits(128), version=4)), 'topic': f'IoT/{kind.upper()}',
+             'timestamp': start + i * interval, 'payload': generate(rng, start + i * interval, state)}
+            for i in range(count)]
+
+
+def to_event(kind, message, encoding):
+    """The Lambda event the IoT rule would deliver for this message."""
+    if encoding == 'compact':
+        return {'payload_b64': base64.b64encode(compact_codec.encode(kind, message)).decode(),
+                'topic': message['topic'] + compact_codec.BINARY_TOPIC_SUFFIX}
+    return json.loads(json.dumps(message))
+
+
+def reset_tables(resource):
+    for table in resource.tables.all():
+        table.delete()
+    return local_dynamo.create_ingest_tables(resource)
+
+
+def rows(table):
+    """Every item in `table`; a Scan returns at most 1 MB per page."""
+    page = table.scan()
+    items = page['Items']
+    while 'LastEvaluatedKey' in page:
+        page = table.scan(ExclusiveStartKey=page['LastEvaluatedKey'])
+        items += page['Items']
+    return sorted((item['SensorId'], item['Timestamp'], json.dumps(item, sort_keys=True, default=str))
+                  for item in items)
+
+
+def replay(resource, kind, stream, max_ticks, dispatch_seconds, encoding='json'):
+    tables = reset_tables(resource)
+    processor = __import__(SENSORS[kind][1])
+    coalescer = Coalescer(max_ticks)
+    messages = [message for tick in stream for message in coalescer.add(tick)] + coalescer.flush()
+
+    handler_seconds, delays, sizes = 0.0, [], []
+    for message in messages:
+        event = to_event(kind, message, encoding)
+        sizes.append(len(event['payload_b64']) if encoding == 'compact' else len(json.dumps(message)))
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = processor.lambda_handler(event, None)
+        elapsed = time.perf_counter() - started
+        handler_seconds += elapsed
+        assert result and result['duplicates'] == 0, result
+        sent_at = message['timestamp']  # A coalesced message leaves with its last tick
+        for snapshot in compact_codec.snapshots(message):
+            delays.append(sent_at - snapshot['timestamp'] + dispatch_seconds + elapsed)
+    return {'messages': len(messages), 'handler_seconds': handler_seconds, 'delays': delays,
+            'max_bytes': max(sizes), 'rows': rows(tables[SENSORS[kind][2]])}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', type=float, default=1.0)
+    parser.add_argument('--interval', type=float, default=5.0, help='Publish interval of every sensor (s)')
+    parser.add_argument('--ticks', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='COALESCE_TICKS values')
+    parser.add_argument('--dispatch-ms', type=float, default=40.0, help='IoT rule -> Lambda dispatch delay')
+    parser.add_argument('--sensors', nargs='+', default=list(SENSORS), choices=list(SENSORS))
+    args = parser.parse_args()
+    count = int(args.hours * 3600 / args.interval)
+    dispatch = args.dispatch_ms / 1000
+
+    with mock_aws():
+        resource = boto3.resource('dynamodb')
+        local_dynamo.use_resource(resource)
+        for kind in args.sensors:
+            stream = ticks(kind, count, args.interval, seed=list(SENSORS).index(kind))
+            print(f"\n{kind.upper()}: {count} ticks, one every {args.interval:g} s")
+            print(f"{'K':>4}{'msg/s':>9}{'invocations/h':>15}{'max bytes':>11}{'handler s/h':>13}"
+                  f"{'ticks/handler s':>17}{'delay mean s':>14}{'p95 s':>8}")
+            baseline = None
+            for max_ticks in args.ticks:
+                result = replay(resource, kind, stream, max_ticks, dispatch)
+                if baseline is None:
+                    baseline = result['rows']
+                assert result['rows'] == baseline, f"K={max_ticks} stored different rows than K={args.ticks[0]}"
+                per_hour = 3600 / (count * args.interval)
+                print(f"{max_ticks:>4}{result['messages'] / (count * args.interval):>9.3f}"
+                      f"{result['messages'] * per_hour:>15.0f}{result['max_bytes']:>11}"
+                      f"{result['handler_seconds'] * per_hour:>13.2f}{count / result['handler_seconds']:>17.0f}"
+                      f"{statistics.mean(result['delays']):>14.2f}{percentile(result['delays'], 0.95):>8.2f}")
+
+            compact = replay(resource, kind, stream, args.ticks[-1], dispatch, encoding='compact')
+            assert len(compact['rows']) == len(baseline), (len(compact['rows']), len(baseline))
+            print(f"✅ same {len(baseline)} rows for every K; compact K={args.ticks[-1]} messages "
+                  f"(max {compact['max_bytes']} bytes base64) store them too")
+
+
+if __name__ == '__main__':
+    main()
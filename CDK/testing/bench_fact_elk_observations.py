@@ -0,0 +1,231 @@
+"""
+bench_fact_elk_observations.py
+
+Local run of the elk observations fact job (lib/scripts/etl_fact.py) on synthetic GPS,
+ENV and HEA exports written the way the etl_*toDb.py jobs write them, reporting:
+- job time: reading the three Parquet exports, joining, and writing the fact table
+- bytes scanned for "heart rate, position and ambient temperature of one elk over one
+  day": joined at query time over the JSON exports (whole files), over the Parquet
+  exports (the needed columns of that day, plus the day before for the GPS/ENV rows
+  the first readings match), and read from the fact table
+- time to answer that query in Spark both ways
+and checks the fact rows for that elk and day against a brute-force lookup of the
+latest GPS fix, the nearest ENV sensor and its latest reading. It also checks that an
+incremental run fills in readings first joined before their GPS/ENV exports landed.
+
+Usage:
+    pip install pyspark pyarrow
+    python bench_fact_elk_observations.py [--hea-rows 1000000] [--elk 100] [--env-sensors 10]
+"""
+
+import argparse
+import datetime
+import math
+import os
+import tempfile
+import time
+
+from pyspark.sql import functions as F
+
+from local_spark import spark_session, synthetic_env, synthetic_gps, synthetic_hea
+from compare_etl_formats import parquet_scan_bytes, total_bytes
+from etl_common import CATALOG_DEFAULTS, EXPORT_DEFAULTS, OUTPUT_DEFAULTS, export_table, read_watermark, write_output
+from etl_fact import FACT_DEFAULTS, SENSOR_TYPE, build_fact, input_start, read_export
+
+EPOCH = '2025-01-01 00:00:00'
+HEA_EPOCH = '2025-01-01 00:02:30'  # Health readings fall between GPS fixes, so the as-of join has work to do
+STEPS = {'gps': 300, 'env': 600, 'hea': 900}  # Seconds between readings of one collar/sensor
+QUERY_COLUMNS = {
+    'hea': ['ElkId', 'Timestamp', 'HeartRate'],
+    'gps': ['SensorId', 'Timestamp', 'Latitude', 'Longitude'],
+    'env': ['SensorId', 'Timestamp', 'Latitude', 'Longitude', 'Temperature'],
+    SENSOR_TYPE: ['ElkId', 'Timestamp', 'HeartRate', 'Latitude', 'Longitude', 'Temperature'],
+}
+PARQUET = dict(OUTPUT_DEFAULTS, **EXPORT_DEFAULTS, **CATALOG_DEFAULTS, output_format='parquet')
+
+
+def synthetic_exports(spark, hea_rows, num_elk, num_sensors):
+    """The three exports covering the same span; HEA ElkIds count from 1 like the collars send them."""
+    span = hea_rows // num_elk * STEPS['hea']
+    hea = (synthetic_hea(spark, hea_rows, num_elk, epoch=HEA_EPOCH, step_seconds=STEPS['hea'])
+           .withColumn('ElkId', (F.col('ElkId').cast('int') + 1).cast('string')))
+    gps = synthetic_gps(spark, span // STEPS['gps'] * num_elk, num_elk, epoch=EPOCH, step_seconds=STEPS['gps'])
+    env = synthetic_env(spark, span // STEPS['env'] * num_sensors, num_sensors, epoch=EPOCH,
+                        step_seconds=STEPS['env'])
+    return {'hea': hea, 'gps': gps, 'env': env}
+
+
+def fact_job(spark, paths, fact_path, options):
+    """What etl_FactElkObservations.py does, on local paths."""
+    incremental = options['export_mode'] == 'incremental' and options['watermark_path']
+    since = input_start(read_watermark(options['watermark_path']), options['lookback_hours']) if incremental else None
+    inputs = {kind: read_export(spark, path, 'parquet', since) for kind, path in paths.items()}
+    return export_table(build_fact(inputs['hea'], inputs['gps'], inputs['env'], FACT_DEFAULTS),
+                        fact_path, SENSOR_TYPE, options)
+
+
+def check_late_exports(spark, out, late_hours=6):
+    """
+    Build the fact table incrementally while the last `late_hours` of GPS and ENV rows are
+    not exported yet, export them, run again: the result must match a full rebuild.
+    """
+    exports = synthetic_exports(spark, 20_000, 20, 5)
+    newest = exports['hea'].agg(F.max('Timestamp')).first()[0]
+    cutoff = (parse(newest) - datetime.timedelta(hours=late_hours)).isoformat()
+    paths = {kind: os.path.join(out, 'late', f'{kind}_data') for kind in exports}
+    fact_path, full_path = os.path.join(out, 'late', 'fact'), os.path.join(out, 'late', 'fact_full')
+    options = dict(PARQUET, export_mode='incremental', watermark_path=os.path.join(out, 'late', 'fact.json'))
+
+    for kind, df in exports.items():
+        landed = df if kind == 'hea' else df.filter(F.regexp_replace('Timestamp', ' ', 'T') <= cutoff)
+        write_output(landed, paths[kind], kind, PARQUET)
+    fact_job(spark, paths, fact_path, options)
+    unlocated = spark.read.parquet(fact_path).filter(F.col('Latitude').isNull()).count()
+    for kind in ('gps', 'env'):
+        write_output(exports[kind], paths[kind], kind, PARQUET)
+    fact_job(spark, paths, fact_path, options)
+    fact_job(spark, paths, full_path, dict(options, export_mode='full', watermark_path=''))
+
+    columns = QUERY_COLUMNS[SENSOR_TYPE] + ['EnvSensorId', 'GpsTime', 'EnvTime']
+    incremental, full = (spark.read.parquet(path).select(columns) for path in (fact_path, full_path))
+    missing, extra = full.exceptAll(incremental).count(), incremental.exceptAll(full).count()
+    assert unlocated > 0, "every reading had a GPS fix before the late exports landed"
+    assert missing == 0 and extra == 0, f"incremental fact differs from a rebuild: {missing} missing, {extra} extra"
+    print(f"✅ late GPS/ENV exports: {unlocated:,} readings joined without a position were filled in by the "
+          f"next incremental run (matches a full rebuild)")
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def read_days(spark, path, days):
+    """One Parquet export, only the dt= partitions for `days`."""
+    return spark.read.parquet(path).filter(F.col('dt').cast('string').isin(*days)).drop('sensor_type', 'dt')
+
+
+def query_time_join(spark, paths, elk_id, day, previous_day):
+    """The query without the fact table: join the exports for one elk and day."""
+    exports = {kind: read_days(spark, path, [previous_day, day]) for kind, path in paths.items()}
+    hea = exports['hea'].filter((F.col('ElkId') == elk_id) & F.col('Timestamp').startswith(day))
+    return build_fact(hea, exports['gps'], exports['env'], FACT_DEFAULTS).collect()
+
+
+def fact_query(spark, fact_path, elk_id, day):
+    return (spark.read.parquet(fact_path)
+            .filter((F.col('dt').cast('string') == day) & (F.col('ElkId') == elk_id))
+            .select(*QUERY_COLUMNS[SENSOR_TYPE], 'EnvSensorId', 'EnvDistanceKm', 'GpsTime', 'EnvTime')
+            .collect())
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    dlat, dlon = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+def parse(timestamp):
+    return datetime.datetime.fromisoformat(timestamp.replace(' ', 'T'))
+
+
+def latest(readings, moment, tolerance):
+    """Newest (time, row) at or before `moment` and at most `tolerance` seconds older, else None."""
+    eligible = [(t, row) for t, row in readings if t <= moment and (moment - t).total_seconds() <= tolerance]
+    return max(eligible, key=lambda pair: pair[0]) if eligible else None
+
+
+def check_against_brute_force(exports, rows, elk_id, previous_day, day):
+    """Recompute each fact row from the raw exports with plain Python loops."""
+    gps_elk = str(int(elk_id) - int(FACT_DEFAULTS['hea_elk_id_offset']))
+    window = F.col('Timestamp').substr(1, 10).isin(previous_day, day)
+    fixes = [(parse(r.Timestamp), r) for r in exports['gps'].filter(window & (F.col('SensorId') == gps_elk)).collect()]
+    ambient = {}
+    for r in exports['env'].filter(window).collect():
+        ambient.setdefault(r.SensorId, []).append((parse(r.Timestamp), r))
+    sensors = {sensor: max(readings, key=lambda pair: pair[0])[1] for sensor, readings in ambient.items()}
+
+    max_km = float(FACT_DEFAULTS['env_max_km'])
+    for row in rows:
+        moment = parse(row.Timestamp)
+        fix = latest(fixes, moment, float(FACT_DEFAULTS['gps_tolerance_seconds']))
+        assert fix and math.isclose(fix[1].Latitude, row.Latitude) and math.isclose(fix[1].Longitude, row.Longitude), \
+            (row, fix)
+        distances = {sensor: haversine_km(row.Latitude, row.Longitude, r.Latitude, r.Longitude)
+                     for sensor, r in sensors.items()}
+        nearest = min(distances, key=distances.get)
+        if distances[nearest] > max_km:
+            assert row.EnvSensorId is None, (row, distances[nearest])
+            continue
+        # Sensors can share a position in the synthetic data; any of the nearest will do
+        assert math.isclose(row.EnvDistanceKm, distances[nearest], abs_tol=1e-6), (row, distances[nearest])
+        reading = latest(ambient[row.EnvSensorId], moment, float(FACT_DEFAULTS['env_tolerance_seconds']))
+        assert reading and math.isclose(reading[1].Temperature, row.Temperature), (row, reading)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hea-rows', type=int, default=1_000_000)
+    parser.add_argument('--elk', type=int, default=100)
+    parser.add_argument('--env-sensors', type=int, default=10)
+    parser.add_argument('--elk-id', default='2', help='ElkId (HEA numbering) the query asks about')
+    args = parser.parse_args()
+
+    spark = spark_session()
+    exports = {kind: df.cache() for kind, df in synthetic_exports(spark, args.hea_rows, args.elk,
+                                                                  args.env_sensors).items()}
+    counts = {kind: df.count() for kind, df in exports.items()}
+    first_day = datetime.date.fromisoformat(EPOCH[:10])
+    previous_day, day = first_day.isoformat(), (first_day + datetime.timedelta(days=1)).isoformat()
+
+    with tempfile.TemporaryDirectory() as out:
+        paths = {kind: os.path.join(out, f'{kind}_data') for kind in exports}
+        json_paths = {kind: os.path.join(out, 'json', f'{kind}_data') for kind in exports}
+        for kind, df in exports.items():
+            write_output(df, paths[kind], kind, PARQUET)
+            write_output(df, json_paths[kind], kind, dict(PARQUET, output_format='json'))
+        fact_path = os.path.join(out, 'fact_elk_observations')
+
+        fact_rows, job_seconds = timed(lambda: fact_job(spark, paths, fact_path, PARQUET))
+        assert fact_rows == counts['hea'], (fact_rows, counts['hea'])
+        fact = spark.read.parquet(fact_path)
+        located = fact.filter(F.col('Latitude').isNotNull()).count()
+        ambient = fact.filter(F.col('Temperature').isNotNull()).count()
+
+        print(f"exports: {counts['hea']:,} HEA, {counts['gps']:,} GPS, {counts['env']:,} ENV rows "
+              f"({args.elk} elk, {args.env_sensors} ENV sensors)")
+        print(f"fact job: {job_seconds:.1f} s for {fact_rows:,} rows ({fact_rows / job_seconds:,.0f} rows/s), "
+              f"{total_bytes(fact_path, '**/*.parquet'):,} bytes; {located / fact_rows:.1%} with a GPS fix, "
+              f"{ambient / fact_rows:.1%} with an ENV reading")
+
+        joined, join_seconds = timed(lambda: query_time_join(spark, paths, args.elk_id, day, previous_day))
+        answered, fact_seconds = timed(lambda: fact_query(spark, fact_path, args.elk_id, day))
+        key = lambda r: r.Timestamp
+        assert [(r.Timestamp, r.HeartRate, r.Latitude, r.Temperature) for r in sorted(joined, key=key)] == \
+               [(r.Timestamp, r.HeartRate, r.Latitude, r.Temperature) for r in sorted(answered, key=key)]
+        checked = check_against_brute_force(exports, answered, args.elk_id, previous_day, day)
+        print(f"✅ {checked} fact rows for ElkId {args.elk_id} on {day} match the query-time join and a "
+              f"brute-force lookup")
+
+        json_scan = sum(total_bytes(path, '*.json') for path in json_paths.values())
+        export_scan = parquet_scan_bytes(paths['hea'], day, QUERY_COLUMNS['hea']) + sum(
+            parquet_scan_bytes(paths[kind], dt, QUERY_COLUMNS[kind])
+            for kind in ('gps', 'env') for dt in (previous_day, day))
+        fact_scan = parquet_scan_bytes(fact_path, day, QUERY_COLUMNS[SENSOR_TYPE])
+        print(f"\nquery: ElkId {args.elk_id} on {day}, heart rate + position + ambient temperature")
+        print(f"{'approach':<36}{'tables':>7}{'scan bytes':>14}{'spark s':>9}")
+        print(f"{'JSON exports, joined at query time':<36}{3:>7}{json_scan:>14,}{'-':>9}")
+        print(f"{'Parquet exports, joined at query':<36}{3:>7}{export_scan:>14,}{join_seconds:>9.2f}")
+        print(f"{'fact table':<36}{1:>7}{fact_scan:>14,}{fact_seconds:>9.2f}")
+        print(f"fact table scans {json_scan / max(fact_scan, 1):,.0f}x fewer bytes than the JSON exports and "
+              f"{export_scan / max(fact_scan, 1):.1f}x fewer than the Parquet exports")
+
+        check_late_exports(spark, out)
+
+    spark.stop()
+
+
+if __name__ == '__main__':
+    main()
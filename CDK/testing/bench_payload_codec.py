@@ -0,0 +1,95 @@
+"""
+bench_payload_codec.py
+
+Compares the JSON message format with the compact binary format (lib/lambda/compact_codec.py)
+for all three sensor kinds: bytes per record on the wire and encode/decode throughput.
+Decode is measured on the Lambda path, i.e. including the base64 step the binary IoT rule adds.
+
+Usage:
+    python bench_payload_codec.py [--records 8 100 1000] [--seconds 1.0]
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib', 'lambda'))
+import compact_codec  # noqa: E402
+
+
+def make_message(kind, count, rng):
+    """Build a message shaped like the sensor containers' configuration.create_topic output."""
+    if kind == 'gps':
+        payload = [{'elk_id': i, 'lat': 53.0 + rng.gauss(0, 0.01), 'lon': -127.0 + rng.gauss(0, 0.01)}
+                   for i in range(count)]
+    elif kind == 'env':
+        payload = [{'sensor_id': i, 'lat': 53.0 + rng.gauss(0, 0.1), 'lon': -127.0 + rng.gauss(0, 0.1),
+                    'temperature': rng.uniform(-5, 30), 'humidity': rng.uniform(20, 100),
+                    'wind_direction': rng.choice(compact_codec.WIND_DIRECTIONS)}
+                   for i in range(count)]
+    else:
+        stamp = time.strftime(compact_codec.HEA_TIME_FORMAT, time.gmtime())
+        payload = [{'sensor_id': i, 'elk_id': i + 1, 'timestamp': stamp,
+                    'body_temperature': round(rng.uniform(36.5, 39.5), 1), 'heart_rate': rng.randint(30, 50),
+                    'respiration_rate': rng.randint(10, 35), 'activity_level': round(rng.random(), 2),
+                    'posture': rng.choice(compact_codec.POSTURES), 'hydration_level': round(rng.uniform(50, 100), 1),
+                    'stress_level': round(rng.uniform(0, 10), 2)}
+                   for i in range(count)]
+    return {'messageId': str(uuid.uuid4()), 'topic': f'IoT/{kind.upper()}', 'timestamp': time.time(),
+            'payload': payload}
+
+
+def rate(fn, seconds):
+    """Calls per second of `fn` over roughly `seconds` of wall time."""
+    calls, started = 0, time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        fn()
+        calls += 1
+    return calls / (time.perf_counter() - started)
+
+
+def max_error(kind, original, decoded):
+    """Largest absolute difference introduced by fixed-point quantization."""
+    worst = 0.0
+    for a, b in zip(original['payload'], decoded['payload']):
+        for field, field_type, _ in compact_codec.SCHEMAS[kind][1]:
+            if field_type == 'fixed':
+                worst = max(worst, abs(a[field] - b[field]))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, nargs='+', default=[8, 100, 1000])
+    parser.add_argument('--seconds', type=float, default=1.0)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    print(f"{'kind':<5}{'records':>8}{'json B/rec':>12}{'bin B/rec':>11}{'ratio':>7}"
+          f"{'json enc rec/s':>16}{'bin enc rec/s':>15}{'json dec rec/s':>16}{'bin dec rec/s':>15}{'max err':>10}")
+    for kind in ('gps', 'env', 'hea'):
+        for count in args.records:
+            message = make_message(kind, count, rng)
+            as_json = json.dumps(message)
+            as_binary = compact_codec.encode(kind, message)
+            event = {'payload_b64': base64.b64encode(as_binary).decode(), 'topic': f'IoT/{kind.upper()}/bin'}
+            decoded = compact_codec.decode_event(event)
+            assert decoded['messageId'] == message['messageId'] and len(decoded['payload']) == count
+
+            json_enc = rate(lambda: json.dumps(message), args.seconds) * count
+            bin_enc = rate(lambda: compact_codec.encode(kind, message), args.seconds) * count
+            json_dec = rate(lambda: json.loads(as_json), args.seconds) * count
+            bin_dec = rate(lambda: compact_codec.decode_event(event), args.seconds) * count
+
+            print(f"{kind:<5}{count:>8}{len(as_json) / count:>12.1f}{len(as_binary) / count:>11.1f}"
+                  f"{len(as_json) / len(as_binary):>7.1f}{json_enc:>16,.0f}{bin_enc:>15,.0f}"
+                  f"{json_dec:>16,.0f}{bin_dec:>15,.0f}{max_error(kind, message, decoded):>10.1e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""
+bench_unzip_and_store.py
+
+Wall time and peak memory of the upzip_and_store Lambda (lib/platform/lambdas) on
+multi-GB archives, against a local S3 stand-in (moto server in its own process, so
+only the handler's memory is measured):
+- streaming: ranged-GET central directory + member reads, concurrent multipart uploads
+- legacy: the previous handler (whole object into BytesIO, members uploaded one by one),
+  only run up to --legacy-max-gb since it needs the archive in memory
+
+moto answers every ranged GET by loading the whole object first, so each GET costs time
+proportional to the archive size (real S3 does not). The time spent waiting for GET
+responses is summed over all threads ("GET wait", thread-seconds), and the latency of a
+1-byte ranged GET of the archive is printed so that overhead can be told apart.
+
+The archive holds --members incompressible members (camera-trap images are already
+compressed, so they are STORED) plus a deflated CSV. Every run checks that all members
+arrived with the right size, and that one of them is byte-identical.
+
+Usage:
+    pip install boto3 "moto[server]"
+    python bench_unzip_and_store.py [--size-gb 2] [--members 40] [--records 2] [--legacy-max-gb 1]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import boto3
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib', 'platform', 'lambdas')
+RAW_BUCKET = 'lab-sample-uploads'
+PROCESSED_BUCKET = 'lab-processed-images'
+
+LEGACY_HANDLER = '''
+import io, zipfile
+def lambda_handler(event, context):
+    for record in event['Records']:
+        zip_key = record['s3']['object']['key']
+        zip_obj = s3.get_object(Bucket=RAW_BUCKET, Key=zip_key)
+        buffer = io.BytesIO(zip_obj['Body'].read())
+        with zipfile.ZipFile(buffer, 'r') as zip_ref:
+            for file_name in zip_ref.namelist():
+                with zip_ref.open(file_name) as extracted_file:
+                    s3.upload_fileobj(extracted_file, PROCESSED_BUCKET, f"extracted/{file_name}")
+'''
+
+# Runs in a fresh interpreter so ru_maxrss is the handler's own peak
+RUNNER = '''
+import json, resource, sys, time
+sys.path.insert(0, sys.argv[1])
+import upzip_and_store as handler
+if sys.argv[2] == 'legacy':
+    exec(sys.argv[4], handler.__dict__)
+event = json.loads(sys.argv[3])
+gets = {'count': 0, 'seconds': 0.0}
+get_object = handler.s3.get_object
+def timed_get_object(**kwargs):
+    started = time.perf_counter()
+    try:
+        return get_object(**kwargs)
+    finally:
+        gets['count'] += 1
+        gets['seconds'] += time.perf_counter() - started
+handler.s3.get_object = timed_get_object
+started = time.perf_counter()
+handler.lambda_handler(event, None)
+print(json.dumps({'seconds': time.perf_counter() - started, 'gets': gets['count'], 'get_seconds': gets['seconds'],
+                  'peak_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_moto(port):
+    server = subprocess.Popen([sys.executable, '-m', 'moto.server', '-p', str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("moto server did not start")
+
+
+def build_archive(path, size_bytes, members):
+    """Write a ZIP of `members` random (stored) files totalling `size_bytes`, plus a deflated CSV."""
+    member_bytes = size_bytes // members
+    chunk = 8 * 1024 * 1024
+    digests = {}
+    with zipfile.ZipFile(path, 'w', allowZip64=True) as archive:
+        for index in range(members):
+            name = f"images/IMG_{index:05d}.jpg"
+            digest = hashlib.sha256()
+            with archive.open(zipfile.ZipInfo(name), 'w', force_zip64=True) as member:
+                remaining = member_bytes
+                while remaining:
+                    data = os.urandom(min(chunk, remaining))
+                    digest.update(data)
+                    member.write(data)
+                    remaining -= len(data)
+            digests[name] = (member_bytes, digest.hexdigest())
+        rows = ''.join(f"{i},ELK-{i % 500},53.{i % 997:03d},-127.{i % 991:03d}\n" for i in range(200_000))
+        archive.writestr('metadata/samples.csv', 'id,elk,lat,lon\n' + rows, compress_type=zipfile.ZIP_DEFLATED)
+        digests['metadata/samples.csv'] = (len('id,elk,lat,lon\n' + rows), None)
+    return digests
+
+
+def verify(s3, digests):
+    """Every member extracted with the right size; the first image byte-identical."""
+    listed = {}
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=PROCESSED_BUCKET, Prefix='extracted/'):
+        listed.update({obj['Key']: obj['Size'] for obj in page.get('Contents', [])})
+    for name, (size, _) in digests.items():
+        assert listed.get(f"extracted/{name}") == size, (name, listed.get(f"extracted/{name}"), size)
+    name, (_, expected) = next(iter(digests.items()))
+    digest = hashlib.sha256()
+    for data in iter(s3.get_object(Bucket=PROCESSED_BUCKET, Key=f"extracted/{name}")['Body'].iter_chunks(1 << 20)):
+        digest.update(data)
+    assert digest.hexdigest() == expected, "extracted member differs from the original"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-gb', type=float, default=2.0, help='Size of each archive')
+    parser.add_argument('--members', type=int, default=40)
+    parser.add_argument('--records', type=int, default=2, help='Archives (S3 event records) per invocation')
+    parser.add_argument('--legacy-max-gb', type=float, default=1.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    env = dict(os.environ, AWS_ACCESS_KEY_ID='testing', AWS_SECRET_ACCESS_KEY='testing',
+               AWS_DEFAULT_REGION='us-east-1', AWS_ENDPOINT_URL_S3=f'http://127.0.0.1:{port}')
+    os.environ.update(env)
+    server = start_moto(port)
+    try:
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket=RAW_BUCKET)
+        s3.create_bucket(Bucket=PROCESSED_BUCKET)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'upload.zip')
+            started = time.perf_counter()
+            digests = build_archive(path, int(args.size_gb * 1024 ** 3), args.members)
+            size = os.path.getsize(path)
+            records = []
+            for index in range(args.records):
+                key = f"field uploads/batch {index}.zip"
+                s3.upload_file(path, RAW_BUCKET, key)
+                records.append({'s3': {'bucket': {'name': RAW_BUCKET},
+                                       'object': {'key': key.replace(' ', '+'), 'size': size}}})
+            print(f"{args.records} x {size / 1024 ** 3:.2f} GiB archives ({len(digests)} members) staged "
+                  f"in {time.perf_counter() - started:.0f}s")
+        probes = []
+        for _ in range(3):
+            started = time.perf_counter()
+            s3.get_object(Bucket=RAW_BUCKET, Key='field uploads/batch 0.zip', Range='bytes=0-0')['Body'].read()
+            probes.append(time.perf_counter() - started)
+        print(f"stand-in latency of a 1-byte ranged GET on this archive: {sorted(probes)[1]:.2f}s")
+
+        modes = ['streaming'] + (['legacy'] if args.size_gb <= args.legacy_max_gb else [])
+        print(f"{'mode':>10} {'records':>8} {'GiB':>6} {'seconds':>8} {'MiB/s':>7} {'GETs':>6} {'GET wait':>9} "
+              f"{'peak MB':>8}")
+        for mode in modes:
+            for page in s3.get_paginator('list_objects_v2').paginate(Bucket=PROCESSED_BUCKET):
+                for obj in page.get('Contents', []):
+                    s3.delete_object(Bucket=PROCESSED_BUCKET, Key=obj['Key'])
+            event = {'Records': records if mode == 'streaming' else
+                     [{'s3': {'object': {'key': r['s3']['object']['key'].replace('+', ' ')}}} for r in records]}
+            output = subprocess.run([sys.executable, '-c', RUNNER, LAMBDA_DIR, mode, json.dumps(event), LEGACY_HANDLER],
+                                    check=True, capture_output=True, text=True, env=env).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            verify(s3, digests)
+            total = args.records * size / 1024 ** 3
+            print(f"{mode:>10} {args.records:>8} {total:>6.2f} {result['seconds']:>8.1f} "
+                  f"{total * 1024 / result['seconds']:>7.0f} {result['gets']:>6} {result['get_seconds']:>9.1f} "
+                  f"{result['peak_mb']:>8.0f}")
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+bench_upload_sync.py
+
+S3 calls and wall time of the platform upload Lambda (lib/platform/lambdas/upload.py)
+for a package of 10k assets, against an in-process S3 stand-in (moto):
+- legacy: the previous handler (head_object per file, serial upload_file for misses)
+- sync: one paginated listing per prefix, diffed on size + ETag, concurrent uploads
+
+Each is run on an empty bucket (cold), an up-to-date bucket (warm) and one where 1% of
+the files changed. A few assets are larger than the multipart threshold so multipart
+ETags are exercised too.
+
+Usage:
+    pip install boto3 moto
+    python bench_upload_sync.py [--assets 10000] [--large 4]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib', 'platform', 'lambdas'))
+
+BUCKET = 'file-gateway-bench'
+
+
+def legacy_handler(upload, bucket_name):
+    """The pre-sync upload loop: head_object every file, upload the misses one by one."""
+    s3 = upload.s3
+    for prefix, (directory, extensions) in upload.ASSETS.items():
+        local_dir = os.path.join(upload.TASK_ROOT, directory)
+        for filename in os.listdir(local_dir):
+            if filename.endswith(extensions):
+                s3_key = f"{prefix}/{filename}"
+                try:
+                    s3.head_object(Bucket=bucket_name, Key=s3_key)
+                except s3.exceptions.ClientError:
+                    s3.upload_file(os.path.join(local_dir, filename), bucket_name, s3_key)
+
+
+def make_assets(root, count, large, rng):
+    """`count` small images/metadata files plus `large` multi-part sized images."""
+    os.makedirs(os.path.join(root, 'images'))
+    os.makedirs(os.path.join(root, 'metadata'))
+    paths = []
+    for index in range(count):
+        if index % 10 == 0:
+            path = os.path.join(root, 'metadata', f"sample_{index:06d}.json")
+            data = f'{{"sample": {index}, "elk": "ELK-{index % 500}", "notes": "{"x" * rng.randint(50, 500)}"}}'.encode()
+        else:
+            path = os.path.join(root, 'images', f"IMG_{index:06d}.jpg")
+            data = os.urandom(rng.randint(2_000, 12_000))
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+    for index in range(large):
+        path = os.path.join(root, 'images', f"SCAN_{index:03d}.png")
+        with open(path, 'wb') as f:
+            f.write(os.urandom(20 * 1024 * 1024))
+        paths.append(path)
+    return paths
+
+
+def empty_bucket(s3):
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=BUCKET):
+        keys = [{'Key': obj['Key']} for obj in page.get('Contents', [])]
+        if keys:
+            s3.delete_objects(Bucket=BUCKET, Delete={'Objects': keys})
+
+
+def run(upload, mode):
+    """Run one handler; returns (seconds, {operation: calls})."""
+    upload.api_calls.clear()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == 'legacy':
+            legacy_handler(upload, BUCKET)
+        else:
+            response = upload.handler({}, None)
+            assert response['statusCode'] == 200, response
+    return time.perf_counter() - started, dict(upload.api_calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--assets', type=int, default=10_000)
+    parser.add_argument('--large', type=int, default=4, help='Extra 20 MB assets (multipart uploads)')
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as root, mock_aws():
+        paths = make_assets(root, args.assets, args.large, rng)
+        os.environ['LAMBDA_TASK_ROOT'] = root
+        os.environ['S3_BUCKET_NAME'] = BUCKET
+        import upload
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket=BUCKET)
+
+        print(f"{len(paths):,} assets")
+        print(f"{'mode':>7} {'bucket':>12} {'seconds':>8} {'S3 calls':>9}  by operation")
+        for mode in ('legacy', 'sync'):
+            empty_bucket(s3)
+            for state in ('cold', 'warm', '1% changed'):
+                if state == '1% changed':
+                    for path in rng.sample(paths[:args.assets], args.assets // 100):
+                        with open(path, 'ab') as f:
+                            f.write(b' ')
+                seconds, calls = run(upload, mode)
+                print(f"{mode:>7} {state:>12} {seconds:>8.1f} {sum(calls.values()):>9,}  {calls}")
+            # Legacy never re-uploads changed files; check the sync run left the bucket matching the package
+            if mode == 'sync':
+                uploads, unchanged = upload.plan_uploads(BUCKET)
+                assert not uploads and unchanged == len(paths), (len(uploads), unchanged)
+                print(f"✅ bucket matches all {unchanged:,} local assets after sync")
+
+
+if __name__ == '__main__':
+    main()
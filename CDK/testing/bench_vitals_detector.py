@@ -0,0 +1,97 @@
+"""
+bench_vitals_detector.py
+
+Throughput of the HEA vital-sign anomaly detector (lib/lambda/vitals_detector.py)
+for a herd of 10k elk:
+- scoring: score/update of every reading against in-memory baselines
+- end to end: detect() including the batched state load/save and alert writes against
+  moto (whose own overhead dominates the wall time), with the DynamoDB calls it makes
+  compared to one get + one put per reading
+
+Usage:
+    pip install boto3 moto
+    python bench_vitals_detector.py [--elk 10000] [--rounds 10] [--per-message 500]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import time
+from decimal import Decimal
+
+import local_dynamo
+import boto3
+from moto import mock_aws
+
+import vitals_detector
+
+
+def make_readings(rng, elk, round_number):
+    """One HeaDataTable item per elk, as HEATopicProcessor builds them."""
+    timestamp = f"2025-06-01 {round_number // 60:02d}:{round_number % 60:02d}:00"
+    return [{
+        'SensorId': str(elk_id - 1),
+        'ElkId': str(elk_id),
+        'Timestamp': timestamp,
+        'BodyTemperature': Decimal(str(round(rng.gauss(38.2, 0.2), 2))),
+        'HeartRate': Decimal(str(round(rng.gauss(40, 3), 1))),
+        'RespirationRate': Decimal(str(round(rng.gauss(20, 2), 1))),
+        'StressLevel': Decimal(str(round(rng.gauss(3, 0.7), 2))),
+    } for elk_id in range(1, elk + 1)]
+
+
+def bench_scoring(rounds):
+    """Readings/second for score + update alone."""
+    states = {}
+    started = time.perf_counter()
+    count = 0
+    for batch in rounds:
+        for reading in batch:
+            state = states.get(reading['ElkId']) or states.setdefault(reading['ElkId'],
+                                                                       vitals_detector.new_state(reading['ElkId']))
+            scores = vitals_detector.score(state, reading)
+            flagged = [v for v, (_, z) in scores.items() if z is not None and abs(z) >= vitals_detector.Z_THRESHOLD]
+            vitals_detector.update(state, scores, flagged)
+            count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--elk', type=int, default=10_000)
+    parser.add_argument('--rounds', type=int, default=10, help='Readings per elk')
+    parser.add_argument('--per-message', type=int, default=500, help='Readings handled per detect() call')
+    args = parser.parse_args()
+    rng = random.Random(3)
+    rounds = [make_readings(rng, args.elk, r) for r in range(args.rounds)]
+    total = args.elk * args.rounds
+
+    print(f"scoring only: {bench_scoring(rounds):,.0f} readings/s ({total:,} readings, {args.elk:,} elk)")
+
+    with mock_aws():
+        resource = boto3.resource('dynamodb')
+        local_dynamo.create_vitals_tables(resource)
+        local_dynamo.use_resource(resource)
+
+        calls = {}
+        resource.meta.client.meta.events.register(
+            'before-call.dynamodb.*', lambda model, **_: calls.__setitem__(model.name, calls.get(model.name, 0) + 1))
+
+        alerts = 0
+        started = time.perf_counter()
+        for batch in rounds:
+            for offset in range(0, len(batch), args.per_message):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    alerts += len(vitals_detector.detect(batch[offset:offset + args.per_message]))
+        elapsed = time.perf_counter() - started
+
+        api_calls = sum(calls.values())
+        print(f"end to end (moto): {total / elapsed:,.0f} readings/s, {args.per_message} readings per call, "
+              f"{alerts} alerts")
+        print(f"DynamoDB calls: {api_calls:,} ({calls}) vs {2 * total:,} for a get + put per reading "
+              f"-> {2 * total / api_calls:.0f}x fewer")
+
+
+if __name__ == '__main__':
+    main()
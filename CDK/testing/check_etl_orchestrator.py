@@ -0,0 +1,259 @@
+"""
+check_etl_orchestrator.py
+
+Runs the ETL orchestrator (lib/platform/lambdas/etl_orchestration/orchestrator.py)
+against the local Glue stand-in (local_glue.py) and an in-process S3 (moto) on a
+virtual clock, and checks its scheduling:
+- the GPS, ENV and HEA job runs all start at once and the wall time tracks the slowest
+  pipeline, compared with running the same pipelines one after another
+- polls follow the jittered exponential backoff and stay far below fixed-interval polling
+- a crawler only runs for a job whose run moved its watermark (or was a full export), and
+  not at all when the job registered its partitions in the catalog itself, unless it
+  recorded dates it could not register
+- a crawler shared by several tables (S3ResultsCrawler) runs once, after the last job
+  that needs it
+- the fact job starts once all three exports have ended, and is not started when one of
+  them failed or none of them exported new rows
+- a failed job is reported and not crawled
+- an invocation that runs out of time returns IN_PROGRESS and resumes from that response
+  without starting anything twice
+- a job already running is waited on rather than failed, and a busy crawler is re-run
+  once it is free
+
+Usage:
+    pip install boto3 moto
+    python check_etl_orchestrator.py [--seed 7]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+
+import boto3
+from moto import mock_aws
+
+from local_glue import LocalGlue, VirtualClock
+import orchestrator
+import wait_for_job
+
+BUCKET = 'glue-temp-check'
+SENSORS = {  # sensor -> (job seconds, exports new rows)
+    'gps': (420, True),
+    'env': (300, False),
+    'hea': (600, True),
+}
+FACT_SECONDS = 240
+CRAWLER_SECONDS = 90
+POLL_INTERVAL_SECONDS = 10  # What a fixed-interval poller would use to notice completion as quickly
+
+
+def stub(s3, overrides=None, busy_crawlers=(), catalog=False, unregistered=None):
+    """A LocalGlue with the three exports + crawlers, watermarks seeded so incremental runs can tell."""
+    clock = VirtualClock()
+    glue = LocalGlue(clock, s3)
+    for sensor, (seconds, new_rows) in SENSORS.items():
+        seconds, outcome, new_rows = (overrides or {}).get(sensor, (seconds, 'SUCCEEDED', new_rows))
+        watermark_path = f"s3://{BUCKET}/watermarks/{sensor}.json"
+        s3.put_object(Bucket=BUCKET, Key=f"watermarks/{sensor}.json", Body=b'{"watermark": "2025-10-01T00:00:00"}')
+        arguments = {'--export_mode': 'incremental', '--watermark_path': watermark_path}
+        if catalog:
+            arguments.update({'--output_format': 'parquet', '--catalog_database': 'gps_data_analytics_db',
+                              '--catalog_table': f"processed_{sensor}_data"})
+        glue.add_job(f"{sensor.capitalize()}DynamoDBToS3GlueJob", seconds, outcome, new_rows, arguments,
+                     (unregistered or {}).get(sensor, ()))
+        glue.add_crawler(f"DynamoDB{sensor}", CRAWLER_SECONDS, busy_for=60 if sensor in busy_crawlers else 0)
+    return clock, glue
+
+
+def event(sensors=SENSORS, crawler_name=None):
+    return {'pipelines': [{'sensor': sensor, 'job_name': f"{sensor.capitalize()}DynamoDBToS3GlueJob",
+                           'crawler_name': crawler_name or f"DynamoDB{sensor}"} for sensor in sensors]}
+
+
+def orchestrate(glue, clock, request, deadline=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return orchestrator.orchestrate(request, glue, boto3.client('s3'), deadline, clock.time, clock.sleep)
+
+
+def check_backoff(rng):
+    for attempt in range(8):
+        step = min(wait_for_job.POLL_CAP_SECONDS, wait_for_job.POLL_BASE_SECONDS * 2 ** attempt)
+        delays = [wait_for_job.backoff_delay(attempt, rng=rng) for _ in range(1000)]
+        assert step / 2 <= min(delays) and max(delays) <= step, (attempt, min(delays), max(delays))
+        assert len({round(delay, 3) for delay in delays}) > 900, "delays are not jittered"
+    print(f"✅ backoff: waits within [step/2, step], step doubling from {wait_for_job.POLL_BASE_SECONDS:.0f}s "
+          f"up to {wait_for_job.POLL_CAP_SECONDS:.0f}s")
+
+
+def check_parallel(s3):
+    clock, glue = stub(s3)
+    t0 = clock.time()
+    result = orchestrate(glue, clock, event())
+    assert result['status'] == 'SUCCEEDED', result['status']
+
+    job_starts = [when for when, operation, _ in glue.log if operation == 'StartJobRun']
+    assert job_starts == [t0] * 3, job_starts
+    crawled = sorted(name for _, operation, name in glue.log if operation == 'StartCrawler')
+    assert crawled == ['DynamoDBgps', 'DynamoDBhea'], crawled
+    by_sensor = {pipeline['sensor']: pipeline for pipeline in result['pipelines']}
+    assert by_sensor['env']['crawler'] == {'status': 'SKIPPED'}
+    # GPS is crawled while HEA is still exporting
+    gps_crawl = next(when for when, operation, name in glue.log if name == 'DynamoDBgps')
+    assert gps_crawl < t0 + SENSORS['hea'][0], gps_crawl - t0
+
+    timings = result['timings']
+    slowest = max(seconds + (CRAWLER_SECONDS if new_rows else 0) for seconds, new_rows in SENSORS.values())
+    polls = sum((timings[sensor]['job_polls'] or 0) + (timings[sensor]['crawler_polls'] or 0) for sensor in SENSORS)
+    fixed_polls = sum((seconds + (CRAWLER_SECONDS if new_rows else 0)) // POLL_INTERVAL_SECONDS
+                      for seconds, new_rows in SENSORS.values())
+
+    sequential = 0.0
+    for sensor in SENSORS:
+        clock, glue = stub(s3)
+        sequential += orchestrate(glue, clock, event([sensor]))['timings']['total_seconds']
+
+    print(f"{'sensor':>7} {'job s':>7} {'polls':>6} {'crawler':>8} {'crawl s':>8} {'polls':>6}")
+    for sensor in SENSORS:
+        row = timings[sensor]
+        print(f"{sensor:>7} {row['job_seconds']:>7} {row['job_polls']:>6} "
+              f"{by_sensor[sensor]['crawler']['status']:>8} {row['crawler_seconds'] or '-':>8} "
+              f"{row['crawler_polls'] or '-':>6}")
+    print(f"parallel: {timings['total_seconds']:.0f}s wall (slowest pipeline {slowest}s), {polls} polls; "
+          f"one after another: {sequential:.0f}s; fixed {POLL_INTERVAL_SECONDS}s polling: {fixed_polls} polls")
+    assert timings['total_seconds'] <= slowest * 1.25, (timings['total_seconds'], slowest)
+    assert polls * 3 < fixed_polls, (polls, fixed_polls)
+    print("✅ parallel start, crawlers only for GPS and HEA (ENV exported no new rows)")
+
+
+def check_shared_crawler(s3):
+    clock, glue = stub(s3, {sensor: (seconds, 'SUCCEEDED', True) for sensor, (seconds, _) in SENSORS.items()})
+    glue.add_crawler('S3ResultsCrawler', CRAWLER_SECONDS)
+    t0 = clock.time()
+    result = orchestrate(glue, clock, event(crawler_name='S3ResultsCrawler'))
+    crawls = [(when, name) for when, operation, name in glue.log if operation == 'StartCrawler']
+    last_job = max(seconds for seconds, _ in SENSORS.values())
+    assert result['status'] == 'SUCCEEDED', result['status']
+    assert [name for _, name in crawls] == ['S3ResultsCrawler'], crawls
+    assert crawls[0][0] >= t0 + last_job, crawls[0][0] - t0
+    assert result['crawls'][0]['sensors'] == list(SENSORS), result['crawls']
+    assert all(pipeline['crawler']['status'] == 'SUCCEEDED' for pipeline in result['pipelines'])
+    print(f"✅ shared crawler: one crawl for {', '.join(SENSORS)} after the last job, "
+          f"{result['timings']['total_seconds']:.0f}s total")
+
+
+def fact_event():
+    request = event(crawler_name='S3ResultsCrawler')
+    request['pipelines'].append({'sensor': 'fact', 'job_name': 'FactElkObservationsGlueJob',
+                                 'crawler_name': 'S3ResultsCrawler', 'after': list(SENSORS)})
+    return request
+
+
+def check_fact_stage(s3):
+    for overrides, expected in (
+            (None, 'SUCCEEDED'),
+            ({'hea': (200, 'FAILED', True)}, 'FAILED'),
+            ({sensor: (seconds, 'SUCCEEDED', False) for sensor, (seconds, _) in SENSORS.items()}, 'SKIPPED')):
+        clock, glue = stub(s3, overrides)
+        glue.add_job('FactElkObservationsGlueJob', FACT_SECONDS, 'SUCCEEDED', True)
+        glue.add_crawler('S3ResultsCrawler', CRAWLER_SECONDS)
+        t0 = clock.time()
+        result = orchestrate(glue, clock, fact_event())
+        fact = next(pipeline for pipeline in result['pipelines'] if pipeline['sensor'] == 'fact')
+        starts = {name: when - t0 for when, operation, name in glue.log if operation == 'StartJobRun'}
+        crawls = [name for _, operation, name in glue.log if operation == 'StartCrawler']
+        if expected == 'SUCCEEDED':
+            last_export = max(seconds for seconds, _ in SENSORS.values())
+            assert result['status'] == 'SUCCEEDED' and fact['status'] == 'DONE', (result['status'], fact)
+            assert starts['FactElkObservationsGlueJob'] >= last_export, starts
+            assert crawls == ['S3ResultsCrawler'] and 'fact' in result['crawls'][0]['sensors'], result['crawls']
+            print(f"✅ fact job started {starts['FactElkObservationsGlueJob']:.0f}s in, after the last export; "
+                  f"one crawl for exports + fact, {result['timings']['total_seconds']:.0f}s total")
+        else:
+            assert 'FactElkObservationsGlueJob' not in starts, starts
+            assert fact['job'].get('state', fact['status']) == expected, fact
+    print("✅ fact job not started after a failed export, nor when no export had new rows")
+
+
+def check_failure(s3):
+    clock, glue = stub(s3, {'hea': (200, 'FAILED', True)})
+    result = orchestrate(glue, clock, event())
+    by_sensor = {pipeline['sensor']: pipeline for pipeline in result['pipelines']}
+    assert result['status'] == 'FAILED'
+    assert by_sensor['hea']['status'] == 'FAILED' and by_sensor['hea']['job']['state'] == 'FAILED'
+    assert by_sensor['hea']['crawler'] == {}
+    assert by_sensor['gps']['status'] == 'DONE' and by_sensor['gps']['crawler']['status'] == 'SUCCEEDED'
+    print("✅ failed HEA job reported, not crawled; GPS still crawled")
+
+
+def check_full_export(s3):
+    clock, glue = stub(s3, {sensor: (seconds, 'SUCCEEDED', False) for sensor, (seconds, _) in SENSORS.items()})
+    request = dict(event(), arguments={'--export_mode': 'full'})
+    result = orchestrate(glue, clock, request)
+    crawled = sorted(name for _, operation, name in glue.log if operation == 'StartCrawler')
+    assert result['status'] == 'SUCCEEDED' and crawled == ['DynamoDBenv', 'DynamoDBgps', 'DynamoDBhea'], crawled
+    print("✅ full export: every table crawled")
+
+
+def check_registered(s3):
+    clock, glue = stub(s3, catalog=True, unregistered={'hea': ['2025-10-14']})
+    result = orchestrate(glue, clock, event())
+    by_sensor = {pipeline['sensor']: pipeline['crawler'].get('status') for pipeline in result['pipelines']}
+    crawled = [name for _, operation, name in glue.log if operation == 'StartCrawler']
+    assert result['status'] == 'SUCCEEDED', result['status']
+    assert by_sensor == {'gps': 'REGISTERED', 'env': 'SKIPPED', 'hea': 'SUCCEEDED'}, by_sensor
+    assert crawled == ['DynamoDBhea'], crawled
+    print(f"✅ registered partitions: GPS not crawled, HEA crawled as a fallback for its unregistered date, "
+          f"{result['timings']['total_seconds']:.0f}s total")
+
+
+def check_resume(s3):
+    clock, glue = stub(s3)
+    t0 = clock.time()
+    first = orchestrate(glue, clock, event(), deadline=t0 + 200)
+    assert first['status'] == 'IN_PROGRESS', first['status']
+    second = orchestrate(glue, clock, json.loads(json.dumps(first)), deadline=t0 + 500)
+    assert second['status'] == 'IN_PROGRESS', second['status']
+    third = orchestrate(glue, clock, json.loads(json.dumps(second)))
+    assert third['status'] == 'SUCCEEDED', third['status']
+    assert glue.calls['StartJobRun'] == 3 and glue.calls['StartCrawler'] == 2, dict(glue.calls)
+    print(f"✅ resumed across 3 invocations with {glue.calls['StartJobRun']} job starts, "
+          f"{third['timings']['total_seconds']:.0f}s total")
+
+
+def check_already_running(s3):
+    clock, glue = stub(s3, busy_crawlers=('gps',))
+    glue.start_job_run(JobName='GpsDynamoDBToS3GlueJob')
+    clock.sleep(100)
+    result = orchestrate(glue, clock, event())
+    gps = next(pipeline for pipeline in result['pipelines'] if pipeline['sensor'] == 'gps')
+    assert result['status'] == 'SUCCEEDED', result['status']
+    assert gps['job']['run_id'] == 'jr_GpsDynamoDBToS3GlueJob_0', gps['job']
+    assert len(glue.jobs['GpsDynamoDBToS3GlueJob']['runs']) == 1
+    assert len(glue.crawlers['DynamoDBgps']['crawls']) == 2  # the scheduled crawl, then ours
+    print("✅ attached to the GPS run already in progress; crawled again after the scheduled crawl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with mock_aws():
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket=BUCKET)
+        check_backoff(random.Random(args.seed))
+        check_parallel(s3)
+        check_shared_crawler(s3)
+        check_fact_stage(s3)
+        check_failure(s3)
+        check_full_export(s3)
+        check_registered(s3)
+        check_resume(s3)
+        check_already_running(s3)
+
+
+if __name__ == '__main__':
+    main()
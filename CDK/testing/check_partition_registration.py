@@ -0,0 +1,113 @@
+"""
+check_partition_registration.py
+
+Exercises the Glue Data Catalog registration in etl_common (update_catalog /
+sync_catalog) against an in-process Glue catalog (moto), with the HEA export schema
+from etl_HEAtoDb.py:
+- a first export creates the table and one partition per date, PARTITION_BATCH per call
+- re-registering overlapping dates only adds the new ones
+- a schema change adds/retypes columns and keeps the old ones
+- a registration failure hands the dates back (to be kept with the watermark) instead of
+  failing the export, and raises when there is no watermark to keep them in
+
+and prints the catalog calls and time each registration took, i.e. how long after the
+write the partitions are queryable.
+
+Usage:
+    pip install boto3 moto pyspark
+    python check_partition_registration.py [--days 365]
+"""
+
+import argparse
+import datetime
+import time
+from collections import Counter
+
+import boto3
+from botocore.exceptions import ClientError
+from moto import mock_aws
+from pyspark.sql.types import DoubleType, IntegerType, StringType, StructField, StructType
+
+import local_dynamo  # noqa: F401  (fake AWS credentials)
+from local_spark import SCRIPTS_DIR  # noqa: F401  (puts lib/scripts on sys.path)
+from etl_common import CATALOG_DEFAULTS, EXPORT_DEFAULTS, OUTPUT_DEFAULTS, PARTITION_BATCH, sync_catalog, update_catalog
+
+DATABASE = 'gps_data_analytics_db'
+TABLE = 'processed_hea_data'
+OUTPUT_PATH = 's3://dynamo-to-s3-check/hea_data/'
+
+HEA_SCHEMA = StructType([StructField(name, StringType()) for name in
+                         ['SensorId', 'ElkId', 'Topic', 'Timestamp', 'Posture']] +
+                        [StructField(name, IntegerType()) for name in ['HeartRate', 'RespirationRate']] +
+                        [StructField(name, DoubleType()) for name in
+                         ['BodyTemperature', 'HydrationLevel', 'ActivityLevel', 'StressLevel']])
+
+
+def dates(start, days):
+    first = datetime.date.fromisoformat(start)
+    return [(first + datetime.timedelta(days=offset)).isoformat() for offset in range(days)]
+
+
+def timed(glue, calls, function, *args):
+    calls.clear()
+    started = time.perf_counter()
+    result = function(*args, glue=glue) if function is update_catalog else function(*args)
+    return result, time.perf_counter() - started, dict(calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=365, help='Dates in the backfill export')
+    args = parser.parse_args()
+    options = dict({**OUTPUT_DEFAULTS, **EXPORT_DEFAULTS, **CATALOG_DEFAULTS}, output_format='parquet',
+                   catalog_database=DATABASE, catalog_table=TABLE)
+
+    with mock_aws():
+        glue = boto3.client('glue')
+        calls = Counter()
+        glue.meta.events.register('before-call.glue.*', lambda model, **kwargs: calls.update([model.name]))
+        glue.create_database(DatabaseInput={'Name': DATABASE})
+
+        backfill = dates('2025-01-01', args.days)
+        (change, added), seconds, used = timed(glue, calls, update_catalog, HEA_SCHEMA, backfill, OUTPUT_PATH, 'hea',
+                                               options)
+        partitions = [partition for page in glue.get_paginator('get_partitions').paginate(
+            DatabaseName=DATABASE, TableName=TABLE) for partition in page['Partitions']]
+        assert change == 'created' and added == args.days == len(partitions), (change, added, len(partitions))
+        assert used['BatchCreatePartition'] == -(-args.days // PARTITION_BATCH), used
+        location = next(p for p in partitions if p['Values'] == ['hea', backfill[0]])['StorageDescriptor']['Location']
+        assert location == f"{OUTPUT_PATH}sensor_type=hea/dt={backfill[0]}/", location
+        print(f"✅ backfill: table created, {added} partitions in {seconds * 1000:.0f} ms, calls {used}")
+
+        daily = backfill[-2:] + dates(backfill[-1], 2)[1:]
+        (change, added), seconds, used = timed(glue, calls, update_catalog, HEA_SCHEMA, daily, OUTPUT_PATH, 'hea',
+                                               options)
+        assert change == 'unchanged' and added == 1, (change, added)
+        print(f"✅ incremental: {added} new of {len(daily)} dates in {seconds * 1000:.0f} ms, calls {used}")
+
+        # StressLevel dropped, HeartRate now a double, GaitScore new
+        evolved = StructType([StructField('HeartRate', DoubleType()) if field.name == 'HeartRate' else field
+                              for field in HEA_SCHEMA.fields if field.name != 'StressLevel'] +
+                             [StructField('GaitScore', DoubleType())])
+        (change, added), _, used = timed(glue, calls, update_catalog, evolved, dates('2026-01-05', 1), OUTPUT_PATH,
+                                         'hea', options)
+        columns = {c['Name'].lower(): c['Type'] for c in glue.get_table(DatabaseName=DATABASE, Name=TABLE)
+                   ['Table']['StorageDescriptor']['Columns']}
+        assert change == 'updated' and added == 1, (change, added)
+        assert columns['heartrate'] == 'double' and columns['gaitscore'] == 'double', columns
+        assert 'stresslevel' in columns, "columns dropped from the export must stay in the table"
+        print(f"✅ schema change: table updated ({len(columns)} columns, StressLevel kept), calls {used}")
+
+        broken = dict(options, catalog_database='no_such_database', watermark_path='s3://bucket/watermarks/hea.json')
+        left = sync_catalog(HEA_SCHEMA, ['2026-01-06'], OUTPUT_PATH, 'hea', broken)
+        assert left == ['2026-01-06'], left
+        try:
+            sync_catalog(HEA_SCHEMA, ['2026-01-06'], OUTPUT_PATH, 'hea', dict(broken, watermark_path=''))
+            raise AssertionError("registration failure without a watermark must fail the job")
+        except ClientError as e:
+            assert e.response['Error']['Code'] == 'EntityNotFoundException', e
+        print("✅ failed registration: dates handed back for the watermark, or raised without one")
+
+
+if __name__ == '__main__':
+    main()
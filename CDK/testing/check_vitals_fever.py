@@ -0,0 +1,170 @@
+"""
+check_vitals_fever.py
+
+Feeds HEATopicProcessor (against moto) a herd of healthy elk, then injects a
+synthetic fever into one animal and checks that the vital-sign detector:
+- alerts on every fever reading of that elk, starting with the first one
+- keeps alerting (the fever only leaks slowly into the elk's baseline)
+- raises (almost) no alerts for the healthy elk
+and, on the detector alone, that a lasting level shift is absorbed into the baseline
+and stops alerting after a while instead of alerting forever. Also checks that an elk
+whose baseline cannot be read (BatchGetItem keeps it unprocessed) is skipped rather
+than scored against, and saved as, a fresh baseline.
+
+Usage:
+    pip install boto3 moto
+    python check_vitals_fever.py [--elk 50] [--rounds 80] [--fever-from 60]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import local_dynamo
+import boto3
+from moto import mock_aws
+
+FEVER_ELK = 7
+FEVER_TEMPERATURE_RISE = 2.0  # °C
+FEVER_HEART_RATE_RISE = 15  # BPM
+MAX_FALSE_POSITIVE_RATE = 0.005
+
+
+def reading(rng, sensor_id, elk_id, timestamp, fever=False):
+    """One HEA payload record with healthy vitals, optionally running a fever."""
+    return {
+        'sensor_id': sensor_id,
+        'elk_id': elk_id,
+        'timestamp': timestamp,
+        'body_temperature': round(rng.gauss(38.2, 0.2) + (FEVER_TEMPERATURE_RISE if fever else 0), 2),
+        'heart_rate': round(rng.gauss(40, 3) + (FEVER_HEART_RATE_RISE if fever else 0), 1),
+        'respiration_rate': round(rng.gauss(20, 2), 1),
+        'activity_level': round(rng.random(), 2),
+        'posture': 'Standing',
+        'hydration_level': round(rng.uniform(60, 90), 1),
+        'stress_level': round(rng.gauss(3, 0.7), 2),
+    }
+
+
+class ThrottledStateResource:
+    """DynamoDB resource whose BatchGetItem always leaves the key of `elk_id` unprocessed."""
+
+    def __init__(self, resource, elk_id):
+        self.resource = resource
+        self.elk_id = elk_id
+
+    def __getattr__(self, name):
+        return getattr(self.resource, name)
+
+    def batch_get_item(self, RequestItems):
+        (table_name, request), = RequestItems.items()
+        withheld = [key for key in request['Keys'] if key['ElkId'] == self.elk_id]
+        kept = [key for key in request['Keys'] if key['ElkId'] != self.elk_id]
+        response = {'Responses': {table_name: []}}
+        if kept:
+            response = self.resource.batch_get_item(RequestItems={table_name: {**request, 'Keys': kept}})
+        response['UnprocessedKeys'] = {table_name: {'Keys': withheld}} if withheld else {}
+        return response
+
+
+def check_throttled_baseline(resource, tables, timestamp):
+    """A throttled elk raises no alert and keeps its stored baseline; the others are still scored."""
+    import vitals_detector
+    state_table = tables['HeaVitalsStateTable']
+    throttled, healthy = str(FEVER_ELK), str(FEVER_ELK + 1)
+    before = {elk_id: state_table.get_item(Key={'ElkId': elk_id})['Item'] for elk_id in (throttled, healthy)}
+    readings = [{'ElkId': elk_id, 'Timestamp': timestamp, 'BodyTemperature': 45.0, 'HeartRate': 90,
+                 'RespirationRate': 20, 'StressLevel': 3} for elk_id in (throttled, healthy)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        alerts = vitals_detector.detect(readings, ThrottledStateResource(resource, throttled))
+    after = {elk_id: state_table.get_item(Key={'ElkId': elk_id})['Item'] for elk_id in (throttled, healthy)}
+
+    assert [alert['ElkId'] for alert in alerts] == [healthy], alerts
+    assert after[throttled] == before[throttled], "an unreadable baseline was overwritten"
+    assert after[healthy]['Count'] == before[healthy]['Count'] + 1, after[healthy]
+    print(f"✅ throttled elk {throttled} skipped with its baseline intact ({before[throttled]['Count']} readings); "
+          f"elk {healthy} still scored")
+
+
+def check_level_shift(rng, readings=2000, shift_from=100):
+    """A lasting +FEVER_TEMPERATURE_RISE shift alerts at first, then becomes the elk's normal."""
+    import vitals_detector
+    state, alerting = vitals_detector.new_state('1'), []
+    for n in range(readings):
+        value = {'BodyTemperature': rng.gauss(38.2, 0.2) + (FEVER_TEMPERATURE_RISE if n >= shift_from else 0)}
+        scores = vitals_detector.score(state, value)
+        flagged = [vital for vital, (_, z) in scores.items()
+                   if z is not None and abs(z) >= vitals_detector.Z_THRESHOLD]
+        vitals_detector.update(state, scores, flagged)
+        if flagged and n >= shift_from:
+            alerting.append(n - shift_from)
+    last = max(alerting)
+    assert alerting[:20] == list(range(20)), "a shift must alert on its first readings"
+    assert last < readings - shift_from - 100, "a lasting shift kept alerting"
+    print(f"✅ lasting +{FEVER_TEMPERATURE_RISE:g} °C shift: alerted on its first {len(alerting)} readings, "
+          f"absorbed after {last + 1} ({(last + 1) * 15 / 60:.0f} h at 15 min)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--elk', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=80, help='Readings per elk')
+    parser.add_argument('--fever-from', type=int, default=60, help='Round at which the fever starts')
+    parser.add_argument('--per-message', type=int, default=10, help='Elk per IoT message')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with mock_aws():
+        resource = boto3.resource('dynamodb')
+        tables = local_dynamo.create_ingest_tables(resource)
+        local_dynamo.use_resource(resource)
+        import HEATopicProcessor
+
+        start = datetime(2025, 6, 1)
+        for round_number in range(args.rounds):
+            timestamp = (start + timedelta(minutes=15 * round_number)).strftime('%Y-%m-%d %H:%M:%S')
+            records = [reading(rng, elk_id - 1, elk_id, timestamp,
+                               fever=elk_id == FEVER_ELK and round_number >= args.fever_from)
+                       for elk_id in range(1, args.elk + 1)]
+            for offset in range(0, len(records), args.per_message):
+                event = {'messageId': str(uuid.uuid4()), 'topic': 'IoT/HEA', 'timestamp': time.time(),
+                         'payload': records[offset:offset + args.per_message]}
+                with contextlib.redirect_stdout(io.StringIO()):
+                    HEATopicProcessor.lambda_handler(event, None)
+
+        alerts = tables['HeaAlertTable'].scan()['Items']
+        fever_alerts = sorted(a['Timestamp'] for a in alerts if a['ElkId'] == str(FEVER_ELK))
+        false_alerts = [a for a in alerts if a['ElkId'] != str(FEVER_ELK)]
+        fever_readings = args.rounds - args.fever_from
+        first_fever = (start + timedelta(minutes=15 * args.fever_from)).strftime('%Y-%m-%d %H:%M:%S')
+        healthy_readings = args.rounds * (args.elk - 1)
+
+        print(f"elk {FEVER_ELK}: {len(fever_alerts)}/{fever_readings} fever readings flagged, first at "
+              f"{fever_alerts[0] if fever_alerts else None} (fever began {first_fever})")
+        print(f"healthy elk: {len(false_alerts)} alerts in {healthy_readings} readings "
+              f"({len(false_alerts) / healthy_readings:.3%})")
+        if fever_alerts:
+            sample = next(a for a in alerts if a['Timestamp'] == fever_alerts[0] and a['ElkId'] == str(FEVER_ELK))
+            print(f"alert record: {sample}")
+
+        assert fever_alerts and fever_alerts[0] == first_fever, "fever not flagged on its first reading"
+        assert len(fever_alerts) == fever_readings, "fever stopped being flagged (baseline absorbed it)"
+        assert len(false_alerts) / healthy_readings <= MAX_FALSE_POSITIVE_RATE, "too many false alerts"
+        state = tables['HeaVitalsStateTable'].get_item(Key={'ElkId': str(FEVER_ELK)})['Item']
+        assert abs(float(state['BodyTemperatureMean']) - 38.2) < 0.3, state
+        print(f"✅ fever detected on arrival; elk {FEVER_ELK} baseline stayed at "
+              f"{float(state['BodyTemperatureMean']):.2f} °C")
+
+        check_throttled_baseline(resource, tables,
+                                 (start + timedelta(minutes=15 * args.rounds)).strftime('%Y-%m-%d %H:%M:%S'))
+
+    check_level_shift(rng)
+
+
+if __name__ == '__main__':
+    main()
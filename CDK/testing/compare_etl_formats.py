@@ -0,0 +1,87 @@
+"""
+compare_etl_formats.py
+
+Writes the same synthetic GPS export with the legacy JSON path and with the
+partitioned Parquet path from etl_common.write_output, then compares:
+- total output bytes
+- bytes an Athena-style engine has to scan for a typical query
+  ("average position of one elk on one day"): the whole JSON file versus only
+  the needed column chunks inside the matching dt= partition.
+
+Usage:
+    pip install pyspark pyarrow
+    python compare_etl_formats.py [--rows 2000000] [--compression zstd]
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import pyarrow.parquet as pq
+
+from local_spark import spark_session, synthetic_gps
+from etl_common import OUTPUT_DEFAULTS, write_output
+
+QUERY_COLUMNS = ['SensorId', 'Latitude', 'Longitude']
+
+
+def total_bytes(path, pattern):
+    return sum(os.path.getsize(f) for f in glob.glob(os.path.join(path, pattern), recursive=True))
+
+
+def parquet_scan_bytes(path, dt, columns):
+    """Compressed size of `columns` across every row group in partition dt=<dt>."""
+    scanned = 0
+    for f in glob.glob(os.path.join(path, 'sensor_type=*', f'dt={dt}', '*.parquet')):
+        meta = pq.ParquetFile(f).metadata
+        for rg in range(meta.num_row_groups):
+            group = meta.row_group(rg)
+            for c in range(group.num_columns):
+                if group.column(c).path_in_schema in columns:
+                    scanned += group.column(c).total_compressed_size
+    return scanned
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--compression', default='snappy', choices=['snappy', 'zstd'])
+    parser.add_argument('--target-file-mb', default='128')
+    args = parser.parse_args()
+
+    spark = spark_session()
+    df = synthetic_gps(spark, args.rows).cache()
+    df.count()
+    query_day = df.agg({'Timestamp': 'min'}).first()[0][:10]
+
+    with tempfile.TemporaryDirectory() as out:
+        json_path, parquet_path = os.path.join(out, 'json'), os.path.join(out, 'parquet')
+
+        started = time.perf_counter()
+        write_output(df, json_path, 'gps', dict(OUTPUT_DEFAULTS, output_format='json'))
+        json_seconds = time.perf_counter() - started
+
+        options = dict(OUTPUT_DEFAULTS, output_format='parquet', compression=args.compression,
+                       target_file_mb=args.target_file_mb)
+        started = time.perf_counter()
+        write_output(df, parquet_path, 'gps', options)
+        parquet_seconds = time.perf_counter() - started
+
+        json_bytes = total_bytes(json_path, '*.json')
+        parquet_bytes = total_bytes(parquet_path, '**/*.parquet')
+        parquet_scan = parquet_scan_bytes(parquet_path, query_day, QUERY_COLUMNS)
+        files = len(glob.glob(os.path.join(parquet_path, '**', '*.parquet'), recursive=True))
+
+        print(f"rows: {args.rows:,}   query: one elk, dt={query_day}, columns {QUERY_COLUMNS}")
+        print(f"{'format':<16} {'write s':>8} {'output bytes':>14} {'files':>6} {'scan bytes':>14}")
+        print(f"{'json':<16} {json_seconds:>8.1f} {json_bytes:>14,} {1:>6} {json_bytes:>14,}")
+        print(f"{'parquet/' + args.compression:<16} {parquet_seconds:>8.1f} {parquet_bytes:>14,} {files:>6} {parquet_scan:>14,}")
+        print(f"output {json_bytes / parquet_bytes:.1f}x smaller, query scans {json_bytes / max(parquet_scan, 1):.0f}x fewer bytes")
+
+    spark.stop()
+
+
+if __name__ == '__main__':
+    main()
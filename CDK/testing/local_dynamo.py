@@ -0,0 +1,83 @@
+"""
+local_dynamo.py
+
+Helpers shared by the scripts in this folder: fake AWS credentials for moto and
+tables with the same key schemas as the CDK stacks.
+"""
+
+import os
+import sys
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+# Make the Lambda sources importable (they are deployed from lib/lambda as a flat asset)
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+SENSOR_TABLES = ['GpsDataTable', 'EnvDataTable', 'HeaDataTable']
+
+
+def create_sensor_table(resource, name):
+    """Create a table keyed like glue-job-factory.ts (SensorId / Timestamp)."""
+    return resource.create_table(
+        TableName=name,
+        KeySchema=[
+            {'AttributeName': 'SensorId', 'KeyType': 'HASH'},
+            {'AttributeName': 'Timestamp', 'KeyType': 'RANGE'},
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'SensorId', 'AttributeType': 'S'},
+            {'AttributeName': 'Timestamp', 'AttributeType': 'S'},
+        ],
+        BillingMode='PAY_PER_REQUEST',
+    )
+
+
+def create_dedup_table(resource, name='IngestDedupTable'):
+    """Create the messageId marker table from data-ingestion-stack.ts."""
+    return resource.create_table(
+        TableName=name,
+        KeySchema=[{'AttributeName': 'MessageId', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'MessageId', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST',
+    )
+
+
+def create_vitals_tables(resource):
+    """Create the anomaly detector's state and alert tables from data-ingestion-stack.ts."""
+    state = resource.create_table(
+        TableName='HeaVitalsStateTable',
+        KeySchema=[{'AttributeName': 'ElkId', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'ElkId', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST',
+    )
+    alerts = resource.create_table(
+        TableName='HeaAlertTable',
+        KeySchema=[
+            {'AttributeName': 'ElkId', 'KeyType': 'HASH'},
+            {'AttributeName': 'Timestamp', 'KeyType': 'RANGE'},
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'ElkId', 'AttributeType': 'S'},
+            {'AttributeName': 'Timestamp', 'AttributeType': 'S'},
+        ],
+        BillingMode='PAY_PER_REQUEST',
+    )
+    return {'HeaVitalsStateTable': state, 'HeaAlertTable': alerts}
+
+
+def create_ingest_tables(resource):
+    """Create every table the topic processors write to and return them by name."""
+    tables = {name: create_sensor_table(resource, name) for name in SENSOR_TABLES}
+    tables['IngestDedupTable'] = create_dedup_table(resource)
+    tables.update(create_vitals_tables(resource))
+    return tables
+
+
+def use_resource(resource):
+    """Point the shared Lambda write module at `resource` (created inside mock_aws)."""
+    import dynamo_batch
+    dynamo_batch.dynamodb = resource
+    return dynamo_batch
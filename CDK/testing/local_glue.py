@@ -0,0 +1,156 @@
+"""
+local_glue.py
+
+In-memory stand-in for the Glue job and crawler API calls made by the ETL orchestration
+Lambdas (lib/platform/lambdas/etl_orchestration), driven by a virtual clock so hours of
+job runs and backoff waits play out instantly. A job run that "exports rows" moves its
+watermark object in S3 when it finishes, as etl_common.export_table does (recording
+`unregistered` dates there when its catalog registration is set to fail).
+"""
+
+import datetime
+import json
+import os
+import sys
+import threading
+from collections import Counter
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+ORCHESTRATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib', 'platform', 'lambdas',
+                                 'etl_orchestration')
+sys.path.insert(0, ORCHESTRATION_DIR)
+
+
+class VirtualClock:
+    """time.time / time.sleep replacement: sleeping just moves the clock forward."""
+
+    def __init__(self, start=1_760_000_000.0):
+        self.now = start
+        self.lock = threading.Lock()
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.now += seconds
+
+
+class GlueError(Exception):
+    pass
+
+
+class LocalGlue:
+    """
+    Jobs and crawlers with fixed durations and outcomes. `calls` counts API calls by
+    operation and `log` records (virtual time, operation, name) for the starts.
+    """
+
+    class exceptions:
+        ConcurrentRunsExceededException = type('ConcurrentRunsExceededException', (GlueError,), {})
+        CrawlerRunningException = type('CrawlerRunningException', (GlueError,), {})
+        EntityNotFoundException = type('EntityNotFoundException', (GlueError,), {})
+
+    def __init__(self, clock, s3=None):
+        self.clock = clock
+        self.s3 = s3
+        self.jobs = {}
+        self.crawlers = {}
+        self.calls = Counter()
+        self.log = []
+        self.lock = threading.Lock()
+
+    def add_job(self, name, duration, outcome='SUCCEEDED', new_rows=True, default_arguments=None, unregistered=()):
+        self.jobs[name] = {'duration': duration, 'outcome': outcome, 'new_rows': new_rows,
+                           'arguments': default_arguments or {}, 'unregistered': list(unregistered), 'runs': []}
+
+    def add_crawler(self, name, duration, outcome='SUCCEEDED', busy_for=0):
+        """`busy_for` > 0: a scheduled crawl started just now and is still running."""
+        crawler = {'duration': duration, 'outcome': outcome, 'crawls': []}
+        if busy_for:
+            crawler['crawls'].append({'start': self.clock.time(), 'end': self.clock.time() + busy_for})
+        self.crawlers[name] = crawler
+
+    def _job(self, name):
+        if name not in self.jobs:
+            raise self.exceptions.EntityNotFoundException(f"Job {name} not found")
+        return self.jobs[name]
+
+    def _run_state(self, job, run):
+        """JobRunState now; on the first look after it ended, a run with new rows moves the watermark."""
+        if self.clock.time() < run['end']:
+            return 'RUNNING'
+        if not run['settled']:
+            run['settled'] = True
+            watermark_path = run['arguments'].get('--watermark_path', '')
+            if job['outcome'] == 'SUCCEEDED' and job['new_rows'] and watermark_path and self.s3:
+                bucket, key = watermark_path[len('s3://'):].split('/', 1)
+                newest = datetime.datetime.fromtimestamp(run['end'], datetime.timezone.utc).isoformat()
+                state = {'watermark': newest}
+                if job['unregistered']:
+                    state['unregistered_dates'] = job['unregistered']
+                self.s3.put_object(Bucket=bucket, Key=key, Body=json.dumps(state).encode())
+        return job['outcome']
+
+    def _run_dict(self, job, run):
+        state = self._run_state(job, run)
+        result = {'Id': run['id'], 'JobRunState': state, 'Arguments': run['arguments'],
+                  'ExecutionTime': int(min(self.clock.time(), run['end']) - run['start'])}
+        if state not in ('RUNNING', 'SUCCEEDED'):
+            result['ErrorMessage'] = f"simulated {state.lower()}"
+        return result
+
+    def get_job(self, JobName):
+        self.calls['GetJob'] += 1
+        return {'Job': {'Name': JobName, 'DefaultArguments': dict(self._job(JobName)['arguments'])}}
+
+    def start_job_run(self, JobName, Arguments=None):
+        with self.lock:
+            self.calls['StartJobRun'] += 1
+            job = self._job(JobName)
+            if any(self._run_state(job, run) == 'RUNNING' for run in job['runs']):
+                raise self.exceptions.ConcurrentRunsExceededException(f"Job {JobName} is already running")
+            now = self.clock.time()
+            run = {'id': f"jr_{JobName}_{len(job['runs'])}", 'start': now, 'end': now + job['duration'],
+                   'arguments': {**job['arguments'], **(Arguments or {})}, 'settled': False}
+            job['runs'].append(run)
+            self.log.append((now, 'StartJobRun', JobName))
+            return {'JobRunId': run['id']}
+
+    def get_job_run(self, JobName, RunId, PredecessorsIncluded=False):
+        self.calls['GetJobRun'] += 1
+        job = self._job(JobName)
+        run = next(run for run in job['runs'] if run['id'] == RunId)
+        return {'JobRun': self._run_dict(job, run)}
+
+    def get_job_runs(self, JobName, MaxResults=100):
+        self.calls['GetJobRuns'] += 1
+        job = self._job(JobName)
+        return {'JobRuns': [self._run_dict(job, run) for run in reversed(job['runs'][-MaxResults:])]}
+
+    def start_crawler(self, Name):
+        self.calls['StartCrawler'] += 1
+        crawler = self.crawlers[Name]
+        now = self.clock.time()
+        if crawler['crawls'] and now < crawler['crawls'][-1]['end']:
+            raise self.exceptions.CrawlerRunningException(f"Crawler {Name} is running")
+        crawler['crawls'].append({'start': now, 'end': now + crawler['duration']})
+        self.log.append((now, 'StartCrawler', Name))
+
+    def get_crawler(self, Name):
+        self.calls['GetCrawler'] += 1
+        crawler = self.crawlers[Name]
+        result = {'Name': Name, 'State': 'READY'}
+        if crawler['crawls']:
+            crawl = crawler['crawls'][-1]
+            if self.clock.time() < crawl['end']:
+                result['State'] = 'RUNNING'
+                crawl = crawler['crawls'][-2] if len(crawler['crawls']) > 1 else None
+            if crawl:
+                result['LastCrawl'] = {'Status': crawler['outcome'],
+                                       'StartTime': datetime.datetime.fromtimestamp(crawl['start'],
+                                                                                    datetime.timezone.utc)}
+        return {'Crawler': result}
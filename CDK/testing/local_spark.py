@@ -0,0 +1,78 @@
+"""
+local_spark.py
+
+Local PySpark helpers for exercising the Glue ETL code in lib/scripts without Glue:
+a small SparkSession and synthetic GPS/ENV/HEA frames shaped like the exports.
+"""
+
+import os
+import sys
+
+from pyspark.sql import SparkSession
+from pyspark.sql import functions as F
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib', 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+
+def spark_session(app_name='wildlife-etl-local'):
+    """Local SparkSession with shuffle partitions sized for a laptop."""
+    return (SparkSession.builder
+            .master('local[*]')
+            .appName(app_name)
+            .config('spark.sql.shuffle.partitions', '8')
+            .config('spark.ui.enabled', 'false')
+            .getOrCreate())
+
+
+def _timestamps(epoch, step_seconds, num_ids):
+    """ISO-8601 Timestamp string for row `id`, one fix per collar every `step_seconds`."""
+    seconds = (F.col('id') / num_ids).cast('long') * step_seconds
+    return F.from_unixtime(F.unix_timestamp(F.lit(epoch)) + seconds, "yyyy-MM-dd'T'HH:mm:ss")
+
+
+def synthetic_gps(spark, rows, num_elk=100, epoch='2025-01-01 00:00:00', step_seconds=900, seed=7):
+    """GPS export rows: SensorId, Topic, Timestamp, Latitude, Longitude."""
+    return (spark.range(rows)
+            .withColumn('SensorId', (F.col('id') % num_elk).cast('string'))
+            .withColumn('Topic', F.lit('IoT/GPS'))
+            .withColumn('Timestamp', _timestamps(epoch, step_seconds, num_elk))
+            .withColumn('Latitude', 53.0 + F.rand(seed) * 0.2)
+            .withColumn('Longitude', -127.0 - F.rand(seed + 1) * 1.0)
+            .drop('id'))
+
+
+def synthetic_env(spark, rows, num_sensors=10, epoch='2025-01-01 00:00:00', step_seconds=900, seed=11):
+    """ENV export rows: SensorId, Topic, Timestamp, Latitude, Longitude, Temperature, Humidity, WindDirection."""
+    directions = F.array(*[F.lit(d) for d in
+                           ['North', 'North-East', 'East', 'South-East', 'South', 'South-West', 'West', 'North-West']])
+    sensor = F.col('id') % num_sensors
+    return (spark.range(rows)
+            .withColumn('SensorId', sensor.cast('string'))
+            .withColumn('Topic', F.lit('IoT/ENV'))
+            .withColumn('Timestamp', _timestamps(epoch, step_seconds, num_sensors))
+            .withColumn('Latitude', 53.0 + (sensor * 7 % 13) / 13.0 * 0.2)
+            .withColumn('Longitude', -127.0 - (sensor * 5 % 11) / 11.0)
+            .withColumn('Temperature', -5 + F.rand(seed) * 35)
+            .withColumn('Humidity', 20 + F.rand(seed + 1) * 80)
+            .withColumn('WindDirection', directions[(F.rand(seed + 2) * 8).cast('int')])
+            .drop('id'))
+
+
+def synthetic_hea(spark, rows, num_elk=100, epoch='2025-01-01 00:00:00', step_seconds=900, seed=13):
+    """HEA export rows with the df_clean schema from etl_HEAtoDb.py."""
+    postures = F.array(F.lit('Standing'), F.lit('Lying Down'), F.lit('On Side'))
+    elk = F.col('id') % num_elk
+    return (spark.range(rows)
+            .withColumn('SensorId', elk.cast('string'))
+            .withColumn('ElkId', elk.cast('string'))
+            .withColumn('Topic', F.lit('IoT/HEA'))
+            .withColumn('Timestamp', F.regexp_replace(_timestamps(epoch, step_seconds, num_elk), 'T', ' '))
+            .withColumn('Posture', postures[(F.rand(seed) * 3).cast('int')])
+            .withColumn('HeartRate', (30 + F.rand(seed + 1) * 20).cast('int'))
+            .withColumn('RespirationRate', (10 + F.rand(seed + 2) * 25).cast('int'))
+            .withColumn('BodyTemperature', 36.5 + F.rand(seed + 3) * 3)
+            .withColumn('HydrationLevel', 50 + F.rand(seed + 4) * 50)
+            .withColumn('ActivityLevel', F.rand(seed + 5))
+            .withColumn('StressLevel', F.rand(seed + 6) * 10)
+            .drop('id'))
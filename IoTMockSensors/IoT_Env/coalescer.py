@@ -0,0 +1,71 @@
+"""
+coalescer.py
+
+Combines several publish ticks into one MQTT message, trading delivery delay for fewer
+messages (and fewer *TopicProcessor Lambda invocations):
+- Buffers create_topic() messages until COALESCE_TICKS of them are waiting, or until the
+  next one would take the message past COALESCE_MAX_BYTES
+- Emits {"messageId", "topic", "timestamp", "snapshots": [{"timestamp", "payload"}, ...]},
+  which the topic processors unpack with compact_codec.snapshots(); the messageId is the
+  first tick's, so IoT Core re-deliveries are still de-duplicated on it
+- With one tick per message (the default) messages pass through unchanged
+"""
+
+import json
+
+ENVELOPE_BYTES = 160  # messageId, topic, timestamp and keys around the snapshots
+
+
+class Coalescer:
+    """
+    Parameters:
+        max_ticks (int): Publish ticks per message; 1 disables coalescing.
+        max_bytes (int): Budget for the JSON message (IoT Core accepts up to 128 KB).
+    """
+
+    def __init__(self, max_ticks=1, max_bytes=64 * 1024):
+        self.max_ticks = max(1, int(max_ticks))
+        self.max_bytes = max_bytes
+        self.stats = {'ticks': 0, 'messages': 0}
+
+        self._ticks = []
+        self._bytes = ENVELOPE_BYTES
+
+    def pending(self):
+        """Ticks waiting to be sent."""
+        return len(self._ticks)
+
+    def add(self, message):
+        """Buffer one create_topic() message; returns the messages now ready to publish (usually 0 or 1)."""
+        self.stats['ticks'] += 1
+        if self.max_ticks == 1:
+            self.stats['messages'] += 1
+            return [message]
+
+        snapshot = {'timestamp': message['timestamp'], 'payload': message['payload']}
+        size = len(json.dumps(snapshot)) + 2
+        ready = []
+        if self._ticks and self._bytes + size > self.max_bytes:
+            ready = self.flush()  # This tick would not fit: send what is waiting and start again
+        self._ticks.append((message, snapshot))
+        self._bytes += size
+        if len(self._ticks) >= self.max_ticks or self._bytes >= self.max_bytes:
+            ready += self.flush()
+        return ready
+
+    def flush(self):
+        """Combine whatever is buffered into one message; returns [] when nothing is waiting."""
+        if not self._ticks:
+            return []
+        first, _ = self._ticks[0]
+        last, _ = self._ticks[-1]
+        combined = {
+            'messageId': first['messageId'],
+            'topic': first['topic'],
+            'timestamp': last['timestamp'],
+            'snapshots': [snapshot for _, snapshot in self._ticks],
+        }
+        self._ticks = []
+        self._bytes = ENVELOPE_BYTES
+        self.stats['messages'] += 1
+        return [combined]
@@ -0,0 +1,220 @@
+"""
+compact_codec.py
+
+Compact binary encoding for collar/sensor messages, shared by the sensor containers
+(encoder) and the *TopicProcessor Lambdas (decoder). Standard library only.
+
+- Fixed header: magic, version, sensor kind, raw 16-byte messageId, float64 timestamp
+- Records follow a per-kind schema, so field names are never sent
+- Numbers are fixed-point and delta-encoded against the previous record as zigzag
+  varints; neighbouring collars differ by a few metres, so a coordinate is 1-3 bytes
+- Enumerated strings (posture, wind direction) are sent as one-byte indexes
+
+A coalesced message (several publish ticks in one, see the transmitters' coalescer.py)
+carries {"timestamp", "payload"} snapshots instead of a single payload. It is encoded as
+version 2: the snapshot count, then per snapshot its float64 timestamp and records, with
+the deltas running on across snapshots. snapshots() gives both shapes as one list.
+
+Binary messages are published on '<topic>/bin'. The IoT rule for that topic forwards
+them as {"payload_b64": ..., "topic": ...}, and decode_event() turns that back into the
+same dict a JSON message produces, so both formats are accepted side by side.
+"""
+
+import base64
+import calendar
+import struct
+import time
+import uuid
+
+MAGIC = 0xC7
+VERSION = 1
+SNAPSHOTS_VERSION = 2  # Coalesced message: a list of timestamped payloads
+HEADER = struct.Struct('<BBB16sd')  # magic, version, kind, messageId bytes, epoch timestamp
+SNAPSHOT_TIME = struct.Struct('<d')
+BINARY_TOPIC_SUFFIX = '/bin'
+HEA_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+WIND_DIRECTIONS = ["North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"]
+POSTURES = ["Standing", "Lying Down", "On Side"]
+
+# Per-kind record layout: (field, type, argument)
+#   'int'   -> delta varint of an integer
+#   'fixed' -> delta varint of round(value * 10**argument); decoded as a float with `argument` decimals
+#   'enum'  -> one byte, index into the `argument` list
+#   'time'  -> HEA_TIME_FORMAT string as a delta varint of epoch seconds
+SCHEMAS = {
+    'gps': (1, [
+        ('elk_id', 'int', None),
+        ('lat', 'fixed', 6),  # ~0.1 m
+        ('lon', 'fixed', 6),
+    ]),
+    'env': (2, [
+        ('sensor_id', 'int', None),
+        ('lat', 'fixed', 6),
+        ('lon', 'fixed', 6),
+        ('temperature', 'fixed', 2),
+        ('humidity', 'fixed', 2),
+        ('wind_direction', 'enum', WIND_DIRECTIONS),
+    ]),
+    'hea': (3, [
+        ('sensor_id', 'int', None),
+        ('elk_id', 'int', None),
+        ('timestamp', 'time', None),
+        ('body_temperature', 'fixed', 2),
+        ('heart_rate', 'fixed', 1),
+        ('respiration_rate', 'fixed', 1),
+        ('activity_level', 'fixed', 3),
+        ('posture', 'enum', POSTURES),
+        ('hydration_level', 'fixed', 2),
+        ('stress_level', 'fixed', 3),
+    ]),
+}
+KINDS_BY_ID = {kind_id: kind for kind, (kind_id, _) in SCHEMAS.items()}
+
+
+def _write_varint(out, value):
+    """Append a signed integer as a zigzag LEB128 varint."""
+    value = (value << 1) ^ (value >> 63)
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    """Read a zigzag LEB128 varint at `pos`; returns (value, new_pos)."""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return (result >> 1) ^ -(result & 1), pos
+        shift += 7
+
+
+def _initial_state(schema, timestamp):
+    """Delta baseline for the first record: zero, or the message time for 'time' fields."""
+    return [int(timestamp) if field_type == 'time' else 0 for _, field_type, _ in schema]
+
+
+def _encode_records(out, schema, records, previous, parsed_times):
+    _write_varint(out, len(records))
+    for record in records:
+        for i, (field, field_type, arg) in enumerate(schema):
+            value = record[field]
+            if field_type == 'enum':
+                if value not in arg:
+                    raise ValueError(f"{field}={value!r} has no compact code")
+                out.append(arg.index(value))
+                continue
+            if field_type == 'fixed':
+                value = int(round(value * 10 ** arg))
+            elif field_type == 'time':
+                if value not in parsed_times:
+                    parsed_times[value] = calendar.timegm(time.strptime(value, HEA_TIME_FORMAT))
+                value = parsed_times[value]
+            else:
+                value = int(value)
+            _write_varint(out, value - previous[i])
+            previous[i] = value
+
+
+def encode(kind, message):
+    """
+    Encode a create_topic() message of the given kind ('gps', 'env' or 'hea') to bytes,
+    or a coalesced message with 'snapshots' instead of 'payload'.
+
+    The topic is not included; the IoT rule adds it back with topic().
+    Raises ValueError for a record that does not fit the schema.
+    """
+    kind_id, schema = SCHEMAS[kind]
+    coalesced = 'snapshots' in message
+    out = bytearray(HEADER.pack(MAGIC, SNAPSHOTS_VERSION if coalesced else VERSION, kind_id,
+                                uuid.UUID(message['messageId']).bytes, message['timestamp']))
+
+    previous = _initial_state(schema, message['timestamp'])
+    parsed_times = {}  # Records in one message usually share a timestamp; strptime is the slow part
+    if not coalesced:
+        _encode_records(out, schema, message['payload'], previous, parsed_times)
+        return bytes(out)
+    _write_varint(out, len(message['snapshots']))
+    for snapshot in message['snapshots']:
+        out += SNAPSHOT_TIME.pack(snapshot['timestamp'])
+        _encode_records(out, schema, snapshot['payload'], previous, parsed_times)
+    return bytes(out)
+
+
+def _decode_records(data, pos, schema, previous, formatted_times):
+    count, pos = _read_varint(data, pos)
+    records = []
+    for _ in range(count):
+        record = {}
+        for i, (field, field_type, arg) in enumerate(schema):
+            if field_type == 'enum':
+                record[field] = arg[data[pos]]
+                pos += 1
+                continue
+            delta, pos = _read_varint(data, pos)
+            value = previous[i] = previous[i] + delta
+            if field_type == 'fixed':
+                record[field] = round(value / 10 ** arg, arg)
+            elif field_type == 'time':
+                if value not in formatted_times:
+                    formatted_times[value] = time.strftime(HEA_TIME_FORMAT, time.gmtime(value))
+                record[field] = formatted_times[value]
+            else:
+                record[field] = value
+        records.append(record)
+    return records, pos
+
+
+def decode(data):
+    """Decode bytes produced by encode() into a dict shaped like create_topic() output (minus topic)."""
+    magic, version, kind_id, message_id, timestamp = HEADER.unpack_from(data)
+    if magic != MAGIC or version not in (VERSION, SNAPSHOTS_VERSION):
+        raise ValueError(f"Not a compact v{VERSION}/v{SNAPSHOTS_VERSION} message (magic={magic:#x}, version={version})")
+    kind = KINDS_BY_ID[kind_id]
+    schema = SCHEMAS[kind][1]
+    pos = HEADER.size
+
+    previous = _initial_state(schema, timestamp)
+    formatted_times = {}
+    message = {'messageId': str(uuid.UUID(bytes=message_id)), 'timestamp': timestamp}
+    if version == VERSION:
+        message['payload'], pos = _decode_records(data, pos, schema, previous, formatted_times)
+        return message
+    count, pos = _read_varint(data, pos)
+    message['snapshots'] = []
+    for _ in range(count):
+        (snapshot_time,) = SNAPSHOT_TIME.unpack_from(data, pos)
+        records, pos = _decode_records(data, pos + SNAPSHOT_TIME.size, schema, previous, formatted_times)
+        message['snapshots'].append({'timestamp': snapshot_time, 'payload': records})
+    return message
+
+
+def snapshots(message):
+    """
+    The message's (timestamp, payload) snapshots as [{'timestamp', 'payload'}]: the
+    coalesced list, or the single payload of a plain message with the message timestamp.
+    """
+    if 'snapshots' in message:
+        return message['snapshots']
+    return [{'timestamp': message.get('timestamp'), 'payload': message.get('payload', [])}]
+
+
+def decode_event(event):
+    """
+    Return the IoT rule event as a JSON-style message dict.
+
+    Events from the binary rule carry {"payload_b64", "topic"} and are decoded;
+    JSON events are returned unchanged.
+    """
+    if 'payload_b64' not in event:
+        return event
+    message = decode(base64.b64decode(event['payload_b64']))
+    topic = event.get('topic', 'unknown_topic')
+    if topic.endswith(BINARY_TOPIC_SUFFIX):
+        topic = topic[:-len(BINARY_TOPIC_SUFFIX)]
+    message['topic'] = topic
+    return message
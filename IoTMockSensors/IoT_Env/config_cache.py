@@ -0,0 +1,97 @@
+"""
+config_cache.py
+
+TTL cache for the device settings kept in AWS SSM Parameter Store:
+- Fetches every watched parameter with one get_parameters call per TTL window
+- Reuses a single SSM client instead of building one per lookup
+- Optionally refreshes in a background thread so the publish loop never waits on SSM
+- Serves the last-known value when SSM is unreachable
+- Counts hits, misses, refreshes and failures
+"""
+
+import logging
+import threading
+import time
+import boto3
+
+
+class SsmConfigCache:
+    """
+    Caches a fixed set of SSM parameters under short names.
+
+    Parameters:
+        parameters (dict): Short name -> SSM parameter name, e.g. {'publish_interval': '/iot-settings/gps-publish-interval'}.
+        ttl (float): Seconds a fetched value is considered fresh.
+        client: Optional SSM client (or stub); created lazily once if omitted.
+        clock: Time source, injectable for tests.
+    """
+
+    def __init__(self, parameters, ttl=60.0, client=None, clock=time.monotonic):
+        self.parameters = dict(parameters)
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = {'hits': 0, 'misses': 0, 'fetches': 0, 'failures': 0, 'stale': 0}
+
+        self._client = client
+        self._values = {}
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = boto3.client('ssm')
+        return self._client
+
+    def get(self, name):
+        """
+        Return the cached value for `name`, refreshing inline only if the cache is
+        empty or past its TTL. Raises only if SSM has never returned a value.
+        """
+        if self._is_fresh():
+            self.stats['hits'] += 1
+            return self._values[name]
+
+        self.stats['misses'] += 1
+        self.refresh()
+        if name not in self._values:
+            raise KeyError(f"SSM parameter {self.parameters[name]} is not available")
+        return self._values[name]
+
+    def refresh(self, force=False):
+        """Fetch all parameters in one call; on failure keep serving the last-known values."""
+        with self._lock:
+            if not force and self._is_fresh():
+                return  # Another thread refreshed while we waited for the lock
+            try:
+                self.stats['fetches'] += 1
+                response = self.client.get_parameters(Names=list(self.parameters.values()), WithDecryption=False)
+                by_path = {p['Name']: p['Value'] for p in response['Parameters']}
+                self._values.update({name: by_path[path] for name, path in self.parameters.items() if path in by_path})
+                self._fetched_at = self.clock()
+            except Exception as e:
+                self.stats['failures'] += 1
+                if self._values:
+                    self.stats['stale'] += 1
+                    # Retry after a short back-off rather than on every call during an outage
+                    self._fetched_at = self.clock() - self.ttl + min(self.ttl, 5.0)
+                logging.warning(f"⚠️ SSM refresh failed, serving last-known config: {e}")
+
+    def start_background_refresh(self):
+        """Refresh shortly before each TTL expiry on a daemon thread so get() stays a cache hit."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._refresh_loop, name='ssm-config-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.ttl * 0.8):
+            self.refresh(force=True)
+
+    def _is_fresh(self):
+        return self._fetched_at is not None and self.clock() - self._fetched_at < self.ttl
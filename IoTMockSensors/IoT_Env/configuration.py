@@ -1,7 +1,11 @@
+import os
 import boto3
 from colorama import Fore, Style, init
 import time
 import uuid
+import json
+import compact_codec
+from config_cache import SsmConfigCache
 
 
 CLIENT_ID = "GnvCollar" # AWS IoT Core uses this clientId to track the connection state, manage session persistence, and route messages.
@@ -10,25 +14,26 @@ LOG_GROUP = "/docker/ENV"
 CERT_SECRET_NAME = "IoT/ENVThing/certs" #Path to certs
 TESTING = False
 LOG_STREAM = "mqtt_connect"
+CONFIG_TTL_SECONDS = float(os.environ.get("CONFIG_TTL_SECONDS", 60))  # How long SSM values are reused
+PAYLOAD_ENCODING = os.environ.get("PAYLOAD_ENCODING", "json")  # "json" or "compact" (binary, see compact_codec.py)
+COALESCE_TICKS = int(os.environ.get("COALESCE_TICKS", 1))  # Publish ticks per MQTT message; more means fewer messages but later delivery (see coalescer.py)
+COALESCE_MAX_BYTES = int(os.environ.get("COALESCE_MAX_BYTES", 64 * 1024))  # A coalesced message is sent early rather than grow past this
+
+# Topic name and publish interval, fetched together from SSM at most once per TTL window
+config_cache = SsmConfigCache({
+    "topic_name": "/iot-topics/env-topic-name",
+    "publish_interval": "/iot-settings/env-publish-interval",
+}, ttl=CONFIG_TTL_SECONDS)
 
 def setup_config():
     global ENV_TOPIC_NAME
-    ssm = boto3.client('ssm')
-    # Get a parameter
-    response = ssm.get_parameter(
-        Name='/iot-topics/env-topic-name',  # Name of the parameter you want to retrieve
-        WithDecryption=False  # Set to True if it's a SecureString parameter
-    )
-
-    # Extract the value
-    ENV_TOPIC_NAME = response['Parameter']['Value']
+    ENV_TOPIC_NAME = config_cache.get("topic_name")
+    config_cache.start_background_refresh()  # Keep the cache warm so the publish loop never waits on SSM
     print(f"{Fore.RED}*******************Retrieved {ENV_TOPIC_NAME}{Style.RESET_ALL}")
 
 def get_fresh_publish_interval():
     try:
-        ssm = boto3.client('ssm')
-        response = ssm.get_parameter(Name='/iot-settings/env-publish-interval', WithDecryption=False)
-        return int(response['Parameter']['Value'])
+        return int(config_cache.get("publish_interval"))
     except Exception as e:
         print(f"⚠️ Failed to fetch publish interval, using default: {e}")
         return 15  # Fallback default
@@ -53,3 +58,9 @@ def create_topic(payload):
         "timestamp": time.time(),
         "payload": transformed_payload
     }
+
+def encode_message(message):
+    """Serialize a create_topic() (or coalesced) message once; returns (topic, body) in the configured PAYLOAD_ENCODING."""
+    if PAYLOAD_ENCODING == "compact":
+        return ENV_TOPIC_NAME + compact_codec.BINARY_TOPIC_SUFFIX, compact_codec.encode("env", message)
+    return ENV_TOPIC_NAME, json.dumps(message)
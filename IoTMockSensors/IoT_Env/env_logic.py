@@ -1,40 +1,169 @@
-import random
+"""
+env_logic.py
+
+Simulates environment sensor readings:
+- Temperature, humidity and wind are smooth spatial fields over the survey area, drawn as
+  Gaussian processes with random Fourier features, so nearby sensors read similar values
+- Each field's feature weights follow an Ornstein-Uhlenbeck process, so the fields drift
+  smoothly over time; temperature and humidity also follow a daily cycle
+- The features at the sensor positions are computed once; each step is one matrix product
+  for all sensors and fields, and wind direction is binned for every sensor at once
+- Nothing runs at import time; the transmitter's sensors are placed on first use
+"""
+
 import math
+import os
+import time
+import numpy as np
 
 # Constants for environment simulation
-NUM_SENSORS = 10  # Adjust the number of sensors as needed
-RADIUS = 20  # Diameter for sensor coverage in degrees, approx 5 km
-
-# Initialize sensor positions with random starting points
-sensor_positions = []
-for _ in range(NUM_SENSORS):
-    start_lat, start_lon = 53.0, -127.0  # Central starting point for the sensors
-    angle = random.uniform(0, 2 * math.pi)
-    distance = random.uniform(0, RADIUS)
-    delta_lat = distance * math.cos(angle) / 111  # Convert degrees to approximate km
-    delta_lon = distance * math.sin(angle) / (111 * math.cos(math.radians(start_lat)))
-    sensor_positions.append([start_lat + delta_lat, start_lon + delta_lon])
-
-def get_wind_direction(base_direction="East"):
-    variability = 10  # The wind can vary by +/- 10 degrees
-    direction_change = random.uniform(-variability, variability)
-    directions = ["North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"]
-    base_index = directions.index(base_direction)
-    num_directions = len(directions)
-    new_index = (base_index + int(direction_change // (360 / num_directions))) % num_directions
-    return directions[new_index]
+NUM_SENSORS = int(os.environ.get("SENSOR_COUNT", 10))  # Adjust the number of sensors as needed
+RADIUS = 20  # Radius of sensor coverage in km around CENTER
+CENTER = (53.0, -127.0)  # Central starting point for the sensors (lat, lon)
+KM_PER_DEGREE = 111.0
+STEP_SECONDS = 15.0  # Default time between readings (the publish interval)
+MAX_STEP_SECONDS = 6 * 3600.0  # Longer gaps are treated as this (the fields are long decorrelated by then)
+DIRECTIONS = ["North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"]
+
+LENGTH_SCALE_KM = 5.0  # Distance over which the fields change noticeably
+FEATURES = 128  # Random Fourier features per field; more gives a closer match to the kernel
+
+# Per field: (mean, standard deviation around the mean, time constant of the drift in seconds)
+FIELDS = {
+    "temperature": (12.0, 3.0, 3 * 3600.0),  # Celsius
+    "humidity": (65.0, 10.0, 3 * 3600.0),  # Percentage
+    "wind_east": (3.0, 2.0, 1800.0),  # m/s; the prevailing wind blows toward the East
+    "wind_north": (0.0, 2.0, 1800.0),  # m/s
+}
+DAILY_CYCLE = {"temperature": 6.0, "humidity": -12.0}  # Amplitude of the daily swing, peaking mid-afternoon
+PEAK_HOUR = 15.0  # Local solar time of the daily maximum
+LIMITS = {"humidity": (0.0, 100.0)}
+
+MEANS = np.array([spec[0] for spec in FIELDS.values()])
+SCALES = np.array([spec[1] for spec in FIELDS.values()])
+TAU = np.array([spec[2] for spec in FIELDS.values()])
+CYCLE = np.array([DAILY_CYCLE.get(name, 0.0) for name in FIELDS])
+
+
+def random_positions(count, rng, radius=RADIUS):
+    """(count, 2) east/north offsets in km, scattered around CENTER the way the sensors always were."""
+    angle = rng.uniform(0, 2 * math.pi, count)
+    distance = rng.uniform(0, radius, count)
+    return np.column_stack([distance * np.sin(angle), distance * np.cos(angle)])
+
+
+def to_lat_lon(positions_km):
+    """Convert east/north km offsets from CENTER to (latitude, longitude) arrays in degrees."""
+    latitude = CENTER[0] + positions_km[:, 1] / KM_PER_DEGREE
+    longitude = CENTER[1] + positions_km[:, 0] / (KM_PER_DEGREE * math.cos(math.radians(CENTER[0])))
+    return latitude, longitude
+
+
+def wind_direction_codes(east, north):
+    """Index into DIRECTIONS of the compass point each wind vector blows toward."""
+    bearing = np.degrees(np.arctan2(east, north))
+    return np.rint(bearing / (360 / len(DIRECTIONS))).astype(np.int64) % len(DIRECTIONS)
+
+
+class EnvironmentField:
+    """
+    Smooth, time-varying temperature, humidity and wind over the survey area.
+
+    Every field is sqrt(2/M) * sum_m w_m * cos(omega_m . x + phi_m) scaled to its standard
+    deviation, with omega drawn for a squared-exponential kernel of LENGTH_SCALE_KM, so
+    any pair of points has the kernel's correlation. The weights w are unit-variance OU
+    processes, which keeps the fields stationary while they change.
+
+    sample() reads the fields at the sensors (or at any other positions, e.g. a dense
+    grid for checking interpolation); records() returns the sensor readings in the shape
+    configuration.create_topic expects.
+    """
+
+    def __init__(self, size=NUM_SENSORS, seed=None, start=None, positions_km=None, features=FEATURES):
+        self.rng = np.random.default_rng(seed)
+        self.now = time.time() if start is None else start
+        self.positions_km = random_positions(size, self.rng) if positions_km is None else np.asarray(positions_km, float)
+        self.size = len(self.positions_km)
+        self.latitude, self.longitude = to_lat_lon(self.positions_km)
+
+        self.frequencies = self.rng.normal(0.0, 1.0 / LENGTH_SCALE_KM, (features, 2))
+        self.phases = self.rng.uniform(0, 2 * math.pi, features)
+        self.weights = self.rng.standard_normal((features, len(FIELDS)))  # Stationary start
+        # Sensors don't move, so their features are reused by every step
+        self._features = self.features_at(self.positions_km)
+        self._noise = np.empty_like(self.weights)
+        self._coefficients = (None, None, None)
+
+    def features_at(self, positions_km):
+        """(len(positions_km), FEATURES) random Fourier features at east/north km offsets."""
+        projected = np.asarray(positions_km, float) @ self.frequencies.T
+        projected += self.phases
+        np.cos(projected, out=projected)
+        projected *= math.sqrt(2.0 / len(self.phases))
+        return projected
+
+    def step(self, dt=STEP_SECONDS):
+        """Advance the fields by `dt` seconds."""
+        dt = min(max(dt, 0.0), MAX_STEP_SECONDS)
+        self.now += dt
+        if self._coefficients[0] != dt:
+            decay = np.exp(-dt / TAU)
+            self._coefficients = (dt, decay, np.sqrt(1.0 - decay * decay))
+        _, decay, scale = self._coefficients
+        self.weights *= decay
+        self.weights += self.rng.standard_normal(out=self._noise) * scale
+
+    def means(self):
+        """Each field's mean now: its base mean plus the daily cycle at CENTER's solar time."""
+        solar_hours = (self.now / 3600.0 + CENTER[1] / 15.0) % 24
+        return MEANS + CYCLE * math.cos(2 * math.pi * (solar_hours - PEAK_HOUR) / 24)
+
+    def sample(self, positions_km=None):
+        """(positions, len(FIELDS)) field values at the sensors, or at `positions_km` if given."""
+        features = self._features if positions_km is None else self.features_at(positions_km)
+        values = features @ self.weights
+        values *= SCALES
+        values += self.means()
+        for name, (low, high) in LIMITS.items():
+            column = list(FIELDS).index(name)
+            np.clip(values[:, column], low, high, out=values[:, column])
+        return values
+
+    def records(self):
+        """Current readings at the sensors as a list of dicts."""
+        values = self.sample()
+        directions = wind_direction_codes(values[:, 2], values[:, 3])
+        columns = zip(
+            self.latitude.tolist(),
+            self.longitude.tolist(),
+            np.round(values[:, 0], 2).tolist(),
+            np.round(values[:, 1], 2).tolist(),
+            directions.tolist(),
+        )
+        return [
+            {
+                "latitude": lat,
+                "longitude": lon,
+                "temperature": temperature,
+                "humidity": humidity,
+                "wind_direction": DIRECTIONS[direction],
+            }
+            for lat, lon, temperature, humidity, direction in columns
+        ]
+
+    def readings(self):
+        """Advance by the wall time since the previous reading and return the records."""
+        self.step(time.time() - self.now)
+        return self.records()
+
+
+# Default sensors used by the transmitter, placed on the first reading
+field = None
+
 
 def update_environment_data():
-    environment_data = []
-    for lat, lon in sensor_positions:
-        temperature = random.uniform(-5, 30)  # Temperature in Celsius
-        humidity = random.uniform(20, 100)  # Humidity in percentage
-        wind_direction = get_wind_direction()  # Get dynamic wind direction
-        environment_data.append({
-            "latitude": lat,
-            "longitude": lon,
-            "temperature": temperature,
-            "humidity": humidity,
-            "wind_direction": wind_direction
-        })
-    return environment_data
+    """Return the next set of readings from the default NUM_SENSORS sensors."""
+    global field
+    if field is None:
+        field = EnvironmentField(start=time.time() - STEP_SECONDS)
+    return field.readings()
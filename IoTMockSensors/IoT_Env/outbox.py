@@ -0,0 +1,202 @@
+"""
+outbox.py
+
+Disk-backed store-and-forward queue for the transmitters' MQTT publishes:
+- A message that cannot be published (no connection, publish error) goes into a SQLite
+  file instead of the MQTT client's in-memory offline queue, so it survives restarts and
+  a long outage costs disk, not RAM
+- While a backlog exists, new messages queue behind it so publish order is kept
+- After reconnecting, a background thread replays the backlog oldest first in batches:
+  one read and one delete transaction per batch, the batch's QoS 1 publishes in flight
+  together, capped in messages/s and bytes/s so a day's backlog does not trip the
+  broker's per-connection limits or flood the topic processors
+- The file is capped at max_messages; beyond that the oldest messages are evicted
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# AWS IoT Core allows 100 publishes/s and 512 KB/s per connection; replay stays under both
+REPLAY_RATE = float(os.environ.get('OUTBOX_REPLAY_RATE', 80))
+REPLAY_BYTES_PER_SECOND = float(os.environ.get('OUTBOX_REPLAY_BYTES_PER_SECOND', 400 * 1024))
+BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 50))
+MAX_MESSAGES = int(os.environ.get('OUTBOX_MAX_MESSAGES', 200000))  # ~35 days of one message every 15 s
+
+
+class Outbox:
+    """
+    SQLite-backed queue of (topic, body) messages, shared by the publish loop and the
+    replay thread. The database is opened on first use.
+
+    Parameters:
+        path (str): SQLite file.
+        max_messages (int): Messages kept before the oldest are evicted.
+        batch_size (int): Messages read, published and acknowledged together on replay.
+        rate (float): Replay messages per second.
+        byte_rate (float): Replay payload bytes per second.
+        ack_timeout (float): Seconds to wait for a batch's PUBACKs before giving up.
+    """
+
+    def __init__(self, path, max_messages=MAX_MESSAGES, batch_size=BATCH_SIZE, rate=REPLAY_RATE,
+                 byte_rate=REPLAY_BYTES_PER_SECOND, ack_timeout=30.0):
+        self.path = path
+        self.max_messages = max_messages
+        self.batch_size = batch_size
+        self.rate = rate
+        self.byte_rate = byte_rate
+        self.ack_timeout = ack_timeout
+        self.stats = {'stored': 0, 'replayed': 0, 'batches': 0, 'evicted': 0, 'replay_seconds': 0.0}
+
+        self._db = None
+        self._count = 0
+        self._lock = threading.Lock()
+        self._replay_thread = None
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')  # Durable across process restarts; one fsync per checkpoint
+            self._db.execute('CREATE TABLE IF NOT EXISTS outbox ('
+                             'id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, '
+                             'body BLOB NOT NULL, is_text INTEGER NOT NULL, stored_at REAL NOT NULL)')
+            self._count = self._db.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+        return self._db
+
+    def pending(self):
+        """Messages waiting to be published."""
+        with self._lock:
+            self._connect()
+            return self._count
+
+    def put(self, topic, body):
+        """Store one message (str or bytes) at the end of the queue."""
+        is_text = isinstance(body, str)
+        with self._lock:
+            db = self._connect()
+            db.execute('INSERT INTO outbox (topic, body, is_text, stored_at) VALUES (?, ?, ?, ?)',
+                       (topic, body.encode() if is_text else body, int(is_text), time.time()))
+            self._count += 1
+            self.stats['stored'] += 1
+            excess = self._count - self.max_messages
+            if excess > 0:
+                db.execute('DELETE FROM outbox WHERE id IN (SELECT id FROM outbox ORDER BY id LIMIT ?)', (excess,))
+                self._count -= excess
+                self.stats['evicted'] += excess
+
+    def _read_batch(self):
+        with self._lock:
+            rows = self._connect().execute('SELECT id, topic, body, is_text FROM outbox ORDER BY id LIMIT ?',
+                                           (self.batch_size,)).fetchall()
+        return [(row_id, topic, body.decode() if is_text else body) for row_id, topic, body, is_text in rows]
+
+    def _delete(self, ids):
+        with self._lock:
+            db = self._connect()
+            db.execute('BEGIN')
+            db.executemany('DELETE FROM outbox WHERE id = ?', [(row_id,) for row_id in ids])
+            db.execute('COMMIT')
+            self._count -= len(ids)
+
+    def publish(self, client, topic, body):
+        """
+        Publish one message now, or store it: when there is no client, when a backlog is
+        waiting (it is queued behind it), or when the publish fails (the error is re-raised
+        so the caller can reconnect). Returns True if it was published directly.
+        """
+        if client is None:
+            self.put(topic, body)
+            return False
+        if self.pending():
+            self.put(topic, body)
+            self.resume(client)
+            return False
+        try:
+            client.publish(topic, body, 1)
+            return True
+        except Exception:
+            self.put(topic, body)
+            raise
+
+    def publish_batch(self, client, batch):
+        """
+        Publish a batch with every QoS 1 publish in flight at once (publishAsync) and wait
+        for the PUBACKs. Returns (ids of the acknowledged messages, publish error or None).
+        """
+        acked = []
+        in_flight = {}
+        done = threading.Condition()
+
+        def on_ack(mid):
+            with done:
+                if mid in in_flight:
+                    acked.append(in_flight.pop(mid))
+                done.notify()
+
+        error = None
+        try:
+            for row_id, topic, body in batch:
+                with done:  # The PUBACK may arrive before publishAsync returns its message id
+                    in_flight[client.publishAsync(topic, body, 1, ackCallback=on_ack)] = row_id
+        except Exception as e:
+            error = e  # Connection lost mid-batch: keep what was acknowledged
+        with done:
+            done.wait_for(lambda: not in_flight, timeout=self.ack_timeout)
+            return list(acked), error
+
+    def replay(self, client, stop=None):
+        """
+        Publish the backlog oldest first until it is empty, at most `rate` messages and
+        `byte_rate` bytes per second. Raises if a batch is not fully acknowledged (the
+        unacknowledged messages stay queued). Returns the number of messages replayed.
+        """
+        started = time.monotonic()
+        sent = sent_bytes = 0
+        while stop is None or not stop.is_set():
+            batch = self._read_batch()
+            if not batch:
+                break
+            # Pace by what has been sent so far: the batch may start once the budget allows it
+            wait = max(sent / self.rate, sent_bytes / self.byte_rate) - (time.monotonic() - started)
+            if wait > 0:
+                time.sleep(wait)
+            acked, error = self.publish_batch(client, batch)
+            if acked:
+                self._delete(acked)
+            acked_ids = set(acked)
+            sent += len(acked)
+            sent_bytes += sum(len(body) for row_id, _, body in batch if row_id in acked_ids)
+            self.stats['replayed'] += len(acked)
+            self.stats['batches'] += 1
+            if len(acked) < len(batch):
+                raise IOError(f"{len(batch) - len(acked)} of {len(batch)} replayed messages were not "
+                              f"acknowledged: {error or 'PUBACK timeout'}")
+        self.stats['replay_seconds'] += time.monotonic() - started
+        return sent
+
+    def resume(self, client):
+        """Replay the backlog on a background thread, unless empty or already replaying."""
+        if client is None or not self.pending():
+            return
+        if self._replay_thread is not None and self._replay_thread.is_alive():
+            return
+        self._replay_thread = threading.Thread(target=self._replay_worker, args=(client,), daemon=True)
+        self._replay_thread.start()
+
+    def _replay_worker(self, client):
+        pending = self.pending()
+        started = time.monotonic()
+        try:
+            sent = self.replay(client)
+            logging.info(f"Outbox: replayed {sent} of {pending} queued messages in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            logging.warning(f"Outbox: replay stopped with {self.pending()} messages queued: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
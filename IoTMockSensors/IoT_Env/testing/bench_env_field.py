@@ -0,0 +1,164 @@
+"""
+bench_env_field.py
+
+Benchmarks the field engine (EnvironmentField in env_logic.py) against the previous
+per-sensor random.uniform loop for 1M sensor-readings, split over grids from the default
+10 sensors up to 100k, and checks what the generated fields look like:
+- importing env_logic places no sensors and draws nothing
+- the correlation between two sensors falls off with distance like the squared-exponential
+  kernel (the old generator's independent draws gave ~0 at every distance)
+- held-out sensors in a dense grid can be interpolated from their neighbours, and each
+  sensor's readings drift smoothly from one tick to the next
+- wind directions cover the compass around the prevailing East wind
+
+Usage:
+    pip install numpy
+    python testing/bench_env_field.py [--readings 1000000]
+"""
+
+import argparse
+import collections
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import env_logic
+from env_logic import DIRECTIONS, FIELDS, LENGTH_SCALE_KM, STEP_SECONDS, EnvironmentField
+
+GRID_SIZES = [10, 1_000, 10_000, 100_000]
+TEMPERATURE_SD = FIELDS['temperature'][1]
+COMPASS = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']  # Short labels for DIRECTIONS
+
+
+def legacy_wind_direction(base_direction="East"):
+  variability = 10  # The wind can vary by +/- 10 degrees
+  direction_change = random.uniform(-variability, variability)
+  directions = ["North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"]
+  base_index = directions.index(base_direction)
+  num_directions = len(directions)
+  new_index = (base_index + int(direction_change // (360 / num_directions))) % num_directions
+  return directions[new_index]
+
+
+def legacy_generate(positions):
+  """The generator before EnvironmentField: independent draws per sensor per call."""
+  environment_data = []
+  for lat, lon in positions:
+    environment_data.append({
+      "latitude": lat,
+      "longitude": lon,
+      "temperature": random.uniform(-5, 30),
+      "humidity": random.uniform(20, 100),
+      "wind_direction": legacy_wind_direction(),
+    })
+  return environment_data
+
+
+def timed(function, repeats):
+  started = time.perf_counter()
+  for _ in range(repeats):
+    function()
+  return time.perf_counter() - started
+
+
+def check_no_import_side_effects():
+  assert env_logic.field is None
+  print("✅ importing env_logic places no sensors")
+
+
+def check_spatial_correlation(draws=400, distances=(0.5, 2.0, 5.0, 10.0, 20.0)):
+  """Temperature correlation between two points `distance` km apart, over independent fields."""
+  origin = np.zeros((1, 2))
+  points = np.vstack([origin] + [[[d, 0.0]] for d in distances])
+  samples = np.array([EnvironmentField(seed=seed, positions_km=points).sample()[:, 0] for seed in range(draws)])
+  legacy = np.array([[r['temperature'] for r in legacy_generate([(0, 0)] * len(points))] for _ in range(draws)])
+
+  print(f"{'distance km':>12}{'kernel':>9}{'field':>9}{'old':>9}")
+  for i, distance in enumerate(distances, start=1):
+    kernel = math.exp(-distance ** 2 / (2 * LENGTH_SCALE_KM ** 2))
+    measured = np.corrcoef(samples[:, 0], samples[:, i])[0, 1]
+    old = np.corrcoef(legacy[:, 0], legacy[:, i])[0, 1]
+    print(f"{distance:>12g}{kernel:>9.2f}{measured:>9.2f}{old:>9.2f}")
+    assert abs(measured - kernel) < 0.15, (distance, measured, kernel)
+  print("✅ sensor correlation follows the kernel's fall-off with distance")
+
+
+def idw_error(positions, values, held_out, neighbours=8):
+  """RMSE of inverse-distance-weighted estimates at `held_out` from the other sensors."""
+  known = np.setdiff1d(np.arange(len(positions)), held_out)
+  distances = np.linalg.norm(positions[held_out, None, :] - positions[None, known, :], axis=2)
+  nearest = np.argsort(distances, axis=1)[:, :neighbours]
+  weights = 1.0 / np.take_along_axis(distances, nearest, axis=1) ** 2
+  estimates = (weights * values[known][nearest]).sum(axis=1) / weights.sum(axis=1)
+  return float(np.sqrt(np.mean((estimates - values[held_out]) ** 2)))
+
+
+def check_interpolation_and_drift(size=10_000, held_out=500, steps=240):
+  field = EnvironmentField(size=size, seed=3)
+  held = np.random.default_rng(0).choice(size, held_out, replace=False)
+  temperature = field.sample()[:, 0]
+  legacy = np.array([r['temperature'] for r in legacy_generate(field.positions_km)])
+  error = idw_error(field.positions_km, temperature, held)
+  old_error = idw_error(field.positions_km, legacy, held)
+  print(f"IDW at {held_out} held-out sensors of {size}: RMSE {error:.2f} °C (field sd {TEMPERATURE_SD:g}), "
+        f"old generator {old_error:.2f} °C (sd {35 / math.sqrt(12):.1f})")
+  assert error < 0.2 * TEMPERATURE_SD and old_error > 0.9 * 35 / math.sqrt(12)
+
+  series = np.empty((steps, size))
+  for i in range(steps):
+    field.step()
+    series[i] = field.sample()[:, 0]
+  tick_change = np.abs(np.diff(series, axis=0)).mean()
+  legacy_change = np.mean([abs(a['temperature'] - b['temperature'])
+                           for a, b in zip(legacy_generate(field.positions_km[:1000]),
+                                           legacy_generate(field.positions_km[:1000]))])
+  print(f"mean change per {STEP_SECONDS:g} s tick: {tick_change:.3f} °C (old generator {legacy_change:.1f} °C)")
+  assert tick_change < 0.05 * TEMPERATURE_SD and legacy_change > 5
+  print("✅ held-out sensors interpolate from neighbours and readings drift smoothly")
+
+
+def check_wind(size=10_000, steps=200):
+  field = EnvironmentField(size=size, seed=4)
+  counts = collections.Counter()
+  for _ in range(steps):
+    field.step(600)
+    counts.update(r['wind_direction'] for r in field.records())
+  old = collections.Counter(legacy_wind_direction() for _ in range(size * steps // 10))
+  share = lambda c: ' '.join(f"{label}={c[d] / sum(c.values()):.0%}" for label, d in zip(COMPASS, DIRECTIONS))
+  print(f"wind directions, field: {share(counts)}\n                 old:   {share(old)}")
+  assert counts.most_common(1)[0][0] == 'East' and len(counts) == len(DIRECTIONS)
+  print("✅ wind varies across the compass around the prevailing East wind")
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--readings', type=int, default=1_000_000, help='Sensor-readings per measurement')
+  args = parser.parse_args()
+
+  check_no_import_side_effects()
+  check_spatial_correlation()
+  check_interpolation_and_drift()
+  check_wind()
+
+  print(f"\n{args.readings:,} sensor-readings per row")
+  print(f"{'generator':<22}{'sensors':>10}{'steps':>9}{'sample only rec/s':>20}{'with dicts rec/s':>18}")
+  positions = list(zip(*env_logic.to_lat_lon(env_logic.random_positions(10, np.random.default_rng(0)))))
+  legacy_seconds = timed(lambda: legacy_generate(positions), args.readings // 10)
+  print(f"{'old random.uniform':<22}{10:>10}{args.readings // 10:>9}{'-':>20}{args.readings / legacy_seconds:>18,.0f}")
+  for size in GRID_SIZES:
+    steps = max(1, args.readings // size)
+    field = EnvironmentField(size=size, seed=42)
+    sample_seconds = timed(lambda: (field.step(), field.sample()), steps)
+    records_seconds = timed(lambda: (field.step(), field.records()), steps)
+    print(f"{'EnvironmentField':<22}{size:>10}{steps:>9}{size * steps / sample_seconds:>20,.0f}"
+          f"{size * steps / records_seconds:>18,.0f}")
+
+
+if __name__ == '__main__':
+  main()
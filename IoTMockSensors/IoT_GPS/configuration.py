@@ -6,10 +6,14 @@ Handles IoT device configuration:
 - Builds message payloads for transmission
 """
 
+import os
 import boto3
 from colorama import Fore, Style, init
 import time
 import uuid
+import json
+import compact_codec
+from config_cache import SsmConfigCache
 
 CLIENT_ID = "GPSCollar"
 GPS_TOPIC_NAME = None
@@ -17,38 +21,47 @@ LOG_GROUP = "/docker/GPS"
 CERT_SECRET_NAME = "IoT/GPSThing/certs"
 TESTING = False
 LOG_STREAM = "mqtt_connect"
+CONFIG_TTL_SECONDS = float(os.environ.get("CONFIG_TTL_SECONDS", 60))  # How long SSM values are reused
+PAYLOAD_ENCODING = os.environ.get("PAYLOAD_ENCODING", "json")  # "json" or "compact" (binary, see compact_codec.py)
+COALESCE_TICKS = int(os.environ.get("COALESCE_TICKS", 1))  # Publish ticks per MQTT message; more means fewer messages but later delivery (see coalescer.py)
+COALESCE_MAX_BYTES = int(os.environ.get("COALESCE_MAX_BYTES", 64 * 1024))  # A coalesced message is sent early rather than grow past this
+REPORTING_MODE = os.environ.get("REPORTING_MODE", "fixed")  # "fixed" sends every elk each interval, "adaptive" uses reporting_policy.py
+
+# Topic name and publish interval, fetched together from SSM at most once per TTL window
+config_cache = SsmConfigCache({
+    "topic_name": "/iot-topics/gps-topic-name",
+    "publish_interval": "/iot-settings/gps-publish-interval",
+}, ttl=CONFIG_TTL_SECONDS)
 
 def setup_config():
     """Fetch GPS topic name from AWS SSM and store in a global variable."""
     global GPS_TOPIC_NAME
     # SSM = Simple Systems Manager - outdated name for what is now AWS Systems Manager
-    ssm = boto3.client('ssm')
-    # Get a parameter
-    response = ssm.get_parameter(
-        Name='/iot-topics/gps-topic-name',  # Name of the parameter you want to retrieve
-        WithDecryption=False  # Set to True if it's a SecureString parameter
-    )
-
-    # Extract the value
-    GPS_TOPIC_NAME = response['Parameter']['Value']
+    GPS_TOPIC_NAME = config_cache.get("topic_name")
+    config_cache.start_background_refresh()  # Keep the cache warm so the publish loop never waits on SSM
     print(f"{Fore.RED}*******************Retrieved {GPS_TOPIC_NAME}{Style.RESET_ALL}")
 
 
 def get_fresh_publish_interval():
-    """Fetch the current GPS publish interval from SSM (in seconds)."""
+    """Return the current GPS publish interval (in seconds) from the SSM config cache."""
     try:
-        ssm = boto3.client('ssm')
-        response = ssm.get_parameter(Name='/iot-settings/gps-publish-interval', WithDecryption=False)
-        return int(response['Parameter']['Value'])
+        return int(config_cache.get("publish_interval"))
     except Exception as e:
         print(f"⚠️ Failed to fetch publish interval, using default: {e}")
         return 15  # Fallback default
 
-def create_topic(payload):
-  """Format a payload of elk positions into a message for AWS IoT Core."""
+def create_topic(payload, elk_ids=None):
+  """
+  Format a payload of elk positions into a message for AWS IoT Core.
+
+  `elk_ids` names the elk each position belongs to when only part of the herd is
+  reported (see reporting_policy.py); by default positions are numbered from 0.
+  """
+  if elk_ids is None:
+    elk_ids = range(len(payload))
   transformed_payload = [
-    {"elk_id": elk_id, "lat": lat, "lon": lon}
-    for elk_id, (lat, lon) in enumerate(payload)
+    {"elk_id": int(elk_id), "lat": lat, "lon": lon}
+    for elk_id, (lat, lon) in zip(elk_ids, payload)
   ]
   return {
     "messageId": str(uuid.uuid4()),
@@ -56,3 +69,9 @@ def create_topic(payload):
     "timestamp": time.time(),
     "payload": transformed_payload
   }
+
+def encode_message(message):
+  """Serialize a create_topic() (or coalesced) message once; returns (topic, body) in the configured PAYLOAD_ENCODING."""
+  if PAYLOAD_ENCODING == "compact":
+    return GPS_TOPIC_NAME + compact_codec.BINARY_TOPIC_SUFFIX, compact_codec.encode("gps", message)
+  return GPS_TOPIC_NAME, json.dumps(message)
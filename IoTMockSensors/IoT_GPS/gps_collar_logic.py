@@ -2,42 +2,103 @@
 gps_collar_logic.py
 
 Simulates elk GPS collar behavior:
-- Initializes 8 elk in random positions within specific 'circle'.
-- Updates elk positions with pseudo-random meandering toward a fixed destination
+- Initializes a herd of elk in random positions within specific 'circle'.
+- Updates elk positions with pseudo-random meandering toward a fixed destination, scaled by
+  the time since the previous update so the track doesn't depend on how often fixes are taken
+- Keeps the herd in contiguous NumPy arrays so 10k-1M collars move in one vectorized step
 """
 
-import random
 import math
+import os
+import time
+import numpy as np
 
-NUM_ELKS = 8  # Number of elk
+NUM_ELKS = int(os.environ.get("HERD_SIZE", 8))  # Number of elk
 RADIUS = 0.025  # Roughly 1 km in latitude/longitude degrees
+START_CENTRE = (53.0, -127.0)  # Central starting point
+END_CENTRE = (53.2, -128.0)  # Central ending point
+STEP_SECONDS = 15.0  # Time one step covers (the default publish interval); STEP_FRACTION and JITTER are per step
+STEP_FRACTION = 0.01  # Fraction of the remaining distance covered per step (smaller = more meandering)
+JITTER = 0.002  # Max random deviation per step, in degrees (roughly 100-200 m)
 
-# Initialize elk positions without elk_id, only lat and lon
-elk_positions = []
-for _ in range(NUM_ELKS):
-  start_lat, start_lon = 53.0, -127.0  # Central starting point
-  angle = random.uniform(0, 2 * math.pi)
-  distance = random.uniform(0, RADIUS)
-  delta_lat = distance * math.cos(angle) / 111
-  delta_lon = distance * math.sin(angle) / (111 * math.cos(math.radians(start_lat)))
-  initial_lat = start_lat + delta_lat
-  initial_lon = start_lon + delta_lon
-  elk_positions.append([initial_lat, initial_lon])
-
-def update_elk_positions():
-  """Update elk positions simulating random movement toward a fixed destination."""
-  for i, (lat, lon) in enumerate(elk_positions):
-    # Move each elk towards a final point, adding randomness for a meandering path
-    end_lat, end_lon = 53.2, -128.0  # Central ending point
-    lat_step = (end_lat - lat) / 100  # Smaller steps for more meandering
-    lon_step = (end_lon - lon) / 100
-
-    # Add randomness to each step
-    lat += lat_step + random.uniform(-0.002, 0.002)
-    lon += lon_step + random.uniform(-0.002, 0.002)
-
-    # Update elk's position
-    elk_positions[i] = [lat, lon]
+
+def random_points_in_circle(rng, count, centre, radius):
+  """Scatter `count` points uniformly in angle/distance around `centre` (radius in km-ish units)."""
+  centre_lat, centre_lon = centre
+  angle = rng.uniform(0, 2 * math.pi, count)
+  distance = rng.uniform(0, radius, count)
+  points = np.empty((count, 2))
+  points[:, 0] = centre_lat + distance * np.cos(angle) / 111
+  points[:, 1] = centre_lon + distance * np.sin(angle) / (111 * math.cos(math.radians(centre_lat)))
+  return points
+
+
+class ElkHerd:
+  """
+  NumPy-backed herd movement engine.
+
+  Positions live in one (n, 2) float64 array of [lat, lon]; every call to step()
+  moves all animals toward their destinations with a single vectorized update.
+  A step of dt seconds covers what dt / STEP_SECONDS steps would: the approach toward
+  the destination compounds, and the jitter grows like a random walk (with the square
+  root of the time), so stepping more often does not make the elk move faster.
+  """
+
+  def __init__(self, size=NUM_ELKS, start_centre=START_CENTRE, end_centre=END_CENTRE,
+               start_radius=RADIUS, end_radius=0.0, step_fraction=STEP_FRACTION,
+               jitter=JITTER, seed=None):
+    self.rng = np.random.default_rng(seed)
+    self.size = size
+    self.step_fraction = step_fraction
+    self.jitter = jitter
+    self.positions = random_points_in_circle(self.rng, size, start_centre, start_radius)
+    self.destinations = random_points_in_circle(self.rng, size, end_centre, end_radius)
+    # Scratch buffers reused every step so large herds don't allocate per tick
+    self._delta = np.empty_like(self.positions)
+    self._noise = np.empty_like(self.positions)
+    self._scales = (STEP_SECONDS, step_fraction, jitter)  # (dt, fraction, jitter) of the last step
+
+  def scales(self, dt):
+    """(fraction of the remaining distance, max jitter in degrees) covered in `dt` seconds."""
+    if self._scales[0] != dt:
+      steps = max(dt, 0.0) / STEP_SECONDS
+      self._scales = (dt, 1 - (1 - self.step_fraction) ** steps, self.jitter * math.sqrt(steps))
+    return self._scales[1:]
+
+  def step(self, dt=STEP_SECONDS):
+    """Advance every elk `dt` seconds toward its destination and return the positions array."""
+    fraction, jitter = self.scales(dt)
+    np.subtract(self.destinations, self.positions, out=self._delta)
+    self._delta *= fraction
+    self.rng.random(out=self._noise)  # U[0, 1) in place, rescaled to U[-jitter, jitter)
+    self._noise *= 2 * jitter
+    self._noise -= jitter
+    self.positions += self._delta
+    self.positions += self._noise
+    return self.positions
+
+  def as_list(self):
+    """Return positions as a list of [lat, lon] lists (the shape create_topic expects)."""
+    return self.positions.tolist()
+
+
+# Default herd used by the transmitter
+herd = ElkHerd()
+elk_positions = herd.as_list()
+last_update = None  # Time of the previous update_elk_positions call
+
+
+def update_elk_positions(now=None):
+  """
+  Update elk positions simulating random movement toward a fixed destination.
+
+  The herd moves by the time since the previous call (`now` defaults to the wall clock),
+  or by one STEP_SECONDS step on the first call.
+  """
+  global elk_positions, last_update
+  now = time.time() if now is None else now
+  herd.step(STEP_SECONDS if last_update is None else now - last_update)
+  last_update = now
+  elk_positions = herd.as_list()
   print(f"elk_positions {elk_positions}")
   return elk_positions
-
@@ -0,0 +1,134 @@
+"""
+reporting_policy.py
+
+Collar-side reporting policy for the GPS transmitter (REPORTING_MODE=adaptive):
+- Dead-band: an elk's fix is only sent once it has moved DEADBAND_METRES from its last sent fix
+- Adaptive rate: the next fix is taken when the fastest elk should have covered about one
+  dead-band, bounded to [interval / RATE_RANGE, interval * RATE_RANGE] around the SSM interval
+- Message budget: on average no more than one message per SSM interval, with up to RATE_RANGE
+  saved up for bursts, so a faster fix rate never sends more than RATE_RANGE messages over
+  what the fixed mode sends
+- Heartbeat: every elk is re-sent after HEARTBEAT_SECONDS of silence, moved or not
+State is kept per elk in NumPy arrays, like ElkHerd, so large herds are checked in one pass.
+"""
+
+import os
+import numpy as np
+
+# Suppress fixes closer than this to the last sent one. Keep it well above how far an elk
+# moves between two fixes (ElkHerd jitters ~150 m per 15 s step), or nothing is suppressed
+DEADBAND_METRES = float(os.environ.get("GPS_DEADBAND_METRES", 500))
+HEARTBEAT_SECONDS = float(os.environ.get("GPS_HEARTBEAT_SECONDS", 900))  # Longest an elk may go unreported
+RATE_RANGE = float(os.environ.get("GPS_RATE_RANGE", 4))  # How far the fix interval may move from the SSM interval
+SPEED_ALPHA = 0.5  # EWMA weight of the newest speed sample
+EARTH_RADIUS_METRES = 6371000.0
+
+
+def haversine_metres(a, b):
+  """Great-circle distance in metres between rows of two (n, 2) [lat, lon] arrays."""
+  lat1, lon1 = np.radians(a[:, 0]), np.radians(a[:, 1])
+  lat2, lon2 = np.radians(b[:, 0]), np.radians(b[:, 1])
+  h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+  return 2 * EARTH_RADIUS_METRES * np.arcsin(np.sqrt(h))
+
+
+class ReportingPolicy:
+  """
+  Decides which elk fixes to publish and when to take the next fix.
+
+  Parameters:
+      deadband (float): Metres an elk must move from its last sent fix before it is sent again.
+      heartbeat (float): Seconds after which an elk is sent regardless of movement.
+      rate_range (float): Factor by which the fix interval may shrink or grow around the base interval,
+          and the number of messages that may be saved up for a burst.
+      speed_alpha (float): EWMA weight for the per-elk speed estimate.
+  """
+
+  def __init__(self, deadband=DEADBAND_METRES, heartbeat=HEARTBEAT_SECONDS, rate_range=RATE_RANGE,
+               speed_alpha=SPEED_ALPHA):
+    self.deadband = deadband
+    self.heartbeat = heartbeat
+    self.rate_range = rate_range
+    self.speed_alpha = speed_alpha
+    self.stats = {'fixes': 0, 'sent': 0, 'suppressed': 0, 'heartbeats': 0, 'messages': 0}
+
+    self.last_sent = None  # (n, 2) last published position per elk
+    self.last_sent_at = None  # (n,) time of that publish
+    self.previous = None  # (n, 2) position at the previous fix, for speed
+    self.previous_at = None
+    self.speed = None  # (n,) EWMA speed in metres/second
+    self.budget = rate_range  # Messages that may be sent right away; refills at one per base interval
+    self.budget_at = None  # Time the budget was last refilled
+
+  def select(self, positions, now):
+    """
+    Return the indexes of the elk whose fix should be published at time `now`.
+
+    Parameters:
+        positions: (n, 2) array-like of [lat, lon], as returned by update_elk_positions().
+        now (float): Fix time in seconds (epoch or any monotonic clock).
+    """
+    positions = np.asarray(positions, dtype=float)
+    n = len(positions)
+    self.stats['fixes'] += n
+
+    if self.last_sent is None or len(self.last_sent) != n:
+      # First fix (or herd size changed): report everyone and start tracking
+      self.last_sent = positions.copy()
+      self.last_sent_at = np.full(n, now, dtype=float)
+      self.previous, self.previous_at = positions.copy(), now
+      self.speed = np.zeros(n)
+      self.stats['sent'] += n
+      self.spend(now)
+      return np.arange(n)
+
+    elapsed = now - self.previous_at
+    if elapsed > 0:
+      sample = haversine_metres(self.previous, positions) / elapsed
+      self.speed += self.speed_alpha * (sample - self.speed)
+    self.previous, self.previous_at = positions.copy(), now
+
+    moved = haversine_metres(self.last_sent, positions) >= self.deadband
+    overdue = now - self.last_sent_at >= self.heartbeat
+    send = moved | overdue
+    indexes = np.flatnonzero(send)
+
+    self.last_sent[send] = positions[send]
+    self.last_sent_at[send] = now
+    self.stats['sent'] += len(indexes)
+    self.stats['suppressed'] += n - len(indexes)
+    self.stats['heartbeats'] += int(np.count_nonzero(overdue & ~moved))
+    if len(indexes):
+      self.spend(now)
+    return indexes
+
+  def spend(self, now):
+    """Take one message from the budget (select() calls this whenever it sends anything)."""
+    self.stats['messages'] += 1
+    self.budget -= 1
+    if self.budget_at is None:
+      self.budget_at = now
+
+  def refill(self, base_interval, now):
+    """Add one message to the budget per `base_interval` since the last refill, up to rate_range."""
+    if self.budget_at is not None:
+      self.budget = min(self.rate_range, self.budget + (now - self.budget_at) / base_interval)
+    self.budget_at = now
+
+  def next_interval(self, base_interval, now):
+    """
+    Seconds until the next fix.
+
+    Aims for the fastest elk to move about one dead-band between fixes, kept within
+    rate_range of `base_interval` and never later than the next heartbeat due, but
+    no sooner than the message budget has room for the next message.
+    """
+    if self.speed is None:
+      return base_interval
+    self.refill(base_interval, now)
+    fastest = float(self.speed.max()) if len(self.speed) else 0.0
+    target = self.deadband / fastest if fastest > 0 else base_interval * self.rate_range
+    interval = min(max(target, base_interval / self.rate_range), base_interval * self.rate_range)
+    until_heartbeat = float((self.last_sent_at + self.heartbeat).min() - now) if len(self.last_sent_at) else interval
+    interval = max(base_interval / self.rate_range, min(interval, until_heartbeat))
+    return max(interval, (1 - self.budget) * base_interval)  # Wait for the budget to reach one message
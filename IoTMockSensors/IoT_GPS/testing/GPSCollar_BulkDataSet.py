@@ -1,59 +1,276 @@
-import csv
-import random
-import math
-from datetime import datetime, timedelta
+"""
+GPSCollar_BulkDataSet.py
+
+Synthetic bulk history generator for sizing the ETL jobs and Athena:
+- GPS tracks (the original elk_movement.csv), plus HEA vitals and ENV sensor readings
+- Rows are produced in chunks of one day for a block of animals, with vectorized NumPy
+  (no per-row Python, no per-row strftime), so memory stays constant at any size
+- Blocks run across a process pool; every animal has its own deterministic seed
+  (SeedSequence(seed, spawn_key=(id,))), so the rows do not depend on --workers or --block-size
+  (only their order does: each block is written one day at a time)
+- Streams to CSV (one file, like before) or to Parquet laid out like the ETL export
+  (sensor_type=<kind>/dt=<YYYY-MM-DD>/, with the export's SensorId/ElkId/Topic/Timestamp
+  columns), so the ETL and fact-table benchmarks can read it directly
+- Reports rows/sec and peak RSS
+
+Running it with no arguments still writes elk_movement.csv for 8 elk over 6 days.
+
+Usage:
+    pip install numpy pyarrow
+    python GPSCollar_BulkDataSet.py [--kind gps|hea|env] [--elk 8] [--days 6] [--interval-minutes 60]
+                                    [--format csv|parquet] [--output elk_movement.csv] [--workers 4]
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 
 # Constants
 NUM_ELKS = 8  # Number of elk
 RADIUS = 0.025  # Roughly 1 km in latitude/longitude degrees
-TOTAL_HOURS = 6 * 24  # 6 days
-
-# Function to generate random points within a circle
-def generate_random_point(center_lat, center_lon, radius):
-    angle = random.uniform(0, 2 * math.pi)
-    distance = random.uniform(0, radius)
-    delta_lat = distance * math.cos(angle) / 111  # Approximate conversion from km to degrees
-    delta_lon = distance * math.sin(angle) / (111 * math.cos(math.radians(center_lat)))
-    return center_lat + delta_lat, center_lon + delta_lon
-
-# File name for CSV output
-csv_filename = 'elk_movement.csv'
-
-# Create a list to store the data
-data = []
-
-# Initialize current time
-current_time = datetime.now()
-
-# Generate data for each elk
-for elk_id in range(1, NUM_ELKS + 1):
-    # Generate random start and end points
-    start_lat, start_lon = generate_random_point(53.0, -127.0, RADIUS)
-    end_lat, end_lon = generate_random_point(53.2, -128.0, RADIUS)
-    
-    # Define the step increments for latitude and longitude
-    lat_step = (end_lat - start_lat) / TOTAL_HOURS
-    lon_step = (end_lon - start_lon) / TOTAL_HOURS
-
-    # Initialize starting latitude and longitude
-    lat = start_lat
-    lon = start_lon
-
-    # Generate data for each hour
-    for hour in range(TOTAL_HOURS):
-        # Add larger random deviations to create a more wild meandering path
-        lat += lat_step + random.uniform(-0.002, 0.002)
-        lon += lon_step + random.uniform(-0.002, 0.002)
-        timestamp = current_time + timedelta(hours=hour)
-        # Create a row of data
-        data.append([elk_id, timestamp.strftime('%Y-%m-%d %H:%M:%S'), lat, lon])
-
-# Write the data to a CSV file
-with open(csv_filename, mode='w', newline='') as file:
-    writer = csv.writer(file)
-    # Write the header
-    writer.writerow(['Animal_ID', 'Timestamp', 'Latitude', 'Longitude'])
-    # Write the data rows
-    writer.writerows(data)
-
-print(f"Elk movement data has been written to {csv_filename}")
+TOTAL_DAYS = 6
+START_CENTRE = (53.0, -127.0)
+END_CENTRE = (53.2, -128.0)
+HOURLY_JITTER = 0.002  # Max random deviation per hourly step, in degrees (scaled for other intervals)
+BLOCK_SIZE = 2000  # Animals generated together in one chunk / handled by one pool task
+
+WIND_DIRECTIONS = ["North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"]
+POSTURES = ["Standing", "Lying Down", "On Side"]
+DEFAULT_OUTPUT = {'gps': 'elk_movement.csv', 'hea': 'elk_health.csv', 'env': 'environment.csv'}
+
+# Parquet mode: Topic and Timestamp format of each kind as the topic processors store them
+EXPORT_TOPICS = {'gps': 'IoT/GPS', 'hea': 'IoT/HEA', 'env': 'IoT/ENV'}
+EXPORT_TIME_FORMATS = {'gps': '%Y-%m-%dT%H:%M:%S', 'hea': '%Y-%m-%d %H:%M:%S', 'env': '%Y-%m-%dT%H:%M:%S'}
+EXPORT_TYPES = {'HeartRate': pa.int32(), 'RespirationRate': pa.int32()}  # IntegerType in etl_HEAtoDb
+
+
+def animal_rngs(seed, ids):
+    """One independent, reproducible generator per animal id."""
+    return [np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(int(i),))) for i in ids]
+
+
+def random_points_in_circle(rngs, centre, radius):
+    """One point per generator, scattered around `centre` like the original generate_random_point."""
+    draws = np.array([rng.random(2) for rng in rngs])
+    angle = draws[:, 0] * 2 * np.pi
+    distance = draws[:, 1] * radius
+    lat = centre[0] + distance * np.cos(angle) / 111  # Approximate conversion from km to degrees
+    lon = centre[1] + distance * np.sin(angle) / (111 * np.cos(np.radians(centre[0])))
+    return np.column_stack([lat, lon])
+
+
+def draw(rngs, method, steps, *params):
+    """(animals, steps) array with each row drawn from that animal's own generator."""
+    return np.stack([getattr(rng, method)(*params, size=steps) for rng in rngs])
+
+
+class GpsTracks:
+    """Elk walking from a start circle to an end circle with uniform jitter on every step."""
+
+    columns = ['Animal_ID', 'Timestamp', 'Latitude', 'Longitude']
+
+    def __init__(self, rngs, total_steps, interval_minutes):
+        start = random_points_in_circle(rngs, START_CENTRE, RADIUS)
+        end = random_points_in_circle(rngs, END_CENTRE, RADIUS)
+        self.step = (end - start) / total_steps
+        self.position = start
+        self.jitter = HOURLY_JITTER * np.sqrt(interval_minutes / 60)
+
+    def chunk(self, rngs, steps, hours):
+        lat = np.cumsum(self.step[:, :1] + draw(rngs, 'uniform', steps, -self.jitter, self.jitter), axis=1)
+        lon = np.cumsum(self.step[:, 1:] + draw(rngs, 'uniform', steps, -self.jitter, self.jitter), axis=1)
+        lat += self.position[:, :1]
+        lon += self.position[:, 1:]
+        self.position = np.column_stack([lat[:, -1], lon[:, -1]])
+        return {'Latitude': lat, 'Longitude': lon}
+
+
+class HeaVitals:
+    """Per-elk baselines with a daily rhythm and noise, in the ranges hea_logic produces."""
+
+    columns = ['Animal_ID', 'Timestamp', 'BodyTemperature', 'HeartRate', 'RespirationRate',
+               'ActivityLevel', 'Posture', 'HydrationLevel', 'StressLevel']
+
+    def __init__(self, rngs, total_steps, interval_minutes):
+        base = np.array([rng.random(4) for rng in rngs])
+        self.temperature = 37.8 + base[:, :1] * 0.8
+        self.heart_rate = 34 + base[:, 1:2] * 8
+        self.respiration = 14 + base[:, 2:3] * 10
+        self.stress = 1 + base[:, 3:4] * 4
+
+    def chunk(self, rngs, steps, hours):
+        rhythm = np.sin(2 * np.pi * (hours - 6) / 24)[None, :]  # Peaks mid-afternoon
+        activity = np.clip(0.4 + 0.3 * rhythm + draw(rngs, 'normal', steps, 0, 0.15), 0, 1)
+        return {
+            'BodyTemperature': np.round(self.temperature + 0.3 * rhythm + draw(rngs, 'normal', steps, 0, 0.1), 1),
+            'HeartRate': np.round(self.heart_rate + 8 * activity + draw(rngs, 'normal', steps, 0, 1.5)).astype(np.int16),
+            'RespirationRate': np.round(self.respiration + 6 * activity + draw(rngs, 'normal', steps, 0, 1.5)).astype(np.int16),
+            'ActivityLevel': np.round(activity, 2),
+            'Posture': np.where(activity > 0.3, 0, np.where(activity > 0.1, 1, 2)).astype(np.int8),
+            'HydrationLevel': np.round(np.clip(75 + draw(rngs, 'normal', steps, 0, 8), 50, 100), 1),
+            'StressLevel': np.round(np.clip(self.stress + draw(rngs, 'normal', steps, 0, 0.8), 0, 10), 2),
+        }
+
+
+class EnvReadings:
+    """Fixed sensors around the start area with diurnal temperature/humidity and drifting wind."""
+
+    columns = ['Animal_ID', 'Timestamp', 'Latitude', 'Longitude', 'Temperature', 'Humidity', 'WindDirection']
+
+    def __init__(self, rngs, total_steps, interval_minutes):
+        self.position = random_points_in_circle(rngs, START_CENTRE, 20)
+        self.wind = np.array([rng.integers(0, len(WIND_DIRECTIONS)) for rng in rngs])
+
+    def chunk(self, rngs, steps, hours):
+        rhythm = np.sin(2 * np.pi * (hours - 9) / 24)[None, :]
+        temperature = 12 + 8 * rhythm + draw(rngs, 'normal', steps, 0, 1.0)
+        wind = (self.wind[:, None] + np.cumsum(draw(rngs, 'integers', steps, -1, 2), axis=1)) % len(WIND_DIRECTIONS)
+        self.wind = wind[:, -1]
+        return {
+            'Latitude': np.repeat(self.position[:, :1], steps, axis=1),
+            'Longitude': np.repeat(self.position[:, 1:], steps, axis=1),
+            'Temperature': np.round(temperature, 2),
+            'Humidity': np.round(np.clip(70 - 2 * (temperature - 12) + draw(rngs, 'normal', steps, 0, 5), 20, 100), 2),
+            'WindDirection': wind.astype(np.int8),
+        }
+
+
+KINDS = {'gps': GpsTracks, 'hea': HeaVitals, 'env': EnvReadings}
+CATEGORIES = {'Posture': POSTURES, 'WindDirection': WIND_DIRECTIONS}
+
+
+def id_columns(kind, ids, steps, fmt):
+    """
+    Identifier columns: Animal_ID for CSV; for Parquet the export's keys, numbered like
+    the transmitters (SensorId from 0, HEA ElkId from 1) plus the Topic.
+    """
+    if fmt != 'parquet':
+        return {'Animal_ID': pa.array(np.repeat(ids, steps))}
+    sensor_ids = pa.array(np.repeat(ids - 1, steps)).cast(pa.string())
+    columns = {'SensorId': sensor_ids}
+    if kind == 'hea':
+        columns['ElkId'] = pa.array(np.repeat(ids, steps)).cast(pa.string())
+    columns['Topic'] = pa.array(np.full(len(sensor_ids), EXPORT_TOPICS[kind]))
+    return columns
+
+
+def to_table(kind, ids, times, values, fmt='csv'):
+    """Flatten one (animals, steps) chunk into an Arrow table, animal-major like the original CSV."""
+    animals, steps = len(ids), len(times)
+    time_format = EXPORT_TIME_FORMATS[kind] if fmt == 'parquet' else '%Y-%m-%d %H:%M:%S'
+    columns = id_columns(kind, ids, steps, fmt)
+    columns['Timestamp'] = pc.strftime(pa.array(np.tile(times, animals)), format=time_format)
+    for name in KINDS[kind].columns[2:]:
+        flat = values[name].reshape(-1)
+        if name in CATEGORIES:
+            columns[name] = pa.DictionaryArray.from_arrays(pa.array(flat), pa.array(CATEGORIES[name]))
+            if fmt == 'parquet':
+                columns[name] = columns[name].cast(pa.string())  # The export stores the labels
+        elif fmt == 'parquet' and name in EXPORT_TYPES:
+            columns[name] = pa.array(flat).cast(EXPORT_TYPES[name])
+        else:
+            columns[name] = pa.array(flat)
+    return pa.table(columns)
+
+
+def write_block(kind, block, ids, start, days, interval_minutes, seed, fmt, output):
+    """Generate every day for one block of animals and stream it out. Returns (rows, peak RSS in MB)."""
+    rngs = animal_rngs(seed, ids)
+    steps = int(24 * 60 // interval_minutes)
+    model = KINDS[kind](rngs, days * steps, interval_minutes)
+    step = np.timedelta64(int(interval_minutes * 60), 's')
+    rows = 0
+    csv_writer = None
+
+    for day in range(days):
+        times = np.datetime64(start, 's') + (day * steps + np.arange(steps)) * step
+        hours = ((times - times.astype('datetime64[D]')).astype(np.int64) / 3600.0)
+        table = to_table(kind, ids, times, model.chunk(rngs, steps, hours), fmt)
+        rows += table.num_rows
+
+        if fmt == 'parquet':
+            # A day of steps from a --start that is not midnight covers two dates
+            dates = times.astype('datetime64[D]')
+            for dt in np.unique(dates):
+                directory = os.path.join(output, f'sensor_type={kind}', f'dt={dt}')
+                os.makedirs(directory, exist_ok=True)
+                pq.write_table(table.filter(pa.array(np.tile(dates == dt, len(ids)))),
+                               os.path.join(directory, f'part-{block:05d}-{day:04d}.parquet'), compression='snappy')
+        else:
+            if csv_writer is None:
+                csv_writer = pa_csv.CSVWriter(os.path.join(output, f'part-{block:05d}.csv'), table.schema,
+                                              write_options=pa_csv.WriteOptions(quoting_style='none',
+                                                                               quoting_header='none'))
+            csv_writer.write_table(table)
+
+    if csv_writer is not None:
+        csv_writer.close()
+    return rows, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def concatenate_parts(parts_dir, csv_filename):
+    """Stitch the per-block CSV parts into one file with a single header, in block order."""
+    parts = sorted(os.listdir(parts_dir))
+    with open(csv_filename, 'wb') as out:
+        for index, name in enumerate(parts):
+            with open(os.path.join(parts_dir, name), 'rb') as part:
+                header = part.readline()
+                if index == 0:
+                    out.write(header)
+                shutil.copyfileobj(part, out, 1 << 20)
+    shutil.rmtree(parts_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate bulk synthetic GPS/HEA/ENV histories.")
+    parser.add_argument('--kind', choices=sorted(KINDS), default='gps')
+    parser.add_argument('--elk', type=int, default=NUM_ELKS, help='Animals (or ENV sensors) to generate')
+    parser.add_argument('--days', type=int, default=TOTAL_DAYS)
+    parser.add_argument('--interval-minutes', type=float, default=60)
+    parser.add_argument('--start', help='First timestamp (YYYY-MM-DD[THH:MM:SS]); defaults to now')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--output', help='CSV file, or Parquet dataset directory')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = np.datetime64(args.start or datetime.now().replace(microsecond=0).isoformat(), 's')
+    output = args.output or (DEFAULT_OUTPUT[args.kind] if args.format == 'csv' else f'{args.kind}_dataset')
+    work_dir = output + '.parts' if args.format == 'csv' else output
+    os.makedirs(work_dir, exist_ok=True)
+
+    blocks = [np.arange(first, min(first + args.block_size, args.elk)) + 1
+              for first in range(0, args.elk, args.block_size)]
+    started = time.perf_counter()
+    rows, worker_rss = 0, 0.0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(blocks)))) as pool:
+        futures = [pool.submit(write_block, args.kind, block, ids, start, args.days, args.interval_minutes,
+                               args.seed, args.format, work_dir)
+                   for block, ids in enumerate(blocks)]
+        for future in as_completed(futures):
+            block_rows, rss = future.result()
+            rows += block_rows
+            worker_rss = max(worker_rss, rss)
+    if args.format == 'csv':
+        concatenate_parts(work_dir, output)
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.kind} data has been written to {output}: {rows:,} rows in {elapsed:.1f}s "
+          f"({rows / elapsed:,.0f} rows/s)")
+    print(f"peak RSS: {worker_rss:.0f} MB per worker, "
+          f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB main process")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,44 +1,296 @@
+"""
+MapPlotter.py
+
+Renders elk_movement.csv (or any Animal_ID,Timestamp,Latitude,Longitude file, see
+GPSCollar_BulkDataSet.py) as a Folium map.
+
+Two modes:
+- tracks (default): reads the CSV in chunks and only keeps simplified vertices, so input
+  size is not bounded by memory. Tracks are simplified with Douglas-Peucker at one screen
+  pixel of --detail-zoom, and the tolerance rises (losing zoom levels) to whatever fits the
+  map in --max-vertices. Leaflet's smoothFactor simplifies further when zoomed out. Fix
+  density is drawn as a heatmap of per-cell counts on a bounded grid, and the simplified
+  vertices as a marker cluster capped at --max-markers.
+- fixes: the original rendering, with one marker per fix and a full polyline. It is only
+  usable up to a few thousand fixes.
+
+Each elk keeps one colour across layers and runs.
+
+Usage:
+    pip install folium pandas numpy
+    python MapPlotter.py [--csv elk_movement.csv] [--output elk_movement_map.html] [--mode tracks|fixes]
+"""
+
+import argparse
+import colorsys
+import os
+import time
+
 import folium
+import numpy as np
 import pandas as pd
-import random
-
-# Load the dataset
-df = pd.read_csv('elk_movement.csv')
-
-# Initialize a Folium map centered around the average latitude and longitude
-center_lat = df['Latitude'].mean()
-center_lon = df['Longitude'].mean()
-map_ = folium.Map(location=[center_lat, center_lon], zoom_start=12)
-
-# Function to generate a random color
-def random_color():
-    return "#{:06x}".format(random.randint(0, 0xFFFFFF))
-
-# Plot each elk's path
-for elk_id, group in df.groupby('Animal_ID'):
-    # Convert the DataFrame group to a list of (lat, lon) tuples
-    points = group[['Latitude', 'Longitude']].values.tolist()
-    
-    # Plot the nodes
-    for point in points:
-        folium.CircleMarker(
-            location=[point[0], point[1]],
-            radius=3,
-            color=random_color(),
-            fill=True,
-            fill_color=random_color(),
-            fill_opacity=0.6
-        ).add_to(map_)
-    
-    # Plot the path
-    folium.PolyLine(
-        locations=points,
-        color=random_color(),
-        weight=2.5,
-        opacity=0.7
+from folium.plugins import FastMarkerCluster, HeatMap
+
+CHUNK_ROWS = 1_000_000  # Rows read from the CSV at a time
+MAX_VERTICES = 200_000  # Track vertices allowed in the HTML, across all elk
+MAX_MARKERS = 20_000  # Vertices shown in the marker cluster layer
+MAX_HEAT_CELLS = 20_000  # Heatmap cells; the grid coarsens (x2) whenever it grows past this
+DETAIL_ZOOM = 16  # Zoom level the tracks should be exact at, if they fit in MAX_VERTICES
+HEAT_ZOOM = 13  # Heatmap cells start at one pixel of this zoom level
+METRES_PER_DEGREE = 111_320
+METRES_PER_PIXEL_Z0 = 156_543.03  # Web Mercator, at the equator
+
+MARKER_CALLBACK = """function (row) {
+    return L.circleMarker(new L.LatLng(row[0], row[1]), {radius: 3, color: row[2], fillOpacity: 0.6});
+}"""
+
+
+def elk_color(elk_id):
+    """Stable, well-spread colour per elk (golden-ratio hue steps)."""
+    hue = (int(elk_id) * 0.618033988749895) % 1
+    r, g, b = colorsys.hls_to_rgb(hue, 0.45, 0.75)
+    return "#{:02x}{:02x}{:02x}".format(int(r * 255), int(g * 255), int(b * 255))
+
+
+def pixel_metres(zoom, latitude):
+    """Ground size of one screen pixel at `zoom`."""
+    return METRES_PER_PIXEL_Z0 * np.cos(np.radians(latitude)) / 2 ** zoom
+
+
+def track_ends(ids):
+    """Indexes of the first and last fix of every run of equal (sorted) ids."""
+    bounds = np.flatnonzero(np.diff(ids)) + 1
+    return np.unique(np.concatenate([[0], bounds - 1, bounds, [len(ids) - 1]]))
+
+
+def significance(xy, ends, floor=0.0):
+    """
+    Douglas-Peucker significance of every point: the largest tolerance at which DP keeps it.
+
+    All tracks are processed together, one recursion level per pass, so the Python work
+    depends on the depth of the recursion rather than on the number of points. A split
+    point's significance is capped at its parent's, which makes `significance > t` exactly
+    the set DP keeps at tolerance t. Track `ends` are always kept (inf); segments whose
+    farthest point is within `floor` are not split further (their points stay at 0).
+
+    Parameters:
+        xy (ndarray): (n, 2) projected positions in metres, tracks stored one after another.
+        ends (ndarray): Sorted indexes of the first and last point of every track.
+        floor (float): Smallest tolerance the caller will ask for.
+    """
+    sig = np.zeros(len(xy))
+    sig[ends] = np.inf
+    starts, stops = ends[:-1], ends[1:]
+    while True:
+        is_open = stops - starts > 1
+        starts, stops = starts[is_open], stops[is_open]
+        if not len(starts):
+            return sig
+        lengths = stops - starts - 1
+        offsets = np.cumsum(lengths) - lengths
+        segment = np.repeat(np.arange(len(starts)), lengths)
+        index = starts[segment] + 1 + np.arange(len(segment)) - offsets[segment]
+
+        direction = (xy[stops] - xy[starts])[segment]
+        offset = xy[index] - xy[starts][segment]
+        length = np.hypot(direction[:, 0], direction[:, 1])
+        distance = np.where(length > 0,
+                            np.abs(direction[:, 0] * offset[:, 1] - direction[:, 1] * offset[:, 0]) / np.maximum(length, 1e-12),
+                            np.hypot(offset[:, 0], offset[:, 1]))
+
+        farthest = np.maximum.reduceat(distance, offsets)
+        hits = np.flatnonzero(distance == farthest[segment])
+        _, first = np.unique(segment[hits], return_index=True)
+        split_at = index[hits[first]]
+        split = farthest > floor
+
+        sig[split_at[split]] = np.minimum(farthest, np.minimum(sig[starts], sig[stops]))[split]
+        starts, stops = (np.concatenate([starts[split], split_at[split]]),
+                         np.concatenate([split_at[split], stops[split]]))
+
+
+class TrackSimplifier:
+    """
+    Streaming simplification of every elk's track within a vertex budget.
+
+    Each chunk is simplified at the current tolerance (its per-elk runs end at the chunk
+    edge, where a vertex is kept). Whenever the kept vertices outgrow twice the budget, all
+    of them are re-simplified and the tolerance rises to the one that fits the budget, so
+    memory is bounded by the budget, not by the input.
+    """
+
+    def __init__(self, tolerance, max_vertices, latitude):
+        self.tolerance = tolerance
+        self.max_vertices = max_vertices
+        self.scale = np.array([np.cos(np.radians(latitude)), 1.0]) * METRES_PER_DEGREE
+        self.ids, self.points = [], []
+        self.count = 0
+
+    def add(self, ids, points):
+        """Add one chunk of fixes, sorted by elk and then time."""
+        if not len(ids):
+            return
+        sig = significance(points[:, ::-1] * self.scale, track_ends(ids), self.tolerance)
+        keep = sig > self.tolerance
+        self.ids.append(ids[keep])
+        self.points.append(points[keep])
+        self.count += int(keep.sum())
+        if self.count > 2 * self.max_vertices:
+            self.compact()
+
+    def compact(self):
+        """Re-simplify everything kept so far across chunk edges and fit it into the budget."""
+        ids = np.concatenate(self.ids)
+        order = np.argsort(ids, kind='stable')  # Chunks arrive in time order, so this keeps each track in order
+        ids, points = ids[order], np.concatenate(self.points)[order]
+        sig = significance(points[:, ::-1] * self.scale, track_ends(ids), self.tolerance)
+        if len(sig) > self.max_vertices:
+            self.tolerance = max(self.tolerance, np.partition(sig, -self.max_vertices)[-self.max_vertices])
+        keep = (sig > self.tolerance) | np.isinf(sig)  # Track ends stay even when they alone exceed the budget
+        self.ids, self.points = [ids[keep]], [points[keep]]
+        self.count = int(keep.sum())
+
+    def tracks(self):
+        """Finish simplification and return {elk_id: [lat, lon] array}."""
+        self.compact()
+        ids, points = self.ids[0], self.points[0]
+        bounds = np.flatnonzero(np.diff(ids)) + 1
+        return {int(track_ids[0]): track for track_ids, track in zip(np.split(ids, bounds), np.split(points, bounds))
+                if len(track_ids)}
+
+
+class HeatGrid:
+    """Fix counts on a lat/lon grid that halves its resolution whenever it exceeds `max_cells`."""
+
+    def __init__(self, cell, max_cells):
+        self.cell = cell  # [lat, lon] cell size in degrees
+        self.max_cells = max_cells
+        self.cells = np.empty((0, 2), dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def _merge(self, cells, counts):
+        key = cells[:, 0] * (1 << 32) + (cells[:, 1] & 0xFFFFFFFF)
+        unique, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+        self.cells, self.counts = cells[first], np.bincount(inverse, weights=counts).astype(np.int64)
+
+    def add(self, points):
+        cells = np.floor(points / self.cell).astype(np.int64)
+        self._merge(np.concatenate([self.cells, cells]), np.concatenate([self.counts, np.ones(len(cells), np.int64)]))
+        while len(self.cells) > self.max_cells:
+            self.cell = self.cell * 2
+            self._merge(self.cells // 2, self.counts)
+
+    def weighted_points(self):
+        centres = (self.cells + 0.5) * self.cell
+        return np.column_stack([np.round(centres, 5), self.counts]).tolist()
+
+
+def plot_tracks(args):
+    """Simplified tracks + heatmap + marker cluster, reading the CSV in chunks. Returns (map, stats line)."""
+    # The projection and pixel sizes use the first rows' latitude; a herd spans well under a degree
+    latitude = float(pd.read_csv(args.csv, usecols=['Latitude'], nrows=1000)['Latitude'].mean())
+    simplifier = TrackSimplifier(pixel_metres(args.detail_zoom, latitude), args.max_vertices, latitude)
+    heat = HeatGrid(np.array([1, 1 / np.cos(np.radians(latitude))]) * pixel_metres(args.heat_zoom, latitude)
+                    / METRES_PER_DEGREE, args.max_heat_cells)
+
+    fixes, position_sum = 0, np.zeros(2)
+    reader = pd.read_csv(args.csv, usecols=['Animal_ID', 'Timestamp', 'Latitude', 'Longitude'], chunksize=args.chunk_rows,
+                         dtype={'Animal_ID': 'int64', 'Timestamp': 'str', 'Latitude': 'float64', 'Longitude': 'float64'})
+    for chunk in reader:
+        chunk = chunk.sort_values(['Animal_ID', 'Timestamp'], kind='stable')
+        points = chunk[['Latitude', 'Longitude']].to_numpy()
+        fixes += len(points)
+        position_sum += points.sum(axis=0)
+        simplifier.add(chunk['Animal_ID'].to_numpy(), points)
+        heat.add(points)
+    tracks = simplifier.tracks()
+    tolerance = simplifier.tolerance
+    exact_zoom = int(np.floor(np.log2(pixel_metres(0, latitude) / tolerance)))
+
+    map_ = folium.Map(location=(position_sum / max(fixes, 1)).tolist(), zoom_start=12, prefer_canvas=True)
+
+    heat_points = heat.weighted_points()
+    HeatMap(heat_points, name='Fix density', radius=8, blur=10, max_zoom=args.heat_zoom).add_to(map_)
+
+    features = [{
+        'type': 'Feature',
+        'properties': {'elk': elk_id, 'color': elk_color(elk_id)},
+        'geometry': {'type': 'LineString', 'coordinates': np.round(track[:, ::-1], 5).tolist()},
+    } for elk_id, track in sorted(tracks.items())]
+    folium.GeoJson(
+        {'type': 'FeatureCollection', 'features': features},
+        name='Tracks',
+        style_function=lambda feature: {'color': feature['properties']['color'], 'weight': 2.5, 'opacity': 0.7},
+        smooth_factor=1.0,
+        tooltip=folium.GeoJsonTooltip(fields=['elk'], aliases=['Elk']),
     ).add_to(map_)
 
-# Save the map to an HTML file
-map_.save('elk_movement_map.html')
+    vertices = [[round(lat, 5), round(lon, 5), elk_color(elk_id)]
+                for elk_id, track in sorted(tracks.items()) for lat, lon in track.tolist()]
+    stride = max(1, -(-len(vertices) // args.max_markers))
+    FastMarkerCluster(vertices[::stride], callback=MARKER_CALLBACK, name='Fixes (clustered)', show=False).add_to(map_)
+    folium.LayerControl().add_to(map_)
+
+    kept = sum(len(t) for t in tracks.values())
+    stats = (f"{fixes:,} fixes from {len(tracks):,} elk -> {kept:,} track vertices "
+             f"(tolerance {tolerance:.1f} m, exact to zoom {exact_zoom}), {len(heat_points):,} heatmap cells, "
+             f"{len(vertices[::stride]):,} clustered markers")
+    return map_, stats
+
+
+def plot_fixes(args):
+    """The original rendering: every fix as a marker plus a full polyline per elk."""
+    df = pd.read_csv(args.csv)
+    map_ = folium.Map(location=[df['Latitude'].mean(), df['Longitude'].mean()], zoom_start=12)
+
+    for elk_id, group in df.groupby('Animal_ID'):
+        points = group[['Latitude', 'Longitude']].values.tolist()
+        color = elk_color(elk_id)
+
+        # Plot the nodes
+        for point in points:
+            folium.CircleMarker(
+                location=[point[0], point[1]],
+                radius=3,
+                color=color,
+                fill=True,
+                fill_color=color,
+                fill_opacity=0.6
+            ).add_to(map_)
+
+        # Plot the path
+        folium.PolyLine(
+            locations=points,
+            color=color,
+            weight=2.5,
+            opacity=0.7
+        ).add_to(map_)
+    return map_, f"{len(df):,} fixes from {df['Animal_ID'].nunique():,} elk, one marker per fix"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render elk GPS tracks to an HTML map.")
+    parser.add_argument('--csv', default='elk_movement.csv')
+    parser.add_argument('--output', default='elk_movement_map.html')
+    parser.add_argument('--mode', choices=['tracks', 'fixes'], default='tracks')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--max-vertices', type=int, default=MAX_VERTICES)
+    parser.add_argument('--max-markers', type=int, default=MAX_MARKERS)
+    parser.add_argument('--max-heat-cells', type=int, default=MAX_HEAT_CELLS)
+    parser.add_argument('--detail-zoom', type=int, default=DETAIL_ZOOM)
+    parser.add_argument('--heat-zoom', type=int, default=HEAT_ZOOM)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    map_, stats = plot_tracks(args) if args.mode == 'tracks' else plot_fixes(args)
+
+    # Save the map to an HTML file
+    map_.save(args.output)
+    elapsed = time.perf_counter() - started
+
+    print(stats)
+    print(f"Map has been saved to {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB in {elapsed:.1f}s)")
+
 
-print("Map has been saved to elk_movement_map.html")
+if __name__ == '__main__':
+    main()
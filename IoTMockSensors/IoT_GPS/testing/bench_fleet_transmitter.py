@@ -0,0 +1,114 @@
+"""
+bench_fleet_transmitter.py
+
+Runs fleet_transmitter.py against a local MQTT broker (amqtt, in-process) and checks
+the fleet end to end:
+- every simulated device connects
+- every QoS 1 publish is acked (none fail), and a subscriber on the broker receives
+  exactly as many messages as were acked
+- reports the achieved messages/sec and publish-ack latency percentiles
+
+Usage:
+    pip install aiomqtt amqtt paho-mqtt
+    python testing/bench_fleet_transmitter.py [--devices 50] [--interval 1] [--duration 20]
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import paho.mqtt.client as paho
+from amqtt.broker import Broker
+
+import fleet_transmitter
+
+
+def free_port():
+  with socket.socket() as s:
+    s.bind(('127.0.0.1', 0))
+    return s.getsockname()[1]
+
+
+def start_broker():
+  """amqtt broker on its own thread and event loop; returns its port."""
+  port = free_port()
+  config = {'listeners': {'default': {'type': 'tcp', 'bind': f'127.0.0.1:{port}', 'max_connections': 0}},
+            'sys_interval': 0, 'auth': {'allow-anonymous': True, 'plugins': ['auth_anonymous']},
+            'topic-check': {'enabled': False}}
+  ready = threading.Event()
+
+  def run():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(Broker(config, loop=loop).start())
+    ready.set()
+    loop.run_forever()
+
+  threading.Thread(target=run, daemon=True).start()
+  ready.wait(10)
+  return port
+
+
+class Subscriber:
+  """Counts the messages reaching the broker's subscribers, per topic."""
+
+  def __init__(self, port, topic):
+    self.received = collections.Counter()
+    self.connected = threading.Event()
+    self.client = paho.Client(paho.CallbackAPIVersion.VERSION2, client_id='bench-fleet-subscriber')
+    self.client.on_connect = lambda client, userdata, flags, reason, properties: (
+      client.subscribe(f'{topic}/#', qos=1), self.connected.set())  # '#' also matches the topic itself
+    self.client.on_message = lambda client, userdata, message: self.received.update([message.topic])
+    self.client.connect('127.0.0.1', port)
+    self.client.loop_start()
+    self.connected.wait(10)
+    time.sleep(0.2)  # SUBACK
+
+  def total(self):
+    return sum(self.received.values())
+
+  def wait_for(self, count, timeout=30):
+    deadline = time.monotonic() + timeout
+    while self.total() < count and time.monotonic() < deadline:
+      time.sleep(0.05)
+
+  def close(self):
+    self.client.loop_stop()
+    self.client.disconnect()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--devices', type=int, default=50)
+  parser.add_argument('--interval', type=float, default=1.0, help='Mean seconds between publishes per device')
+  parser.add_argument('--duration', type=float, default=20.0)
+  parser.add_argument('--encoding', default='json', choices=['json', 'compact'])
+  args = parser.parse_args()
+
+  port = start_broker()
+  subscriber = Subscriber(port, fleet_transmitter.DEFAULT_TOPIC)
+  fleet_args = fleet_transmitter.parse_args([
+    '--port', str(port), '--host', '127.0.0.1', '--devices', str(args.devices), '--interval', str(args.interval),
+    '--duration', str(args.duration), '--qos', '1', '--encoding', args.encoding])
+  stats = asyncio.run(fleet_transmitter.run_fleet(fleet_args))
+  subscriber.wait_for(stats.published)
+  subscriber.close()
+
+  expected = args.devices * args.duration / args.interval
+  assert stats.connected == args.devices, stats.connected
+  assert stats.failed == 0 and stats.published == len(stats.latencies_ms), (stats.published, stats.failed)
+  assert subscriber.total() == stats.published, (subscriber.total(), stats.published)
+  assert stats.published >= 0.8 * expected, (stats.published, expected)
+  print(f"✅ {args.devices} devices connected; {stats.published} QoS 1 publishes acked and received "
+        f"(~{expected:.0f} scheduled), none failed")
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,45 @@
+"""
+bench_herd_engine.py
+
+Measures how many vectorized herd steps per second ElkHerd sustains for
+herd sizes from the default 8 collars up to 1M.
+
+Usage:
+    python testing/bench_herd_engine.py [--seconds 2]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from gps_collar_logic import ElkHerd
+
+HERD_SIZES = [8, 10_000, 100_000, 1_000_000]
+
+
+def steps_per_second(herd, seconds):
+  """Step `herd` repeatedly for roughly `seconds` and return the achieved rate."""
+  steps = 0
+  started = time.perf_counter()
+  while time.perf_counter() - started < seconds:
+    herd.step()
+    steps += 1
+  return steps / (time.perf_counter() - started)
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Benchmark the NumPy herd engine.")
+  parser.add_argument('--seconds', type=float, default=2.0, help='Time budget per herd size')
+  args = parser.parse_args()
+
+  print(f"{'herd size':>10} {'steps/sec':>12} {'collar fixes/sec':>18}")
+  for size in HERD_SIZES:
+    rate = steps_per_second(ElkHerd(size=size, seed=42), args.seconds)
+    print(f"{size:>10,} {rate:>12,.1f} {rate * size:>18,.0f}")
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,178 @@
+"""
+bench_log_shipper.py
+
+Compares transmitter publish-loop latency with the old inline CloudWatch logging
+(create group, create stream, describe streams, put events on every message)
+against the background CloudWatchLogShipper, using a local stub of the Logs API
+that sleeps to simulate network round-trips. Also checks that events replayed out of
+order from a spill file never end up in a batch spanning more than 24 hours, and that
+an unreachable endpoint neither stops the shipper thread nor loses events.
+
+Usage:
+    python testing/bench_log_shipper.py [--messages 200] [--api-ms 20]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from botocore.exceptions import EndpointConnectionError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import log_shipper
+from log_shipper import MAX_BATCH_SPAN_MS, CloudWatchLogShipper
+
+
+class StubLogsClient:
+  """In-process stand-in for boto3.client('logs') with a fixed per-call latency."""
+
+  class exceptions:
+    class ResourceAlreadyExistsException(Exception):
+      pass
+
+  def __init__(self, api_seconds):
+    self.api_seconds = api_seconds
+    self.calls = {}
+    self.events = []
+    self.spans = []  # Newest minus oldest timestamp of every PutLogEvents batch
+
+  def _call(self, name):
+    self.calls[name] = self.calls.get(name, 0) + 1
+    time.sleep(self.api_seconds)
+
+  def create_log_group(self, **kwargs):
+    self._call('create_log_group')
+    if self.calls['create_log_group'] > 1:
+      raise self.exceptions.ResourceAlreadyExistsException()
+
+  def create_log_stream(self, **kwargs):
+    self._call('create_log_stream')
+    if self.calls['create_log_stream'] > 1:
+      raise self.exceptions.ResourceAlreadyExistsException()
+
+  def describe_log_streams(self, **kwargs):
+    self._call('describe_log_streams')
+    return {'logStreams': [{'uploadSequenceToken': '1'}]}
+
+  def put_log_events(self, logEvents, **kwargs):
+    self._call('put_log_events')
+    self.events.extend(logEvents)
+    timestamps = [event['timestamp'] for event in logEvents]
+    self.spans.append(max(timestamps) - min(timestamps))
+
+
+class OfflineLogsClient(StubLogsClient):
+  """Stub whose first `failures[name]` calls of each API fail as if the endpoint could not be reached."""
+
+  def __init__(self, failures):
+    super().__init__(0)
+    self.failures = dict(failures)
+
+  def _call(self, name):
+    super()._call(name)
+    if self.failures.get(name, 0) > 0:
+      self.failures[name] -= 1
+      raise EndpointConnectionError(endpoint_url='https://logs.us-east-1.amazonaws.com')
+
+
+def inline_log(client, message):
+  """The pre-shipper log_to_cloudwatch: four blocking API calls per message."""
+  for create in (client.create_log_group, client.create_log_stream):
+    try:
+      create(logGroupName='/docker/GPS', logStreamName='mqtt_connect')
+    except client.exceptions.ResourceAlreadyExistsException:
+      pass
+  client.describe_log_streams(logGroupName='/docker/GPS', logStreamNamePrefix='mqtt_connect')
+  client.put_log_events(logGroupName='/docker/GPS', logStreamName='mqtt_connect',
+                        logEvents=[{'timestamp': int(time.time() * 1000), 'message': message}])
+
+
+def publish_loop(log, messages):
+  """Time each iteration of a publish loop whose only work is logging the payload."""
+  latencies = []
+  for i in range(messages):
+    started = time.perf_counter()
+    log(f"Published: {{'messageId': {i}}} to IoT/GPS")
+    latencies.append((time.perf_counter() - started) * 1000)
+  return latencies
+
+
+def report(name, latencies, client):
+  p99 = sorted(latencies)[int(len(latencies) * 0.99) - 1]
+  print(f"{name:<10} mean {statistics.mean(latencies):8.3f} ms   p99 {p99:8.3f} ms   "
+        f"API calls {sum(client.calls.values()):>5}   events delivered {len(client.events):>5}")
+
+
+def check_spill_span():
+  """Replay a spill whose events are out of time order; no batch may span more than 24 hours."""
+  hour = 3600 * 1000
+  now = int(time.time() * 1000)
+  offsets = [12, 25, 0.5, 18, 2]  # Hours ago, in spill order: each is within 24 h of the first, not of each other
+  with tempfile.TemporaryDirectory() as spill_dir:
+    spill_path = os.path.join(spill_dir, 'spill.jsonl')
+    with open(spill_path, 'w', encoding='utf-8') as f:
+      for hours in offsets:
+        f.write(json.dumps({'timestamp': now - int(hours * hour), 'message': f"{hours} h ago"}) + '\n')
+    client = StubLogsClient(0)
+    shipper = CloudWatchLogShipper(client, '/docker/GPS', 'mqtt_connect', max_age=0.1, spill_path=spill_path)
+    shipper.submit('now')
+    shipper.close()
+  assert len(client.events) == len(offsets) + 1, shipper.stats
+  assert max(client.spans) <= MAX_BATCH_SPAN_MS, [span / hour for span in client.spans]
+  print(f"✅ out-of-order spill replay shipped in {len(client.spans)} batches, widest "
+        f"{max(client.spans) / hour:.1f} h")
+
+
+def check_network_failure(messages=50, create_failures=3, put_failures=8):
+  """Start offline: the thread must survive, spill the failed batches and deliver them once back online."""
+  saved = log_shipper.RETRY_BASE_SECONDS, log_shipper.RETRY_MAX_SECONDS
+  log_shipper.RETRY_BASE_SECONDS, log_shipper.RETRY_MAX_SECONDS = 0.01, 0.2
+  try:
+    with tempfile.TemporaryDirectory() as spill_dir:
+      client = OfflineLogsClient({'create_log_group': create_failures, 'put_log_events': put_failures})
+      shipper = CloudWatchLogShipper(client, '/docker/GPS', 'mqtt_connect', max_age=0.05,
+                                     spill_path=os.path.join(spill_dir, 'spill.jsonl'))
+      for i in range(messages):
+        shipper.submit(f"message {i}")
+        time.sleep(0.01)
+      deadline = time.monotonic() + 10
+      while len(client.events) < messages and time.monotonic() < deadline:
+        assert shipper._thread.is_alive(), shipper.stats
+        time.sleep(0.05)
+      shipper.close()
+  finally:
+    log_shipper.RETRY_BASE_SECONDS, log_shipper.RETRY_MAX_SECONDS = saved
+  delivered = sorted(int(event['message'].split()[-1]) for event in client.events)
+  assert delivered == list(range(messages)), shipper.stats
+  assert shipper.stats['spilled'] > 0 and shipper.stats['failed'] == 0, shipper.stats
+  print(f"✅ {create_failures + put_failures} unreachable-endpoint errors: all {messages} events delivered after "
+        f"{shipper.stats['retries']} retries and {shipper.stats['spilled']} spilled")
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Benchmark inline vs background CloudWatch logging.")
+  parser.add_argument('--messages', type=int, default=200)
+  parser.add_argument('--api-ms', type=float, default=20.0, help='Simulated latency of every Logs API call')
+  args = parser.parse_args()
+
+  inline_client = StubLogsClient(args.api_ms / 1000)
+  report('inline', publish_loop(lambda m: inline_log(inline_client, m), args.messages), inline_client)
+
+  shipper_client = StubLogsClient(args.api_ms / 1000)
+  shipper = CloudWatchLogShipper(shipper_client, '/docker/GPS', 'mqtt_connect', max_age=1.0)
+  latencies = publish_loop(shipper.submit, args.messages)
+  shipper.close()
+  assert len(shipper_client.events) == args.messages, shipper.stats
+  report('shipper', latencies, shipper_client)
+
+  check_spill_span()
+  check_network_failure()
+
+
+if __name__ == '__main__':
+  main()
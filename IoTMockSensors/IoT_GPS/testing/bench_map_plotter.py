@@ -0,0 +1,59 @@
+"""
+bench_map_plotter.py
+
+HTML size and generation time of MapPlotter.py for 10k, 1M and 10M fixes, in the
+default tracks mode and (for small inputs) the original one-marker-per-fix mode.
+Inputs are generated with GPSCollar_BulkDataSet.py (6 days of hourly fixes per elk).
+
+Usage:
+    pip install folium pandas numpy pyarrow
+    python testing/bench_map_plotter.py [--sizes 10000 1000000 10000000] [--fixes-up-to 10000]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXES_PER_ELK = 144  # GPSCollar_BulkDataSet defaults: 6 days, hourly
+
+
+def run(*command):
+  started = time.perf_counter()
+  output = subprocess.run([sys.executable, *command], check=True, capture_output=True, text=True).stdout
+  return output, time.perf_counter() - started
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Benchmark MapPlotter on growing inputs.")
+  parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+  parser.add_argument('--fixes-up-to', type=int, default=10_000, help='Largest input also rendered in fixes mode')
+  args = parser.parse_args()
+
+  print(f"{'fixes':>12} {'mode':>7} {'csv MB':>8} {'html MB':>8} {'seconds':>8}  detail")
+  with tempfile.TemporaryDirectory() as tmp:
+    for size in args.sizes:
+      csv_path = os.path.join(tmp, f'elk_{size}.csv')
+      run(os.path.join(HERE, 'GPSCollar_BulkDataSet.py'), '--elk', str(max(1, size // FIXES_PER_ELK)),
+          '--output', csv_path, '--start', '2025-06-01')
+      csv_mb = os.path.getsize(csv_path) / 1e6
+
+      modes = ['tracks'] + (['fixes'] if size <= args.fixes_up_to else [])
+      for mode in modes:
+        html_path = os.path.join(tmp, f'map_{size}_{mode}.html')
+        output, elapsed = run(os.path.join(HERE, 'MapPlotter.py'), '--csv', csv_path, '--output', html_path,
+                              '--mode', mode)
+        detail = output.splitlines()[0]
+        fixes = int(re.match(r'([\d,]+) fixes', detail).group(1).replace(',', ''))
+        print(f"{fixes:>12,} {mode:>7} {csv_mb:>8.1f} {os.path.getsize(html_path) / 1e6:>8.1f} {elapsed:>8.1f}  "
+              f"{detail.split(' -> ')[-1]}")
+        os.remove(html_path)
+      os.remove(csv_path)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,243 @@
+"""
+bench_outbox.py
+
+Simulates a long broker outage for the GPS transmitter against a local MQTT broker
+(amqtt, in-process) and compares the old offline handling with the outbox:
+- the AWSIoTMQTTClient in-memory offline queue (configureOfflinePublishQueueing(-1)):
+  Python heap held by a day's backlog, all of it lost on restart
+- the SQLite outbox (outbox.py): heap while storing, file size, backlog still there
+  after a simulated restart (the file is reopened)
+- replay after reconnecting: sequential publish() per message vs the outbox's paced,
+  batched publishAsync replay; messages/s, bytes/s, duration, and checks that the
+  subscriber got every message once and in order
+
+--rtt-ms puts a latency proxy between client and broker to stand in for the round trip
+to AWS IoT Core.
+
+Usage:
+    pip install AWSIoTPythonSDK amqtt paho-mqtt
+    python testing/bench_outbox.py [--hours 24] [--interval 15] [--rtt-ms 60]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import paho.mqtt.client as paho
+from AWSIoTPythonSDK.MQTTLib import AWSIoTMQTTClient
+from amqtt.broker import Broker
+
+import configuration
+from gps_collar_logic import update_elk_positions
+from outbox import Outbox, REPLAY_RATE
+
+TOPIC = 'IoT/GPS'
+
+
+def free_port():
+  with socket.socket() as s:
+    s.bind(('127.0.0.1', 0))
+    return s.getsockname()[1]
+
+
+async def pipe(reader, writer, delay):
+  """Forward one direction of a connection, each chunk `delay` seconds late (order kept)."""
+  queue = asyncio.Queue()
+
+  async def send():
+    while True:
+      due, data = await queue.get()
+      await asyncio.sleep(max(0.0, due - time.monotonic()))
+      if not data:
+        break
+      writer.write(data)
+      await writer.drain()
+    writer.close()
+
+  sender = asyncio.ensure_future(send())
+  while True:
+    data = await reader.read(65536)
+    queue.put_nowait((time.monotonic() + delay, data))
+    if not data:
+      break
+  await sender
+
+
+def start_broker(rtt_ms):
+  """amqtt broker on a background loop; returns the port clients connect to (the proxy's if rtt_ms)."""
+  broker_port = free_port()
+  client_port = free_port() if rtt_ms else broker_port
+  config = {'listeners': {'default': {'type': 'tcp', 'bind': f'127.0.0.1:{broker_port}'}}, 'sys_interval': 0,
+            'auth': {'allow-anonymous': True, 'plugins': ['auth_anonymous']}, 'topic-check': {'enabled': False}}
+  ready = threading.Event()
+
+  async def proxy(client_reader, client_writer):
+    broker_reader, broker_writer = await asyncio.open_connection('127.0.0.1', broker_port)
+    delay = rtt_ms / 2000
+    await asyncio.gather(pipe(client_reader, broker_writer, delay), pipe(broker_reader, client_writer, delay),
+                         return_exceptions=True)
+
+  def run():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(Broker(config, loop=loop).start())
+    if rtt_ms:
+      loop.run_until_complete(asyncio.start_server(proxy, '127.0.0.1', client_port))
+    ready.set()
+    loop.run_forever()
+
+  threading.Thread(target=run, daemon=True).start()
+  ready.wait(10)
+  return broker_port, client_port
+
+
+class Subscriber:
+  """Counts what reaches the broker's subscribers, by messageId."""
+
+  def __init__(self, port):
+    self.received = []
+    self.connected = threading.Event()
+    self.client = paho.Client(paho.CallbackAPIVersion.VERSION2, client_id='bench-subscriber')
+    self.client.on_connect = lambda client, userdata, flags, reason, properties: (
+      client.subscribe(TOPIC, qos=1), self.connected.set())
+    self.client.on_message = lambda client, userdata, message: self.received.append(
+      json.loads(message.payload)['messageId'])
+    self.client.connect('127.0.0.1', port)
+    self.client.loop_start()
+    self.connected.wait(10)
+    time.sleep(0.2)  # SUBACK
+
+  def wait_for(self, count, timeout=30):
+    deadline = time.monotonic() + timeout
+    while len(self.received) < count and time.monotonic() < deadline:
+      time.sleep(0.05)
+
+  def close(self):
+    self.client.loop_stop()
+    self.client.disconnect()
+
+
+def connect(port, client_id, offline_queue=0):
+  client = AWSIoTMQTTClient(client_id)
+  client.configureEndpoint('127.0.0.1', port)
+  client.configureOfflinePublishQueueing(offline_queue)
+  client.configureConnectDisconnectTimeout(10)
+  client.configureMQTTOperationTimeout(10)
+  return client
+
+
+def outage_messages(count):
+  """What the transmitter would have produced during the outage: real GPS messages, serialized."""
+  configuration.GPS_TOPIC_NAME = TOPIC
+  with contextlib.redirect_stdout(io.StringIO()):  # update_elk_positions prints every position
+    return [configuration.encode_message(configuration.create_topic(update_elk_positions())) for _ in range(count)]
+
+
+def heap_used(fill):
+  """Python heap still held after fill() returns, and its peak, in bytes."""
+  tracemalloc.start()
+  baseline = tracemalloc.get_traced_memory()[0]
+  kept = fill()
+  held, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return kept, held - baseline, peak - baseline
+
+
+def check_delivery(subscriber, messages):
+  expected = [json.loads(body)['messageId'] for _, body in messages]
+  assert len(subscriber.received) == len(set(subscriber.received)), "duplicate deliveries"
+  assert subscriber.received == expected, f"{len(subscriber.received)} of {len(expected)} delivered, or out of order"
+
+
+def report(name, count, size, seconds):
+  print(f"{name:<28} {count:>6} msgs {seconds:8.1f} s {count / seconds:8.1f} msg/s {size / seconds / 1024:8.1f} KiB/s")
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--hours', type=float, default=24.0, help='Length of the outage')
+  parser.add_argument('--interval', type=float, default=15.0, help='Publish interval during the outage (s)')
+  parser.add_argument('--rtt-ms', type=float, default=60.0, help='Client <-> broker round trip; 0 for none')
+  parser.add_argument('--rate', type=float, default=REPLAY_RATE, help='Outbox replay messages/s')
+  parser.add_argument('--sequential', type=int, default=300, help='Messages in the sequential-publish sample')
+  args = parser.parse_args()
+
+  count = int(args.hours * 3600 / args.interval)
+  messages = outage_messages(count)
+  size = sum(len(body) for _, body in messages)
+  print(f"{args.hours:g} h outage at one message every {args.interval:g} s: {count} messages, "
+        f"{size / 1024 / 1024:.1f} MiB of payload")
+
+  def sdk_queue():
+    client = connect(1, 'bench-offline', offline_queue=-1)  # Never connects: every publish is queued in memory
+    for topic, body in messages:
+      client.publish(topic, body.encode().decode(), 1)  # A fresh copy, as the transmitter would build it
+    return client
+
+  _, sdk_held, _ = heap_used(sdk_queue)
+  print(f"in-memory offline queue: {sdk_held / 1024 / 1024:6.1f} MiB heap held (lost on restart)")
+
+  with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, 'outbox.sqlite3')
+
+    def store():
+      outbox = Outbox(path)
+      for topic, body in messages:
+        outbox.publish(None, topic, body)
+      outbox.close()
+
+    _, outbox_held, outbox_peak = heap_used(store)
+    file_size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print(f"outbox:                  {outbox_held / 1024 / 1024:6.1f} MiB heap held, "
+          f"{outbox_peak / 1024 / 1024:.1f} MiB peak, {file_size / 1024 / 1024:.1f} MiB on disk")
+
+    outbox = Outbox(path, rate=args.rate)  # Restart: a new process opens the same file
+    assert outbox.pending() == count, outbox.pending()
+    print(f"✅ restart: {outbox.pending()} messages still queued")
+
+    _, client_port = start_broker(args.rtt_ms)
+    print(f"\nreplay through a local broker, {args.rtt_ms:g} ms round trip")
+
+    subscriber = Subscriber(client_port)
+    client = connect(client_port, 'bench-sequential')
+    client.connect()
+    sample = messages[:args.sequential]
+    started = time.monotonic()
+    for topic, body in sample:
+      client.publish(topic, body, 1)
+    sequential_seconds = time.monotonic() - started
+    client.disconnect()
+    subscriber.wait_for(len(sample))
+    check_delivery(subscriber, sample)
+    report('sequential publish()', len(sample), sum(len(body) for _, body in sample), sequential_seconds)
+    print(f"{'':<28} -> {count / len(sample) * sequential_seconds:.0f} s for the whole backlog")
+    subscriber.close()
+
+    subscriber = Subscriber(client_port)
+    client = connect(client_port, 'bench-outbox')
+    client.connect()
+    replayed = outbox.replay(client)
+    subscriber.wait_for(count)
+    client.disconnect()
+    check_delivery(subscriber, messages)
+    assert replayed == count and outbox.pending() == 0, (replayed, outbox.pending())
+    report(f"outbox replay (cap {args.rate:g}/s)", count, size, outbox.stats['replay_seconds'])
+    print(f"{'':<28} {outbox.stats['batches']} batches of {outbox.batch_size}")
+    print(f"✅ every message delivered once, in order; outbox empty")
+    subscriber.close()
+    outbox.close()
+
+
+if __name__ == '__main__':
+  main()
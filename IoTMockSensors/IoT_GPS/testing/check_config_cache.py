@@ -0,0 +1,79 @@
+"""
+check_config_cache.py
+
+Exercises SsmConfigCache against a stubbed SSM client and a fake clock:
+- many lookups inside one TTL window cause exactly one SSM fetch
+- the next window triggers exactly one more
+- an SSM outage keeps serving the last-known values
+
+Usage:
+    python testing/check_config_cache.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config_cache import SsmConfigCache
+
+PARAMETERS = {
+  'topic_name': '/iot-topics/gps-topic-name',
+  'publish_interval': '/iot-settings/gps-publish-interval',
+}
+
+
+class StubSsm:
+  """Counts get_parameters calls; set `down` to simulate an outage."""
+
+  def __init__(self):
+    self.calls = 0
+    self.down = False
+    self.values = {'/iot-topics/gps-topic-name': 'IoT/GPS', '/iot-settings/gps-publish-interval': '15'}
+
+  def get_parameters(self, Names, WithDecryption=False):
+    self.calls += 1
+    if self.down:
+      raise ConnectionError('SSM unreachable')
+    return {'Parameters': [{'Name': n, 'Value': self.values[n]} for n in Names]}
+
+
+class FakeClock:
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+
+def main():
+  ssm, clock = StubSsm(), FakeClock()
+  cache = SsmConfigCache(PARAMETERS, ttl=60, client=ssm, clock=clock)
+
+  # One TTL window: 1,000 publish-loop ticks, two lookups each
+  for tick in range(1000):
+    clock.now = tick * 0.05
+    assert cache.get('topic_name') == 'IoT/GPS'
+    assert cache.get('publish_interval') == '15'
+  assert ssm.calls == 1, ssm.calls
+  print(f"✅ 2,000 lookups in one window -> {ssm.calls} SSM fetch, stats {cache.stats}")
+
+  # Next window picks up a changed interval with exactly one more fetch
+  ssm.values['/iot-settings/gps-publish-interval'] = '30'
+  clock.now = 61
+  for _ in range(100):
+    assert cache.get('publish_interval') == '30'
+  assert ssm.calls == 2, ssm.calls
+  print(f"✅ next window -> {ssm.calls} SSM fetches in total")
+
+  # Outage: keep serving last-known values
+  ssm.down = True
+  clock.now = 200
+  assert cache.get('publish_interval') == '30'
+  assert cache.get('topic_name') == 'IoT/GPS'
+  assert cache.stats['stale'] == 1
+  print(f"✅ SSM outage served last-known config, stats {cache.stats}")
+
+
+if __name__ == '__main__':
+  main()
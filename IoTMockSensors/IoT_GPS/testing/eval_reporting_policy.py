@@ -0,0 +1,179 @@
+"""
+eval_reporting_policy.py
+
+Replays the GPSCollar_BulkDataSet output (elk_movement.csv) through the collar-side
+ReportingPolicy and compares it with the fixed-interval transmitter:
+- messages and records published (the ingest / Lambda / DynamoDB volume)
+- track error: each elk's track rebuilt from the published fixes by linear
+  interpolation, measured against every true fix in the CSV
+
+The collar is simulated on a continuous clock, so adaptive fixes between the hourly
+CSV rows are interpolated from the true track.
+
+Then runs the transmitter loop itself (GPS_transmitter.publish_message and
+next_publish_interval, moving the default herd with update_elk_positions) on a virtual
+clock, in fixed mode and in adaptive mode, and checks that adaptive mode never sends
+more messages than the fixed mode's budget and that the default dead-band sends fewer.
+
+Usage:
+    python testing/eval_reporting_policy.py [--csv testing/elk_movement.csv] [--deadbands 50 100 250 500]
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import sys
+import types
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import configuration
+import gps_collar_logic
+import GPS_transmitter
+from gps_collar_logic import ElkHerd
+from reporting_policy import DEADBAND_METRES, ReportingPolicy, haversine_metres
+
+
+def load_tracks(path):
+  """Return (times, tracks): fix times in seconds and an (elks, fixes, 2) [lat, lon] array."""
+  rows = {}
+  with open(path, newline='') as f:
+    for row in csv.DictReader(f):
+      t = datetime.strptime(row['Timestamp'], '%Y-%m-%d %H:%M:%S').timestamp()
+      rows.setdefault(row['Animal_ID'], []).append((t, float(row['Latitude']), float(row['Longitude'])))
+  series = [np.array(sorted(v)) for _, v in sorted(rows.items(), key=lambda kv: int(kv[0]))]
+  times = series[0][:, 0]
+  tracks = np.stack([np.column_stack([np.interp(times, s[:, 0], s[:, 1]), np.interp(times, s[:, 0], s[:, 2])])
+                     for s in series])
+  return times, tracks
+
+
+def positions_at(times, tracks, t):
+  """True (elks, 2) positions at time `t`, interpolated between CSV fixes."""
+  return np.column_stack([[np.interp(t, times, track[:, 0]) for track in tracks],
+                          [np.interp(t, times, track[:, 1]) for track in tracks]])
+
+
+def track_error(times, tracks, reports):
+  """Error in metres between each true fix and the track rebuilt from the published fixes."""
+  errors = []
+  for elk, sent in enumerate(reports):
+    sent = np.array(sent)
+    rebuilt = np.column_stack([np.interp(times, sent[:, 0], sent[:, 1]), np.interp(times, sent[:, 0], sent[:, 2])])
+    errors.append(haversine_metres(tracks[elk], rebuilt))
+  return np.concatenate(errors)
+
+
+def simulate(times, tracks, policy, base_interval):
+  """Run the collar loop; returns (fixes taken, messages, records, per-elk published fixes)."""
+  reports = [[] for _ in tracks]
+  fixes = messages = records = 0
+  t = times[0]
+  while t <= times[-1]:
+    positions = positions_at(times, tracks, t)
+    fixes += 1
+    if policy is None:
+      selected = np.arange(len(positions))
+    else:
+      selected = policy.select(positions, t)
+    if len(selected):
+      messages += 1
+      records += len(selected)
+      for elk in selected:
+        reports[elk].append((t, positions[elk, 0], positions[elk, 1]))
+    t += base_interval if policy is None else policy.next_interval(base_interval, t)
+  # The last fix stands until the end of the track (what a reader of the table would see)
+  return fixes, messages, records, reports
+
+
+def transmitter_loop(policy, base_interval, hours, seed):
+  """
+  Run the transmitter's publish loop for `hours` of virtual time with `policy` (None is the
+  fixed mode) and a fresh default-size herd; returns (fixes, messages, records).
+  """
+  clock = types.SimpleNamespace(now=1_760_000_000.0)
+  clock.time = lambda: clock.now
+  published = []
+  create_topic = configuration.create_topic
+
+  def counted(payload, elk_ids=None):
+    published.append(len(payload))
+    return create_topic(payload, elk_ids)
+
+  saved = (GPS_transmitter.time, GPS_transmitter.reporting_policy, configuration.TESTING,
+           configuration.create_topic, configuration.get_fresh_publish_interval)
+  GPS_transmitter.time, GPS_transmitter.reporting_policy = clock, policy
+  configuration.TESTING = True  # Build payloads, don't publish
+  configuration.create_topic, configuration.get_fresh_publish_interval = counted, lambda: base_interval
+  gps_collar_logic.herd, gps_collar_logic.last_update = ElkHerd(seed=seed), None
+  fixes, end = 0, clock.now + hours * 3600
+  try:
+    with contextlib.redirect_stdout(io.StringIO()):  # The loop prints every position and payload
+      while clock.now < end:
+        GPS_transmitter.publish_message(None)
+        fixes += 1
+        clock.now += GPS_transmitter.next_publish_interval()
+  finally:
+    (GPS_transmitter.time, GPS_transmitter.reporting_policy, configuration.TESTING,
+     configuration.create_topic, configuration.get_fresh_publish_interval) = saved
+  return fixes, len(published), sum(published)
+
+
+def compare_transmitter_loop(deadbands, base_interval, hours, rate_range, seed):
+  fixes, messages, records = transmitter_loop(None, base_interval, hours, seed)
+  print(f"\ntransmitter loop: {gps_collar_logic.NUM_ELKS} elk, {hours:g} h, SSM interval {base_interval:g}s")
+  print(f"{'mode':<26}{'fixes':>7}{'messages':>10}{'records':>9}{'volume':>8}")
+  print(f"{'fixed interval':<26}{fixes:>7}{messages:>10}{records:>9}{'100%':>8}")
+  fixed_messages, fixed_records = messages, records
+  for deadband in sorted(set(deadbands) | {DEADBAND_METRES}):
+    policy = ReportingPolicy(deadband=deadband, rate_range=rate_range)
+    fixes, messages, records = transmitter_loop(policy, base_interval, hours, seed)
+    label = f"adaptive {deadband:.0f} m" + (" (default)" if deadband == DEADBAND_METRES else "")
+    print(f"{label:<26}{fixes:>7}{messages:>10}{records:>9}{records / fixed_records:>8.0%}")
+    assert messages <= fixed_messages + rate_range, (deadband, messages, fixed_messages)
+    if deadband == DEADBAND_METRES:
+      assert messages < fixed_messages and records < fixed_records, (messages, fixed_messages)
+  print("✅ adaptive mode stays within the fixed mode's message budget; the default dead-band sends less")
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Evaluate dead-band/adaptive GPS reporting on elk_movement.csv.")
+  parser.add_argument('--csv', default=os.path.join(os.path.dirname(__file__), 'elk_movement.csv'))
+  parser.add_argument('--deadbands', type=float, nargs='+', default=[50, 100, 250, 500])
+  parser.add_argument('--heartbeat-hours', type=float, default=6.0)
+  parser.add_argument('--rate-range', type=float, default=4.0)
+  parser.add_argument('--loop-hours', type=float, default=24.0, help='Virtual time the transmitter loop runs for')
+  parser.add_argument('--loop-interval', type=float, default=15.0, help='SSM publish interval for the loop')
+  parser.add_argument('--seed', type=int, default=1)
+  args = parser.parse_args()
+
+  times, tracks = load_tracks(args.csv)
+  base_interval = float(np.median(np.diff(times)))
+  print(f"{len(tracks)} elk, {len(times)} fixes each, base interval {base_interval:.0f}s")
+
+  fixes, messages, records, reports = simulate(times, tracks, None, base_interval)
+  baseline_records = records
+  print(f"{'mode':<22}{'fixes':>7}{'messages':>10}{'records':>9}{'volume':>8}"
+        f"{'mean err m':>12}{'p95 err m':>11}{'max err m':>11}")
+  errors = track_error(times, tracks, reports)
+  print(f"{'fixed interval':<22}{fixes:>7}{messages:>10}{records:>9}{'100%':>8}"
+        f"{errors.mean():>12.1f}{np.percentile(errors, 95):>11.1f}{errors.max():>11.1f}")
+
+  for deadband in args.deadbands:
+    policy = ReportingPolicy(deadband=deadband, heartbeat=args.heartbeat_hours * 3600, rate_range=args.rate_range)
+    fixes, messages, records, reports = simulate(times, tracks, policy, base_interval)
+    errors = track_error(times, tracks, reports)
+    print(f"{f'adaptive {deadband:.0f} m':<22}{fixes:>7}{messages:>10}{records:>9}"
+          f"{records / baseline_records:>8.0%}{errors.mean():>12.1f}{np.percentile(errors, 95):>11.1f}"
+          f"{errors.max():>11.1f}")
+
+  compare_transmitter_loop(args.deadbands, args.loop_interval, args.loop_hours, args.rate_range, args.seed)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,140 @@
+"""
+credential_cache.py
+
+On-disk cache of what an MQTT connection to AWS IoT Core needs (Amazon Root CA, device
+certificate and private key, IoT data endpoint):
+- The first connect fetches everything once and writes the PEM files next to a manifest
+  holding their SHA-256 digests, the endpoint and when they were fetched
+- Later connects (and process restarts) reuse the files after re-hashing them, so a warm
+  reconnect makes no HTTP, Secrets Manager or IoT API calls
+- A missing, truncated or modified file, a manifest that does not parse, or an entry past
+  its TTL triggers a fresh fetch
+- Repeated connect failures with cached material force a refetch, in case the certificate
+  was rotated
+- Counts hits, fetches and integrity failures
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+CREDENTIAL_TTL_SECONDS = float(os.environ.get('CREDENTIAL_TTL_SECONDS', 7 * 24 * 3600))
+REFETCH_AFTER_FAILURES = int(os.environ.get('CREDENTIAL_REFETCH_AFTER_FAILURES', 5))
+
+FILES = {  # Cached item -> file name; 'endpoint' is kept in the manifest itself
+    'root_ca': 'AmazonRootCA1.pem',
+    'certificate': 'cert.pem',
+    'private_key': 'private_key.pem',
+}
+MANIFEST = 'manifest.json'
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class CredentialCache:
+    """
+    Caches the connection material returned by `fetch` in `directory`.
+
+    Parameters:
+        directory (str): Where the PEM files and manifest live.
+        fetch (callable): Returns {'root_ca', 'certificate', 'private_key'} (str or bytes)
+            and 'endpoint' (str); called only on a miss.
+        ttl (float): Seconds fetched material is reused before it is fetched again.
+        refetch_after (int): Consecutive connect failures after which the cache is dropped.
+        clock: Time source, injectable for tests.
+    """
+
+    def __init__(self, directory, fetch, ttl=CREDENTIAL_TTL_SECONDS, refetch_after=REFETCH_AFTER_FAILURES,
+                 clock=time.time):
+        self.directory = directory
+        self.fetch = fetch
+        self.ttl = ttl
+        self.refetch_after = refetch_after
+        self.clock = clock
+        self.stats = {'hits': 0, 'fetches': 0, 'integrity_failures': 0, 'connect_failures': 0}
+
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Return {'root_ca', 'certificate', 'private_key'} file paths and 'endpoint',
+        from disk when the cached files are intact and fresh, otherwise fetched anew.
+        """
+        with self._lock:
+            if self._failures >= self.refetch_after:
+                logging.warning(f"⚠️ {self._failures} failed connects with cached credentials, fetching them again")
+                self._failures = 0
+            else:
+                cached = self._load()
+                if cached is not None:
+                    self.stats['hits'] += 1
+                    return cached
+            self.stats['fetches'] += 1
+            return self._store(self.fetch())
+
+    def connected(self):
+        """Record a successful connect with the cached material."""
+        self._failures = 0
+
+    def connect_failed(self):
+        """Record a failed connect; enough of them in a row drop the cache on the next get()."""
+        self._failures += 1
+        self.stats['connect_failures'] += 1
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            self.stats['integrity_failures'] += 1
+            logging.warning("⚠️ Credential cache manifest is unreadable, fetching again")
+            return None
+        if self.clock() - manifest.get('fetched_at', 0) >= self.ttl or not manifest.get('endpoint'):
+            return None
+
+        paths = {}
+        for name, file_name in FILES.items():
+            path = os.path.join(self.directory, file_name)
+            try:
+                with open(path, 'rb') as f:
+                    digest = sha256(f.read())
+            except FileNotFoundError:
+                digest = None
+            if digest != manifest.get('sha256', {}).get(name):
+                self.stats['integrity_failures'] += 1
+                logging.warning(f"⚠️ Cached {file_name} is missing or does not match its checksum, fetching again")
+                return None
+            paths[name] = path
+        return dict(paths, endpoint=manifest['endpoint'])
+
+    def _store(self, material):
+        os.makedirs(self.directory, exist_ok=True)
+        paths, digests = {}, {}
+        for name, file_name in FILES.items():
+            content = material[name]
+            data = content.encode() if isinstance(content, str) else content
+            path = os.path.join(self.directory, file_name)
+            self._write(path, data)
+            paths[name] = path
+            digests[name] = sha256(data)
+        # The manifest goes last: until it is replaced, a crash mid-write fails the checksums and refetches
+        manifest = {'fetched_at': self.clock(), 'endpoint': material['endpoint'], 'sha256': digests}
+        self._write(os.path.join(self.directory, MANIFEST), json.dumps(manifest).encode())
+        return dict(paths, endpoint=material['endpoint'])
+
+    @staticmethod
+    def _write(path, data):
+        """Write through a temporary file and rename, readable by the owner only (it holds the private key)."""
+        temp_path = f"{path}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
@@ -0,0 +1,149 @@
+"""
+fleet_transmitter.py
+
+Load-test mode that simulates many independent health collars from one process:
+- Every simulated device has its own MQTT connection and client id, publish schedule and QoS
+- Payloads come from the normal payload builder (configuration.create_topic) and health logic
+- Uses asyncio (aiomqtt) so thousands of connections share one event loop
+- Reports achieved messages/sec and publish-ack latency percentiles
+
+Point it at a local broker (e.g. `mosquitto -p 1883`) or, with --ca/--cert/--key, at AWS IoT Core:
+    python fleet_transmitter.py --devices 2000 --interval 5 --duration 60 --qos mixed
+"""
+
+import argparse
+import asyncio
+import random
+import ssl
+import time
+from dataclasses import dataclass
+import aiomqtt
+import configuration
+from hea_logic import VitalsHerd
+
+DEFAULT_TOPIC = "iot/hea/load-test"
+
+
+def make_reading_source(device_index):
+    """Return a callable producing this device's next list of readings for create_topic."""
+    return VitalsHerd(seed=device_index).readings  # Each collar's vitals evolve on their own
+
+
+@dataclass
+class DeviceSpec:
+    client_id: str
+    interval: float  # Seconds between publishes
+    qos: int
+    offset: float  # Start delay so the fleet doesn't publish in lock-step
+
+
+class FleetStats:
+    """Publish counts and ack latencies collected across all devices."""
+
+    def __init__(self):
+        self.published = 0
+        self.failed = 0
+        self.connected = 0
+        self.bytes_sent = 0
+        self.latencies_ms = []
+
+    def percentile(self, p):
+        if not self.latencies_ms:
+            return float('nan')
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def build_fleet(devices, interval, qos, jitter=0.2, seed=0):
+    """Create device specs with per-device interval jitter, start offsets and QoS ('0', '1' or 'mixed')."""
+    rng = random.Random(seed)
+    fleet = []
+    for i in range(devices):
+        device_qos = rng.choice([0, 1]) if qos == 'mixed' else int(qos)
+        device_interval = interval * rng.uniform(1 - jitter, 1 + jitter)
+        fleet.append(DeviceSpec(f"{configuration.CLIENT_ID}-{i:05d}", device_interval, device_qos,
+                                rng.uniform(0, device_interval)))
+    return fleet
+
+
+async def run_device(index, spec, args, stats, tls_params, connect_slots, stop_at):
+    """Connect one simulated device and publish on its own schedule until `stop_at`."""
+    next_reading = make_reading_source(index)
+
+    async with connect_slots:  # Bound concurrent TLS/MQTT handshakes to avoid a connect storm
+        client = aiomqtt.Client(args.host, args.port, identifier=spec.client_id, tls_params=tls_params,
+                                keepalive=max(30, int(spec.interval * 3)))
+        await client.__aenter__()
+    stats.connected += 1
+
+    try:
+        next_publish = time.monotonic() + spec.offset
+        while True:
+            now = time.monotonic()
+            if next_publish >= stop_at:
+                break
+            await asyncio.sleep(max(0.0, next_publish - now))
+            next_publish += spec.interval  # Absolute schedule: slow acks don't drift the rate
+
+            topic, data = configuration.encode_message(configuration.create_topic(next_reading()))
+            stats.bytes_sent += len(data)
+            started = time.perf_counter()
+            try:
+                await client.publish(topic, data, qos=spec.qos)  # Resolves on PUBACK for QoS 1
+                stats.latencies_ms.append((time.perf_counter() - started) * 1000)
+                stats.published += 1
+            except aiomqtt.MqttError:
+                stats.failed += 1
+    finally:
+        await client.__aexit__(None, None, None)
+
+
+async def run_fleet(args):
+    configuration.ENV_TOPIC_NAME = args.topic  # create_topic embeds it in every payload (setup_config stores the HEA topic here too)
+    fleet = build_fleet(args.devices, args.interval, args.qos, seed=args.seed)
+    stats = FleetStats()
+    tls_params = None
+    if args.ca:
+        tls_params = aiomqtt.TLSParameters(ca_certs=args.ca, certfile=args.cert, keyfile=args.key,
+                                           cert_reqs=ssl.CERT_REQUIRED)
+
+    configuration.PAYLOAD_ENCODING = args.encoding
+    connect_slots = asyncio.Semaphore(args.connect_concurrency)
+    started = time.monotonic()
+    stop_at = started + args.duration
+    results = await asyncio.gather(
+        *(run_device(i, spec, args, stats, tls_params, connect_slots, stop_at) for i, spec in enumerate(fleet)),
+        return_exceptions=True
+    )
+    elapsed = time.monotonic() - started
+    connect_errors = sum(1 for r in results if isinstance(r, Exception))
+
+    print(f"devices: {args.devices} (connected {stats.connected}, connect errors {connect_errors})")
+    print(f"published: {stats.published}  failed: {stats.failed}  in {elapsed:.1f}s "
+          f"-> {stats.published / elapsed:.1f} msg/s")
+    print(f"payload bytes ({args.encoding}): {stats.bytes_sent / max(1, stats.published + stats.failed):.0f} per message")
+    print(f"ack latency ms: p50 {stats.percentile(50):.2f}  p95 {stats.percentile(95):.2f}  "
+          f"p99 {stats.percentile(99):.2f}  max {stats.percentile(100):.2f}")
+    return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate many independent collars over asyncio MQTT.")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=1883)
+    parser.add_argument('--topic', default=DEFAULT_TOPIC)
+    parser.add_argument('--devices', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=5.0, help='Mean seconds between publishes per device')
+    parser.add_argument('--encoding', default=configuration.PAYLOAD_ENCODING, choices=['json', 'compact'])
+    parser.add_argument('--qos', default='1', choices=['0', '1', 'mixed'])
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+    parser.add_argument('--connect-concurrency', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ca', help='Root CA file (enables TLS, e.g. for AWS IoT Core on port 8883)')
+    parser.add_argument('--cert', help='Device certificate file')
+    parser.add_argument('--key', help='Device private key file')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_fleet(parse_args()))
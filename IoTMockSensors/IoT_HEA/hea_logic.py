@@ -1,35 +1,198 @@
-import json
-import random
+"""
+hea_logic.py
+
+Simulates elk health collar readings:
+- Keeps the vitals of N elk in NumPy arrays and advances them all in one vectorized step
+- Body temperature, heart rate, respiration, hydration and stress follow Ornstein-Uhlenbeck
+  (mean-reverting AR(1)) processes around per-elk baselines, so consecutive readings are
+  correlated instead of independent draws
+- Activity level is its own OU process; temperature, heart rate, respiration and stress
+  rise with it and posture follows from it
+- Health events (fever, dehydration) can be injected for chosen elk and a duration
+- Nothing runs at import time; the transmitter's herd is created on first use
+"""
+
+import os
 import time
+import numpy as np
+
+NUM_ELKS = int(os.environ.get("HERD_SIZE", 8))  # Number of elk being tracked
+STEP_SECONDS = 15.0  # Default time between readings (the publish interval)
+MAX_STEP_SECONDS = 3600.0  # Longer gaps are treated as this (the processes are long decorrelated by then)
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+POSTURES = ["Standing", "Lying Down", "On Side"]
+
+# Per vital: (baseline low, baseline high, change per unit of activity above its mean,
+#             mean-reversion time constant in seconds, stationary standard deviation)
+VITALS = {
+    "body_temperature": (38.0, 38.6, 0.6, 1800.0, 0.15),  # °C
+    "heart_rate": (34.0, 42.0, 20.0, 120.0, 2.0),  # BPM
+    "respiration_rate": (14.0, 22.0, 12.0, 120.0, 1.5),  # Breaths per minute
+    "hydration_level": (75.0, 90.0, 0.0, 3600.0, 4.0),  # Percentage
+    "stress_level": (1.0, 3.0, 2.0, 900.0, 0.8),  # 0 (calm) to 10 (high stress)
+}
+ACTIVITY = (0.35, 600.0, 0.2)  # Mean, time constant (s), stationary standard deviation
+LIMITS = {
+    "activity_level": (0.0, 1.0),
+    "hydration_level": (0.0, 100.0),
+    "stress_level": (0.0, 10.0),
+}
+
+# Shift of each vital's mean while an event is active; the OU dynamics set how fast it shows
+EVENTS = {
+    "fever": {"body_temperature": 2.0, "heart_rate": 12.0, "respiration_rate": 8.0, "stress_level": 2.0},
+    "dehydration": {"hydration_level": -35.0, "heart_rate": 8.0, "stress_level": 3.0},
+}
+
+
+ROWS = ["activity_level"] + list(VITALS)  # Row order of the (vitals x elk) state matrix
+
+
+def column(values):
+    """Per-row constants as a (rows, 1) column that broadcasts across the herd."""
+    return np.array(values, dtype=float)[:, None]
+
+
+PER_ACTIVITY = column([0.0] + [spec[2] for spec in VITALS.values()])
+TAU = column([ACTIVITY[1]] + [spec[3] for spec in VITALS.values()])
+SIGMA = column([ACTIVITY[2]] + [spec[4] for spec in VITALS.values()])
+LOWER = column([LIMITS.get(name, (-np.inf, np.inf))[0] for name in ROWS])
+UPPER = column([LIMITS.get(name, (-np.inf, np.inf))[1] for name in ROWS])
+
+
+def ou_coefficients(dt, tau, sigma):
+    """Decay and noise scale of an exact Ornstein-Uhlenbeck step of `dt` seconds."""
+    decay = np.exp(-dt / tau)
+    return decay, sigma * np.sqrt(1.0 - decay * decay)
+
+
+def ou_step(values, means, decay, scale, noise):
+    """
+    Ornstein-Uhlenbeck update in place: values relax toward `means` by `decay` and get
+    `scale`-sized normal noise, keeping the process's stationary standard deviation.
+    """
+    values -= means
+    values *= decay
+    values += means
+    noise *= scale
+    values += noise
+    return values
+
+
+class VitalsHerd:
+    """
+    NumPy-backed vitals engine for `size` elk (elk_id 1..size).
+
+    Activity and the vitals live in one (len(ROWS), size) float64 array, so step()
+    advances every animal with a handful of whole-array operations; records() returns
+    the current readings in the shape configuration.create_topic expects.
+    """
+
+    def __init__(self, size=NUM_ELKS, seed=None, start=None):
+        self.rng = np.random.default_rng(seed)
+        self.size = size
+        self.now = time.time() if start is None else start
+        self.events = []
+
+        self.baselines = np.vstack([np.full(size, ACTIVITY[0])] +
+                                   [self.rng.uniform(low, high, size) for low, high, _, _, _ in VITALS.values()])
+        # Scratch buffers reused every step so large herds don't allocate per tick
+        self._noise = np.empty_like(self.baselines)
+        self._means = np.empty_like(self.baselines)
+        self._coefficients = (None, None, None)
+        # Start at the stationary state: activity first, then each vital around its activity-adjusted mean
+        self.values = np.empty_like(self.baselines)
+        self.values[0] = self.baselines[0] + self.rng.normal(0.0, ACTIVITY[2], size)
+        self.values[1:] = self.means([])[1:] + self.rng.standard_normal((len(VITALS), size)) * SIGMA[1:]
+        np.clip(self.values, LOWER, UPPER, out=self.values)
+
+    @property
+    def activity(self):
+        return self.values[0]
+
+    def vital(self, name):
+        """Current values of one row of ROWS (e.g. 'heart_rate') across the herd."""
+        return self.values[ROWS.index(name)]
+
+    def inject(self, kind, elk_ids, duration, start=None):
+        """Start a health event ('fever' or 'dehydration') for `elk_ids` (1-based) lasting `duration` seconds."""
+        if kind not in EVENTS:
+            raise ValueError(f"Unknown health event {kind!r}; expected one of {sorted(EVENTS)}")
+        start = self.now if start is None else start
+        indices = np.asarray(elk_ids, dtype=np.int64) - 1
+        self.events.append({"kind": kind, "indices": indices, "start": start, "end": start + duration})
+
+    def _offsets(self):
+        """Mean shifts from the events active now, as (row, indices, shift) tuples; drops finished events."""
+        self.events = [event for event in self.events if event["end"] > self.now]
+        return [(ROWS.index(name), event["indices"], shift)
+                for event in self.events if event["start"] <= self.now
+                for name, shift in EVENTS[event["kind"]].items()]
+
+    def means(self, offsets):
+        """Current means: baselines, plus each vital's response to activity, plus event shifts."""
+        np.multiply(PER_ACTIVITY, self.values[0] - ACTIVITY[0], out=self._means)
+        self._means += self.baselines
+        for row, indices, shift in offsets:
+            self._means[row, indices] += shift
+        return self._means
+
+    def step(self, dt=STEP_SECONDS):
+        """Advance every elk by `dt` seconds and return the activity array."""
+        dt = min(max(dt, 0.0), MAX_STEP_SECONDS)
+        self.now += dt
+        if self._coefficients[0] != dt:
+            self._coefficients = (dt,) + ou_coefficients(dt, TAU, SIGMA)
+        _, decay, scale = self._coefficients
+        ou_step(self.values, self.means(self._offsets()), decay, scale, self.rng.standard_normal(out=self._noise))
+        np.clip(self.values, LOWER, UPPER, out=self.values)
+        return self.activity
+
+    def posture_codes(self):
+        """Index into POSTURES: standing when active, lying down when calm, on side when nearly still."""
+        return np.where(self.activity > 0.3, 0, np.where(self.activity > 0.1, 1, 2))
+
+    def records(self):
+        """Current readings as a list of dicts, rounded like the collar reports them."""
+        timestamp = time.strftime(TIME_FORMAT, time.gmtime(self.now))
+        columns = zip(
+            range(1, self.size + 1),
+            np.round(self.vital("body_temperature"), 1).tolist(),
+            np.rint(self.vital("heart_rate")).astype(np.int64).tolist(),
+            np.rint(self.vital("respiration_rate")).astype(np.int64).tolist(),
+            np.round(self.activity, 2).tolist(),
+            self.posture_codes().tolist(),
+            np.round(self.vital("hydration_level"), 1).tolist(),
+            np.round(self.vital("stress_level"), 2).tolist(),
+        )
+        return [
+            {
+                "elk_id": elk_id,
+                "timestamp": timestamp,
+                "body_temperature": temperature,
+                "heart_rate": heart_rate,
+                "respiration_rate": respiration_rate,
+                "activity_level": activity,
+                "posture": POSTURES[posture],
+                "hydration_level": hydration,
+                "stress_level": stress,
+            }
+            for elk_id, temperature, heart_rate, respiration_rate, activity, posture, hydration, stress in columns
+        ]
+
+    def readings(self):
+        """Advance by the wall time since the previous reading and return the records."""
+        self.step(time.time() - self.now)
+        return self.records()
+
+
+# Default herd used by the transmitter, created on the first reading
+herd = None
 
-# Constants
-NUM_ELKS = 8  # Number of elk being tracked
 
-# Function to generate health data for elk
 def generate_health_data():
-    elk_health_data = []
-    
-    for elk_id in range(1, NUM_ELKS + 1):
-        elk_data = {
-            "elk_id": elk_id,
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "body_temperature": round(random.uniform(36.5, 39.5), 1),  # Normal: 37.0 - 39.0°C
-            "heart_rate": random.randint(30, 50),  # Normal: 30 - 45 BPM
-            "respiration_rate": random.randint(10, 35),  # Normal: 10 - 30 breaths per min
-            "activity_level": round(random.uniform(0, 1), 2),  # 0 (resting) to 1 (high movement)
-            "posture": random.choice(["Standing", "Lying Down", "On Side"]),
-            "hydration_level": round(random.uniform(50, 100), 1),  # Percentage
-            "stress_level": round(random.uniform(0, 10), 2),  # 0 (calm) to 10 (high stress)
-        }
-        elk_health_data.append(elk_data)
-    
-    return elk_health_data
-
-# Generate sample data
-health_data = generate_health_data()
-
-# Save to JSON file
-with open("elk_health_data.json", "w") as json_file:
-    json.dump(health_data, json_file, indent=4)
-
-print("Elk health data saved to elk_health_data.json")
+    """Return the next set of health readings for the default herd of NUM_ELKS elk."""
+    global herd
+    if herd is None:
+        herd = VitalsHerd(start=time.time() - STEP_SECONDS)
+    return herd.readings()
@@ -2,7 +2,8 @@ import json
 import logging
 import time
 from datetime import datetime
-from setup_mqtt import mqtt_connect, log_to_cloudwatch
+from setup_mqtt import mqtt_connect, log_to_cloudwatch, outbox, reconnect_delay
+from coalescer import Coalescer
 from hea_logic import generate_health_data 
 import configuration
 from colorama import Fore, Style, init
@@ -12,6 +13,9 @@ import traceback
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 
+# Combines publish ticks into one message when COALESCE_TICKS > 1 (fewer messages and Lambda invocations, later delivery)
+coalescer = Coalescer(configuration.COALESCE_TICKS, configuration.COALESCE_MAX_BYTES)
+
 def log_error_with_traceback(e):
   logging.error(f"Exception: {str(e)}")
   logging.error(traceback.format_exc())
@@ -32,14 +36,19 @@ def publish_message(mqtt_client):
     if configuration.TESTING:
       print(f"{Fore.BLUE}Testing mode: Payload generated but not publishing to AWS IoT Core.{Style.RESET_ALL}")
     else:
-      # Ensure the mqtt_client is valid before trying to publish
-      if mqtt_client:
-        print(f'Publishing topic: {Fore.GREEN}{configuration.ENV_TOPIC_NAME}{Style.RESET_ALL}')
-        mqtt_client.publish(configuration.ENV_TOPIC_NAME, json.dumps(payload), 1)
-        logging.info(f"Published: {json.dumps(payload)} to {configuration.ENV_TOPIC_NAME}")
-        log_to_cloudwatch(f"Published: {json.dumps(payload)} to {configuration.ENV_TOPIC_NAME}")
-      else:
-        logging.error(f"MQTT client is None. Cannot publish message.")
+      print(f'Publishing topic: {Fore.GREEN}{configuration.ENV_TOPIC_NAME}{Style.RESET_ALL}')
+      # Ticks are combined per COALESCE_TICKS / COALESCE_MAX_BYTES; nothing is sent until a message is full
+      for message in coalescer.add(payload):
+        topic, body = configuration.encode_message(message)  # Serialize once for publish and logs
+        summary = body if isinstance(body, str) else f"{len(body)}-byte compact message {message['messageId']}"
+        # Stored in the outbox instead when offline or behind a backlog; raises (after storing) if the publish fails
+        if outbox.publish(mqtt_client, topic, body):
+          logging.info(f"Published: {summary} to {topic}")
+          log_to_cloudwatch(f"Published: {summary} to {topic}")
+        else:
+          logging.info(f"Queued in outbox ({outbox.pending()} pending): {summary} for {topic}")
+      if coalescer.pending():
+        print(f"{Fore.BLUE}{coalescer.pending()} of {coalescer.max_ticks} ticks waiting to be coalesced.{Style.RESET_ALL}")
   except Exception as e:
     log_error_with_traceback(e)
     raise
@@ -47,6 +56,7 @@ def publish_message(mqtt_client):
 
 # Function to attempt preamble setup and connection
 def attempt_preamble_setup():
+    attempt = 0
     while True:
         try:
             logging.info("Attempting to connect to AWS IoT Core...")
@@ -54,9 +64,21 @@ def attempt_preamble_setup():
             logging.info("MQTT connection successful. Entering message publish loop.")
             return mqtt_client  # Return the client if successful
         except Exception as e:
-            logging.error(f"Connection failed: {e}. Retrying in 10 seconds...")
-            log_to_cloudwatch(f"Connection failed: {e}. Retrying in 10 seconds...")
-            time.sleep(10)  # Wait 10 seconds before retrying
+            delay = reconnect_delay(attempt)
+            attempt += 1
+            logging.error(f"Connection failed: {e}. Retrying in {delay:.1f} seconds...")
+            log_to_cloudwatch(f"Connection failed: {e}. Retrying in {delay:.1f} seconds...")
+            time.sleep(delay)  # Jittered exponential backoff before retrying
+
+def reconnect():
+    """One connection attempt; returns None while still offline (messages keep going to the outbox)."""
+    try:
+        mqtt_client = mqtt_connect()
+    except Exception as e:
+        logging.error(f"Reconnect failed: {e}. {outbox.pending()} messages waiting in the outbox.")
+        return None
+    outbox.resume(mqtt_client)  # Replay the backlog in the background
+    return mqtt_client
 
 if __name__ == "__main__":
     configuration.setup_config()
@@ -67,14 +89,22 @@ if __name__ == "__main__":
             time.sleep(15)
     else:
         mqtt_client = attempt_preamble_setup()
+        outbox.resume(mqtt_client)  # Messages stored before a restart go out first
+        reconnect_attempt, next_reconnect = 0, 0.0
 
-        # Infinite loop to publish messages every 15 seconds
+        # Publish on the SSM interval; while offline, messages are stored and reconnects back off
         while True:
             try:
                 publish_message(mqtt_client)  # Publish message
-                print(f"Publish Interval Value: {configuration.get_fresh_publish_interval()}")
-                time.sleep(configuration.get_fresh_publish_interval())
             except Exception as e:
                 logging.error(f"Error during message publish: {e}. Retrying connection...")
                 log_to_cloudwatch(f"Error during message publish: {e}. Retrying connection...")
-                mqtt_client = attempt_preamble_setup()  # Retry connection if message publish fails
+                mqtt_client = None
+            if mqtt_client is None and time.time() >= next_reconnect:
+                mqtt_client = reconnect()
+                # Back off between attempts while offline; the loop keeps storing messages meanwhile
+                reconnect_attempt = 0 if mqtt_client else reconnect_attempt + 1
+                next_reconnect = time.time() + reconnect_delay(reconnect_attempt)
+            publish_interval = configuration.get_fresh_publish_interval()  # Served from the SSM config cache
+            print(f"Publish Interval Value: {publish_interval}")
+            time.sleep(publish_interval)
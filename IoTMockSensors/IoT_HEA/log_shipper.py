@@ -0,0 +1,241 @@
+"""
+log_shipper.py
+
+Non-blocking CloudWatch Logs shipper for the sensor containers:
+- Creates the log group and stream once, on the background thread
+- Queues messages in memory so callers never wait on the CloudWatch API
+- Flushes batches by size or age within the PutLogEvents limits
+- Spills to a local file (or drops) when the queue is full, and replays the spill later
+- Retries a batch with backoff while CloudWatch is unreachable, then spills it too, so
+  being offline never stops the shipper thread or loses the batch
+- Flushes whatever is left on shutdown
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from botocore.exceptions import BotoCoreError, ClientError
+
+# PutLogEvents limits
+MAX_BATCH_EVENTS = 10000
+MAX_BATCH_BYTES = 1048576
+EVENT_OVERHEAD_BYTES = 26  # Counted by CloudWatch for every event on top of the UTF-8 message
+MAX_EVENT_BYTES = 262144 - EVENT_OVERHEAD_BYTES
+MAX_BATCH_SPAN_MS = 24 * 3600 * 1000  # All events in one batch must fall within 24 hours
+
+# Offline handling: a batch is tried MAX_PUT_ATTEMPTS times, waiting RETRY_BASE_SECONDS doubling
+# up to RETRY_MAX_SECONDS in between; after that it is spilled and the spill is left alone
+# for RETRY_MAX_SECONDS
+MAX_PUT_ATTEMPTS = 4
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 30.0
+
+
+class CloudWatchLogShipper:
+    """
+    Ships log messages to one CloudWatch Logs stream from a daemon thread.
+
+    Parameters:
+        client: boto3 'logs' client (or a stub with the same methods).
+        log_group (str): Log group name.
+        log_stream (str): Log stream name.
+        max_queue (int): Messages held in memory before spilling/dropping.
+        max_age (float): Seconds a message may wait before its batch is flushed.
+        spill_path (str): File that overflow is appended to; None drops overflow instead.
+    """
+
+    def __init__(self, client, log_group, log_stream, max_queue=10000, max_age=5.0,
+                 spill_path=None, max_batch_events=MAX_BATCH_EVENTS, max_batch_bytes=MAX_BATCH_BYTES):
+        self.client = client
+        self.log_group = log_group
+        self.log_stream = log_stream
+        self.max_age = max_age
+        self.spill_path = spill_path
+        self.max_batch_events = max_batch_events
+        self.max_batch_bytes = max_batch_bytes
+        self.stats = {'queued': 0, 'shipped': 0, 'batches': 0, 'spilled': 0, 'dropped': 0, 'failed': 0,
+                      'retries': 0}
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._spill_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._destination_ready = False
+        self._offline_until = 0.0  # Monotonic time before which the spill is not replayed
+
+    def submit(self, message):
+        """Queue `message` for shipping; never blocks on the network."""
+        self._ensure_started()
+        event = {'timestamp': int(time.time() * 1000), 'message': message}
+        try:
+            self._queue.put_nowait(event)
+            self.stats['queued'] += 1
+        except queue.Full:
+            self._overflow(event)
+
+    def close(self, timeout=10.0):
+        """Stop the background thread after flushing everything still queued."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def _ensure_started(self):
+        """Start the worker thread on first use (so importing setup_mqtt has no side effects)."""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='cloudwatch-log-shipper', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _overflow(self, event):
+        """Queue is full: append the event to the spill file, or count it as dropped."""
+        if not self.spill_path:
+            self.stats['dropped'] += 1
+            return
+        self._spill([event])
+
+    def _spill(self, events):
+        """Append `events` to the spill file (replayed by _replay_spill)."""
+        with self._spill_lock:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(event) + '\n' for event in events)
+        self.stats['spilled'] += len(events)
+
+    def _ensure_destination(self):
+        """
+        Create the log group and stream; both calls are no-ops if they already exist.
+        Returns False when CloudWatch could not be reached, so _put tries again later.
+        """
+        steps = (('group', self.client.create_log_group, {'logGroupName': self.log_group}),
+                 ('stream', self.client.create_log_stream, {'logGroupName': self.log_group,
+                                                            'logStreamName': self.log_stream}))
+        for kind, create, kwargs in steps:
+            try:
+                create(**kwargs)
+            except self.client.exceptions.ResourceAlreadyExistsException:
+                pass
+            except ClientError as e:
+                logging.error(f"Failed to create CloudWatch log {kind}: {e}")
+            except BotoCoreError as e:
+                logging.warning(f"CloudWatch unreachable while creating the log destination: {e}")
+                return False
+        self._destination_ready = True
+        return True
+
+    def _run(self):
+        batch, batch_bytes, opened_at = [], 0, None
+        oldest = newest = None  # Timestamp range of the batch; replayed spill arrives out of order
+
+        while True:
+            stopping = self._stopping.is_set()
+            if batch:
+                wait = max(0.0, opened_at + self.max_age - time.monotonic())
+            else:
+                wait = self.max_age
+            try:
+                event = self._queue.get(timeout=0 if stopping else min(wait, 0.5))
+            except queue.Empty:
+                event = None
+
+            if event is not None:
+                event['message'] = self._truncate(event['message'])
+                size = len(event['message'].encode('utf-8')) + EVENT_OVERHEAD_BYTES
+                if batch and (len(batch) >= self.max_batch_events
+                              or batch_bytes + size > self.max_batch_bytes
+                              or max(newest, event['timestamp']) - min(oldest, event['timestamp'])
+                              > MAX_BATCH_SPAN_MS):
+                    self._put(batch)
+                    batch, batch_bytes, opened_at = [], 0, None
+                if not batch:
+                    oldest = newest = event['timestamp']
+                oldest, newest = min(oldest, event['timestamp']), max(newest, event['timestamp'])
+                batch.append(event)
+                batch_bytes += size
+                opened_at = opened_at or time.monotonic()
+                continue
+
+            # Queue is idle (or we are shutting down with an empty queue)
+            if batch and (stopping or time.monotonic() - opened_at >= self.max_age):
+                self._put(batch)
+                batch, batch_bytes, opened_at = [], 0, None
+            if not batch:
+                if time.monotonic() >= self._offline_until and self._replay_spill():
+                    continue
+                if stopping:
+                    return
+
+    def _truncate(self, message):
+        """Trim a message to the per-event size limit."""
+        encoded = message.encode('utf-8')
+        if len(encoded) <= MAX_EVENT_BYTES:
+            return message
+        return encoded[:MAX_EVENT_BYTES].decode('utf-8', errors='ignore')
+
+    def _put(self, batch):
+        """
+        Ship one batch with a single PutLogEvents call. While CloudWatch is unreachable the
+        call is retried with backoff, then the batch is spilled (or counted as failed
+        without a spill file); a batch CloudWatch rejects is counted as failed.
+        """
+        batch.sort(key=lambda e: e['timestamp'])  # Replayed spill can be older than queued events
+        for attempt in range(MAX_PUT_ATTEMPTS):
+            if attempt:
+                self.stats['retries'] += 1
+            try:
+                if self._destination_ready or self._ensure_destination():
+                    self.client.put_log_events(
+                        logGroupName=self.log_group,
+                        logStreamName=self.log_stream,
+                        logEvents=batch
+                    )
+                    self.stats['shipped'] += len(batch)
+                    self.stats['batches'] += 1
+                    return
+            except BotoCoreError as e:
+                # Offline (EndpointConnectionError, timeouts): keep the batch and try again
+                logging.warning(f"CloudWatch unreachable, attempt {attempt + 1}/{MAX_PUT_ATTEMPTS}: {e}")
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'ResourceNotFoundException':
+                    self.stats['failed'] += len(batch)
+                    logging.error(f"Failed to log to CloudWatch: {e}")
+                    return
+                self._destination_ready = False  # Group or stream deleted: recreate it, then retry
+            if self._stopping.wait(min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt)):
+                break  # Shutting down: don't hold up exit, keep the batch for the next start
+
+        self._offline_until = time.monotonic() + RETRY_MAX_SECONDS
+        if self.spill_path:
+            self._spill(batch)
+        else:
+            self.stats['failed'] += len(batch)
+            logging.error(f"Dropped {len(batch)} log events: CloudWatch unreachable and no spill file")
+
+    def _replay_spill(self):
+        """Move spilled events back into the queue while it has room. Returns True if any were loaded."""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return False
+        with self._spill_lock:
+            with open(self.spill_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+            loaded = 0
+            for line in lines:
+                try:
+                    self._queue.put_nowait(json.loads(line))
+                except queue.Full:
+                    break
+                loaded += 1
+            remaining = lines[loaded:]
+            if remaining:
+                with open(self.spill_path, 'w', encoding='utf-8') as f:
+                    f.writelines(remaining)
+            else:
+                os.remove(self.spill_path)
+        return bool(loaded)
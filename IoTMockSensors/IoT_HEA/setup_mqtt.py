@@ -4,10 +4,14 @@ import json
 import logging
 from AWSIoTPythonSDK.MQTTLib import AWSIoTMQTTClient
 from botocore.exceptions import ClientError
+import random
 import requests
-import tempfile
 import os
+from concurrent.futures import ThreadPoolExecutor
 import configuration
+from log_shipper import CloudWatchLogShipper
+from outbox import Outbox
+from credential_cache import CredentialCache
 from colorama import Fore, Style, init
 
 # Set up logging
@@ -16,67 +20,30 @@ logging.basicConfig(level=logging.INFO)
 # Initialize CloudWatch Logs client
 logs_client = boto3.client('logs', region_name='us-east-1')
 
-# Function to log errors to CloudWatch and create log group/stream if they don't exist
-def log_to_cloudwatch(message):
-    try:
-        # Ensure the log group exists
-        logs_client.create_log_group(logGroupName=configuration.LOG_GROUP)
-    except logs_client.exceptions.ResourceAlreadyExistsException:
-        # Log group already exists, continue
-        pass
+# Background shipper: batches messages to CloudWatch so publishing never waits on the Logs API
+log_shipper = CloudWatchLogShipper(
+    logs_client,
+    configuration.LOG_GROUP,
+    configuration.LOG_STREAM,
+    spill_path=os.environ.get('LOG_SPILL_PATH', './cloudwatch_spill.jsonl')
+)
 
-    try:
-        # Ensure the log stream exists
-        logs_client.create_log_stream(logGroupName=configuration.LOG_GROUP, logStreamName=configuration.LOG_STREAM)
-    except logs_client.exceptions.ResourceAlreadyExistsException:
-        # Log stream already exists, continue
-        pass
+# Store-and-forward queue: publishes that fail while offline wait on disk and are replayed after reconnecting
+outbox = Outbox(os.environ.get('OUTBOX_PATH', './outbox.sqlite3'))
 
-    try:
-        # Get the sequence token for the log stream (if exists)
-        response = logs_client.describe_log_streams(logGroupName=configuration.LOG_GROUP, logStreamNamePrefix=configuration.LOG_STREAM)
-        log_streams = response['logStreams']
-        sequence_token = log_streams[0].get('uploadSequenceToken') if log_streams else None
-
-        # Put log event with the correct sequence token (if required)
-        if sequence_token:
-            logs_client.put_log_events(
-                logGroupName=configuration.LOG_GROUP,
-                logStreamName=configuration.LOG_STREAM,
-                logEvents=[
-                    {
-                        'timestamp': int(time.time() * 1000),
-                        'message': message
-                    }
-                ],
-                sequenceToken=sequence_token
-            )
-        else:
-            # No sequence token needed for the first log
-            logs_client.put_log_events(
-                logGroupName=configuration.LOG_GROUP,
-                logStreamName=configuration.LOG_STREAM,
-                logEvents=[
-                    {
-                        'timestamp': int(time.time() * 1000),
-                        'message': message
-                    }
-                ]
-            )
-    except ClientError as e:
-        logging.error(f"Failed to log to CloudWatch: {e}")
+# Function to log messages to CloudWatch without blocking the caller
+def log_to_cloudwatch(message):
+    log_shipper.submit(message)
 
 # Function to download the Root CA certificate
 def download_root_ca():
     try:
         url = "https://www.amazontrust.com/repository/AmazonRootCA1.pem"
-        response = requests.get(url)
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pem") as temp_file:
-            temp_file.write(response.content)
-            root_ca_path = temp_file.name
-
-        return root_ca_path
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        if b"-----BEGIN CERTIFICATE-----" not in response.content:
+            raise ValueError("Root CA download is not a PEM certificate")
+        return response.content
     except Exception as e:
         log_to_cloudwatch(f"Failed to download Root CA: {e}")
         raise e
@@ -117,47 +84,57 @@ def parse_secret(secret_string):
 
     return private_key, certificate
 
-# Function to write content (certificates/keys) to a temporary file
-def write_to_temp_file(content, filename_prefix):
-    temp_file_path = f"./{filename_prefix}.pem"
-    with open(temp_file_path, 'w') as f:
-        f.write(content)
-    return temp_file_path
+# Function to fetch the root CA, certificate, private key and endpoint in one go
+def fetch_credentials():
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        root_ca = pool.submit(download_root_ca)
+        secret = pool.submit(get_secret)
+        endpoint = pool.submit(get_iot_endpoint)
+        private_key, certificate = parse_secret(secret.result())
+        return {'root_ca': root_ca.result(), 'certificate': certificate, 'private_key': private_key,
+                'endpoint': endpoint.result()}
 
-# Function to establish MQTT connection
-def mqtt_connect():
-    try:
-        # Download Root CA
-        root_ca = download_root_ca()
+# Connection material cached on disk with SHA-256 checks, so a warm reconnect is only the MQTT handshake
+credential_cache = CredentialCache(os.environ.get('CREDENTIAL_CACHE_DIR', './mqtt_credentials'), fetch_credentials)
 
-        # Get secret (private key and certificate)
-        secret = get_secret()
-        private_key, certificate = parse_secret(secret)
+# Reconnect backoff: base doubles per failed attempt up to the cap
+RECONNECT_BASE_SECONDS = float(os.environ.get('RECONNECT_BASE_SECONDS', 1))
+RECONNECT_CAP_SECONDS = float(os.environ.get('RECONNECT_CAP_SECONDS', 30))
 
-        # Write the private key and certificate to temp files
-        cert_file = write_to_temp_file(certificate, 'cert')
-        key_file = write_to_temp_file(private_key, 'private_key')
+def reconnect_delay(attempt, rng=random):
+    step = min(RECONNECT_CAP_SECONDS, RECONNECT_BASE_SECONDS * 2 ** attempt)
+    return step / 2 + rng.uniform(0, step / 2)
 
-        # Get IoT Endpoint
-        iot_endpoint = get_iot_endpoint()
+# Function to establish MQTT connection
+def mqtt_connect():
+    try:
+        # Root CA, certificate, private key and endpoint: from the cache, fetched only on a miss
+        credentials = credential_cache.get()
 
         # Initialize MQTT Client
         mqtt_client = AWSIoTMQTTClient(configuration.CLIENT_ID)
-        mqtt_client.configureEndpoint(iot_endpoint, 8883)
-        mqtt_client.configureCredentials(root_ca, key_file, cert_file)
+        mqtt_client.configureEndpoint(credentials['endpoint'], 8883)
+        mqtt_client.configureCredentials(credentials['root_ca'], credentials['private_key'], credentials['certificate'])
 
         # Configure MQTT client settings
-        mqtt_client.configureOfflinePublishQueueing(-1)
+        mqtt_client.configureOfflinePublishQueueing(0)  # Offline publishes raise and go to the outbox instead
         mqtt_client.configureDrainingFrequency(2)
         mqtt_client.configureConnectDisconnectTimeout(10)
         mqtt_client.configureMQTTOperationTimeout(5)
 
         # Attempt to connect to AWS IoT Core
-        if mqtt_client.connect():
+        try:
+            connected = mqtt_client.connect()
+        except Exception:
+            credential_cache.connect_failed()  # Enough failures in a row and the credentials are fetched again
+            raise
+        if connected:
+            credential_cache.connected()
             logging.info("Connected to AWS IoT Core")
             log_to_cloudwatch("Connected to AWS IoT Core")
             return mqtt_client
         else:
+            credential_cache.connect_failed()
             raise Exception("Failed to connect to AWS IoT Core")
 
     except Exception as e:
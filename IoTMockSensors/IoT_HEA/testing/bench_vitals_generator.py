@@ -0,0 +1,137 @@
+"""
+bench_vitals_generator.py
+
+Benchmarks the NumPy vitals engine (VitalsHerd in hea_logic.py) against the previous
+per-elk random.uniform loop for 1M elk-steps, split over herd sizes from the default
+8 collars up to 1M, and checks what the generated series look like:
+- importing hea_logic writes no files
+- consecutive readings are correlated (lag-1 autocorrelation near exp(-dt/tau), where the
+  old generator's independent draws gave ~0) and heart rate follows activity
+- an injected fever raises body temperature and heart rate, dehydration lowers hydration,
+  and both wear off after the event
+
+Usage:
+    pip install numpy
+    python testing/bench_vitals_generator.py [--elk-steps 1000000]
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from hea_logic import STEP_SECONDS, VITALS, VitalsHerd
+
+HERD_SIZES = [8, 1_000, 100_000, 1_000_000]
+
+
+def legacy_generate(num_elks):
+  """The generator before VitalsHerd: independent draws per elk per call."""
+  elk_health_data = []
+  for elk_id in range(1, num_elks + 1):
+    elk_health_data.append({
+      "elk_id": elk_id,
+      "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+      "body_temperature": round(random.uniform(36.5, 39.5), 1),
+      "heart_rate": random.randint(30, 50),
+      "respiration_rate": random.randint(10, 35),
+      "activity_level": round(random.uniform(0, 1), 2),
+      "posture": random.choice(["Standing", "Lying Down", "On Side"]),
+      "hydration_level": round(random.uniform(50, 100), 1),
+      "stress_level": round(random.uniform(0, 10), 2),
+    })
+  return elk_health_data
+
+
+def timed(function, repeats):
+  started = time.perf_counter()
+  for _ in range(repeats):
+    function()
+  return time.perf_counter() - started
+
+
+def check_no_import_side_effects():
+  with tempfile.TemporaryDirectory() as directory:
+    subprocess.run([sys.executable, '-c', 'import hea_logic'], cwd=directory, check=True,
+                   env=dict(os.environ, PYTHONPATH=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+    assert os.listdir(directory) == [], os.listdir(directory)
+  print("✅ importing hea_logic writes nothing")
+
+
+def lag1(series):
+  """Mean lag-1 autocorrelation over the columns (elk) of a (steps, elk) array."""
+  centred = series - series.mean(axis=0)
+  return float(np.mean((centred[1:] * centred[:-1]).sum(axis=0) / (centred ** 2).sum(axis=0)))
+
+
+def check_dynamics(steps=2000, size=200):
+  herd = VitalsHerd(size=size, seed=1)
+  heart, activity = np.empty((steps, size)), np.empty((steps, size))
+  for i in range(steps):
+    herd.step()
+    heart[i], activity[i] = herd.vital('heart_rate'), herd.activity
+  legacy = np.array([[r['heart_rate'] for r in legacy_generate(size)] for _ in range(steps)], dtype=float)
+
+  expected = np.exp(-STEP_SECONDS / VITALS['heart_rate'][3])
+  coupling = np.mean([np.corrcoef(heart[:, i], activity[:, i])[0, 1] for i in range(size)])
+  print(f"heart rate lag-1 autocorrelation: {lag1(heart):.2f} (OU alone {expected:.2f}, old generator "
+        f"{lag1(legacy):.2f}); correlation with activity {coupling:.2f}")
+  assert lag1(heart) > 0.8 and abs(lag1(legacy)) < 0.1 and coupling > 0.5
+  print("✅ vitals are temporally correlated and track activity")
+
+
+def check_events(size=1000):
+  herd = VitalsHerd(size=size, seed=2)
+  sick = np.arange(1, 101)  # elk_id 1..100: fever; 101..200: dehydration
+  herd.inject('fever', sick, duration=6 * 3600)
+  herd.inject('dehydration', sick + 100, duration=6 * 3600)
+  before = {name: herd.vital(name).copy() for name in VITALS}
+
+  for _ in range(int(4 * 3600 / STEP_SECONDS)):
+    herd.step()
+  fever = herd.vital('body_temperature')[:100].mean() - before['body_temperature'][:100].mean()
+  heart = herd.vital('heart_rate')[:100].mean() - before['heart_rate'][:100].mean()
+  dry = herd.vital('hydration_level')[100:200].mean() - before['hydration_level'][100:200].mean()
+  healthy = herd.vital('body_temperature')[200:].mean() - before['body_temperature'][200:].mean()
+  print(f"after 4 h: fever elk {fever:+.2f} °C, {heart:+.1f} BPM; dehydrated elk {dry:+.1f} % hydration; "
+        f"others {healthy:+.2f} °C")
+  assert fever > 1.5 and heart > 8 and dry < -20 and abs(healthy) < 0.1
+
+  for _ in range(int(8 * 3600 / STEP_SECONDS)):
+    herd.step()
+  recovered = herd.vital('body_temperature')[:100].mean() - before['body_temperature'][:100].mean()
+  assert abs(recovered) < 0.3 and not herd.events, (recovered, herd.events)
+  print(f"✅ injected fever and dehydration show up and wear off ({recovered:+.2f} °C 6 h after the fever)")
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--elk-steps', type=int, default=1_000_000, help='Elk-steps per measurement')
+  args = parser.parse_args()
+
+  check_no_import_side_effects()
+  check_dynamics()
+  check_events()
+
+  print(f"\n{args.elk_steps:,} elk-steps per row")
+  print(f"{'generator':<22}{'herd size':>10}{'steps':>9}{'step only rec/s':>18}{'with dicts rec/s':>18}")
+  legacy_seconds = timed(lambda: legacy_generate(8), args.elk_steps // 8)
+  print(f"{'old random.uniform':<22}{8:>10}{args.elk_steps // 8:>9}{'-':>18}{args.elk_steps / legacy_seconds:>18,.0f}")
+  for size in HERD_SIZES:
+    steps = max(1, args.elk_steps // size)
+    herd = VitalsHerd(size=size, seed=42)
+    step_seconds = timed(herd.step, steps)
+    records_seconds = timed(lambda: (herd.step(), herd.records()), steps)
+    print(f"{'VitalsHerd':<22}{size:>10}{steps:>9}{size * steps / step_seconds:>18,.0f}"
+          f"{size * steps / records_seconds:>18,.0f}")
+
+
+if __name__ == '__main__':
+  main()
@@ -1,6 +1,14 @@
 # app.py
-from flask import Flask, jsonify
+import base64
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from decimal import Decimal
+from flask import Flask, Response, jsonify, request, stream_with_context
 import boto3
+from boto3.dynamodb.conditions import Key
+import geohash
 
 app = Flask(__name__)
 
@@ -8,19 +16,243 @@ app = Flask(__name__)
 dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
 table = dynamodb.Table('GpsDataTable')
 
+DEFAULT_PAGE_SIZE = 500  # Items per page when the caller doesn't pass `limit`
+MAX_PAGE_SIZE = 5000
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'  # Page cursor of the unfiltered (no elk_id) listing
+
+GEO_INDEX = 'GeoIndex'  # GSI on GeoBucket/GeoCell written by GPSTopicProcessor
+BBOX_MAX_CELLS = 32  # Geohash cells a bounding box may be split into
+BBOX_MAX_DAYS = 31  # Longest time range (in daily GeoBuckets) for one bbox request
+BBOX_DEFAULT_LIMIT = 5000
+BBOX_MAX_LIMIT = 50000
+BBOX_WORKERS = 16  # Parallel index queries per request
+
+
+def encode_cursor(last_evaluated_key):
+    """Turn a DynamoDB LastEvaluatedKey into an opaque, URL-safe page cursor."""
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; returns an ExclusiveStartKey or None."""
+    if not cursor:
+        return None
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
+
+def to_json_line(record):
+    """Serialize one item as a newline-delimited JSON line (Decimals become floats)."""
+    return json.dumps(record, default=lambda v: float(v) if isinstance(v, Decimal) else str(v)) + '\n'
+
+
+def build_query(elk_id, start, end, limit, cursor):
+    """Build Query kwargs for one elk's track, optionally bounded by a Timestamp range."""
+    condition = Key('SensorId').eq(str(elk_id))
+    if start and end:
+        condition = condition & Key('Timestamp').between(start, end)
+    elif start:
+        condition = condition & Key('Timestamp').gte(start)
+    elif end:
+        condition = condition & Key('Timestamp').lte(end)
+
+    query = {
+        'KeyConditionExpression': condition,
+        'Limit': limit,
+        'ReturnConsumedCapacity': 'TOTAL',
+    }
+    start_key = decode_cursor(cursor)
+    if start_key:
+        query['ExclusiveStartKey'] = start_key
+    return query
+
+
+def build_scan(limit, cursor):
+    """Build Scan kwargs for one page of the whole table."""
+    scan = {'Limit': limit}
+    start_key = decode_cursor(cursor)
+    if start_key:
+        scan['ExclusiveStartKey'] = start_key
+    return scan
+
+
 # Fetch GPS data from DynamoDB
 @app.route('/gps-data', methods=['GET'])
 def get_gps_data():
+    """
+    Stream one page of an elk's GPS track as newline-delimited JSON.
+
+    Query parameters:
+        elk_id (optional): SensorId of the collar; see below when omitted.
+        start, end (optional): ISO-8601 Timestamp bounds (inclusive).
+        cursor (optional): `next_cursor` from the previous page.
+        limit (optional): page size, default 500, max 5000.
+
+    Every line is a GPS item; the last line is {"next_cursor": ..., "consumed_rcu": ...}
+    where next_cursor is null once the track is exhausted.
+
+    Without elk_id the endpoint keeps its original response: a JSON array of items from
+    the whole table. It is now one Scan page of `limit` items; the cursor for the next
+    page is in the X-Next-Cursor header, which is absent on the last page.
+    """
+    elk_id = request.args.get('elk_id')
+    if elk_id is None:
+        return get_all_gps_data()
+
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        query = build_query(elk_id, request.args.get('start'), request.args.get('end'),
+                            limit, request.args.get('cursor'))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'invalid query parameters: {e}'}), 400
+
+    def generate():
+        try:
+            response = table.query(**query)
+            for item in response['Items']:
+                yield to_json_line(item)
+            yield to_json_line({
+                'next_cursor': encode_cursor(response.get('LastEvaluatedKey')),
+                'consumed_rcu': response.get('ConsumedCapacity', {}).get('CapacityUnits'),
+            })
+        except Exception as e:
+            yield to_json_line({'error': str(e)})
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def get_all_gps_data():
+    """The unfiltered /gps-data listing, one page at a time (see get_gps_data)."""
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        scan = build_scan(limit, request.args.get('cursor'))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'invalid query parameters: {e}'}), 400
+
     try:
-        response = table.scan()  # Fetch all items from the table
-        return jsonify(response['Items'])
+        response = table.scan(**scan)
     except Exception as e:
         return jsonify({'error': str(e)})
+    result = jsonify(response['Items'])
+    cursor = encode_cursor(response.get('LastEvaluatedKey'))
+    if cursor:
+        result.headers[NEXT_CURSOR_HEADER] = cursor
+    return result
+
+
+def bbox_days(start, end):
+    """The YYYY-MM-DD day buckets spanned by two ISO-8601 Timestamps."""
+    first, last = date.fromisoformat(start[:10]), date.fromisoformat(end[:10])
+    if last < first:
+        raise ValueError('end is before start')
+    if (last - first).days >= BBOX_MAX_DAYS:
+        raise ValueError(f'time range is limited to {BBOX_MAX_DAYS} days')
+    return [(first + timedelta(days=n)).isoformat() for n in range((last - first).days + 1)]
+
+
+def query_cell(client, table_name, bucket, prefix, bbox, start, end, limit, stop=None):
+    """
+    Read the fixes in one GeoBucket whose GeoCell starts with `prefix`, following pages.
+
+    The key condition narrows the read to the cell; the filter trims points outside the
+    exact box and time range. Paging ends early once the `stop` event is set. Returns
+    (items, consumed read units, items read before the filter).
+    """
+    min_lat, min_lon, max_lat, max_lon = bbox
+    kwargs = {
+        'TableName': table_name,
+        'IndexName': GEO_INDEX,
+        'KeyConditionExpression': 'GeoBucket = :bucket AND begins_with(GeoCell, :prefix)',
+        'FilterExpression': ('Latitude BETWEEN :min_lat AND :max_lat AND Longitude BETWEEN :min_lon AND :max_lon '
+                             'AND #ts BETWEEN :start AND :end'),
+        'ExpressionAttributeNames': {'#ts': 'Timestamp'},
+        'ExpressionAttributeValues': {
+            ':bucket': bucket, ':prefix': prefix,
+            ':min_lat': Decimal(str(min_lat)), ':max_lat': Decimal(str(max_lat)),
+            ':min_lon': Decimal(str(min_lon)), ':max_lon': Decimal(str(max_lon)),
+            ':start': start, ':end': end,
+        },
+        'ReturnConsumedCapacity': 'TOTAL',
+    }
+    items, consumed, scanned = [], 0.0, 0
+    while len(items) < limit:
+        response = client.query(**kwargs)
+        consumed += response.get('ConsumedCapacity', {}).get('CapacityUnits') or 0.0
+        scanned += response['ScannedCount']
+        items.extend(response['Items'])
+        if 'LastEvaluatedKey' not in response or (stop and stop.is_set()):
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return items, consumed, scanned
+
+
+@app.route('/gps-data/bbox', methods=['GET'])
+def get_gps_data_bbox():
+    """
+    Stream every GPS fix inside a bounding box and time range as newline-delimited JSON.
+
+    Query parameters:
+        min_lat, min_lon, max_lat, max_lon (required): box corners in degrees.
+        start, end (required): ISO-8601 Timestamp bounds (inclusive), at most 31 days apart.
+        limit (optional): maximum fixes returned, default 5000, max 50000.
+
+    The box is covered with at most 32 geohash cells and every (cell, day) pair is read
+    from the GeoIndex GSI in parallel. The last line is {"cells": [...], "queries": n,
+    "scanned": items read, "consumed_rcu": total, "truncated": bool}.
+    """
+    try:
+        bbox = tuple(float(request.args[name]) for name in ('min_lat', 'min_lon', 'max_lat', 'max_lon'))
+        start, end = request.args['start'], request.args['end']
+        limit = min(int(request.args.get('limit', BBOX_DEFAULT_LIMIT)), BBOX_MAX_LIMIT)
+        cells = geohash.cover(*bbox, max_cells=BBOX_MAX_CELLS)
+        days = bbox_days(start, end)
+    except KeyError as e:
+        return jsonify({'error': f'{e.args[0]} is required'}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'invalid query parameters: {e}'}), 400
+
+    # The resource's low-level client (which still converts to/from Python types) is safe to share
+    # across threads, unlike the Table resource itself
+    client, table_name = table.meta.client, table.name
+    tasks = [(geohash.geo_bucket(cell, day), cell) for day in days for cell in cells]
+
+    def generate():
+        returned, consumed, scanned, truncated = 0, 0.0, 0, False
+        stop = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=min(BBOX_WORKERS, len(tasks)))
+        try:
+            futures = [pool.submit(query_cell, client, table_name, bucket, cell, bbox, start, end, limit, stop)
+                       for bucket, cell in tasks]
+            for future in as_completed(futures):
+                items, rcu, read = future.result()
+                consumed += rcu
+                scanned += read
+                for item in items:
+                    if returned >= limit:
+                        truncated = True
+                        break
+                    yield to_json_line(item)
+                    returned += 1
+                if truncated:
+                    break
+            yield to_json_line({'cells': cells, 'queries': len(tasks), 'scanned': scanned,
+                                'consumed_rcu': consumed, 'truncated': truncated})
+        except Exception as e:
+            yield to_json_line({'error': str(e)})
+        finally:
+            # Once the limit is reached (or the client goes away) the remaining cells are not needed:
+            # drop the queued queries and end the running ones after their current page
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 @app.route('/', methods=['GET'])
 def home():
-    return "GPS Data API is running. Use /gps-data to fetch the data."
+    return ("GPS Data API is running. Use /gps-data?elk_id=<id>[&start=&end=&cursor=&limit=] to fetch a track, "
+            "/gps-data[?cursor=&limit=] to page through every fix, or /gps-data/bbox?min_lat=&min_lon=&max_lat=&max_lon=&start=&end= for the fixes in an area.")
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0')
@@ -0,0 +1,86 @@
+"""
+geohash.py
+
+Geohash helpers for the spatial index on GpsDataTable (GSI 'GeoIndex'):
+- GeoCell: full-precision geohash of a fix (index sort key, searched with begins_with)
+- GeoBucket: '<INDEX_PRECISION geohash>#<YYYY-MM-DD>' (index partition key), so one
+  partition holds one ~20 x 25 km area (at these latitudes) for one day
+- cover(): the geohash cells that cover a bounding box, for the bbox query in the backend
+
+This file is kept identical in CDK/lib/lambda and gps-visualization-app/backend.
+"""
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+CELL_PRECISION = 9  # ~5 m cells stored on every fix
+INDEX_PRECISION = 4  # Characters of the geohash in the GeoBucket partition key
+MAX_COVER_PRECISION = 7  # Finest cells a bbox query will search with begins_with (~150 m)
+
+
+def encode(lat, lon, precision=CELL_PRECISION):
+    """Geohash of a point."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a cell at `precision`."""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def geo_bucket(cell, timestamp):
+    """GeoBucket partition key for a fix: index-precision cell plus the day of its ISO Timestamp."""
+    return f"{cell[:INDEX_PRECISION]}#{str(timestamp)[:10]}"
+
+
+def _grid(min_lat, min_lon, max_lat, max_lon, precision):
+    """Row/column index ranges of the cells at `precision` that overlap the box."""
+    height, width = cell_size(precision)
+    rows = range(int((min_lat + 90) // height), int(min((max_lat + 90) // height, 180 / height - 1)) + 1)
+    cols = range(int((min_lon + 180) // width), int(min((max_lon + 180) // width, 360 / width - 1)) + 1)
+    return rows, cols, height, width
+
+
+def cover(min_lat, min_lon, max_lat, max_lon, max_cells=32):
+    """
+    Cover a bounding box with geohash cells.
+
+    Uses the finest precision between INDEX_PRECISION and MAX_COVER_PRECISION whose cover
+    has at most `max_cells` cells, so each begins_with query over-reads as little as possible
+    within the query budget. Raises ValueError if even INDEX_PRECISION needs more cells.
+    Boxes crossing the antimeridian are not supported.
+    """
+    if min_lat > max_lat or min_lon > max_lon:
+        raise ValueError("bounding box min must not exceed max")
+
+    best = None
+    for precision in range(INDEX_PRECISION, MAX_COVER_PRECISION + 1):
+        rows, cols, height, width = _grid(min_lat, min_lon, max_lat, max_lon, precision)
+        if len(rows) * len(cols) > max_cells:
+            break
+        best = (precision, rows, cols, height, width)
+    if best is None:
+        raise ValueError(f"bounding box needs more than {max_cells} geohash cells; narrow it down")
+
+    precision, rows, cols, height, width = best
+    return sorted({
+        encode(-90 + (row + 0.5) * height, -180 + (col + 0.5) * width, precision)
+        for row in rows for col in cols
+    })
@@ -0,0 +1,227 @@
+"""
+bench_gps_bbox.py
+
+Seeds a local DynamoDB stand-in (moto) with GPS fixes carrying the GeoCell/GeoBucket
+attributes GPSTopicProcessor writes, then compares "which animals were in this area"
+answered by a filtered full-table scan with the /gps-data/bbox endpoint (GeoIndex
+queries, run in parallel). Also checks that a request cut off by its limit drops the
+cell queries it no longer needs.
+
+Read units are estimated the way DynamoDB bills eventually consistent reads (0.5 RCU
+per 4 KB of items read before filtering, using the size of a table item and of a
+projected index item), since moto reports a constant ConsumedCapacity.
+
+moto evaluates every index query by walking the whole table, so its latencies only
+mean something for the scan. For latency at millions of rows, run DynamoDB Local
+(docker run -p 8000:8000 amazon/dynamodb-local) and pass --endpoint-url.
+
+Usage:
+    pip install boto3 moto flask
+    python bench_gps_bbox.py [--points 1000000] [--elk 500] [--endpoint-url http://localhost:8000]
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import geohash  # noqa: E402
+
+EPOCH = datetime(2025, 1, 1)
+FIX_SECONDS = 900  # One fix per collar every 15 minutes
+CENTRE = (53.1, -127.5)
+
+# Boxes queried at each table size: (label, half-height in degrees, half-width in degrees)
+BOXES = [('1 km', 0.0045, 0.0075), ('10 km', 0.045, 0.075), ('40 km', 0.18, 0.3)]
+
+
+def create_table(resource):
+    return resource.create_table(
+        TableName='GpsDataTable',
+        KeySchema=[
+            {'AttributeName': 'SensorId', 'KeyType': 'HASH'},
+            {'AttributeName': 'Timestamp', 'KeyType': 'RANGE'},
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'SensorId', 'AttributeType': 'S'},
+            {'AttributeName': 'Timestamp', 'AttributeType': 'S'},
+            {'AttributeName': 'GeoBucket', 'AttributeType': 'S'},
+            {'AttributeName': 'GeoCell', 'AttributeType': 'S'},
+        ],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'GeoIndex',
+            'KeySchema': [
+                {'AttributeName': 'GeoBucket', 'KeyType': 'HASH'},
+                {'AttributeName': 'GeoCell', 'KeyType': 'RANGE'},
+            ],
+            'Projection': {'ProjectionType': 'INCLUDE', 'NonKeyAttributes': ['Latitude', 'Longitude']},
+        }],
+        BillingMode='PAY_PER_REQUEST',
+    )
+
+
+def make_item(elk_id, lat, lon, timestamp):
+    """A GpsDataTable row as GPSTopicProcessor writes it."""
+    lat, lon = round(lat, 6), round(lon, 6)
+    cell = geohash.encode(lat, lon)
+    return {
+        'SensorId': str(elk_id),
+        'Topic': 'IoT/GPS',
+        'Timestamp': timestamp,
+        'Latitude': Decimal(str(lat)),
+        'Longitude': Decimal(str(lon)),
+        'GeoCell': cell,
+        'GeoBucket': geohash.geo_bucket(cell, timestamp),
+    }
+
+
+def seed(table, walkers, start_fix, fixes):
+    """Advance every collar's random walk by `fixes` steps, writing one row per step."""
+    with table.batch_writer() as batch:
+        for fix in range(start_fix, start_fix + fixes):
+            timestamp = (EPOCH + timedelta(seconds=FIX_SECONDS * fix)).isoformat()
+            for elk_id, position in enumerate(walkers):
+                position[0] += random.gauss(0, 0.002)
+                position[1] += random.gauss(0, 0.003)
+                batch.put_item(Item=make_item(elk_id, position[0], position[1], timestamp))
+
+
+def item_bytes(item, attributes=None):
+    """Approximate DynamoDB item size: attribute names plus string/number lengths."""
+    return sum(len(k) + len(str(v)) for k, v in item.items() if attributes is None or k in attributes)
+
+
+def estimated_rcu(items_read, size):
+    return math.ceil(items_read * size / 4096) * 0.5
+
+
+def filtered_scan(table, bbox, start, end):
+    """The pre-index answer: scan everything, filtering on position and time."""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    kwargs = {
+        'FilterExpression': ('Latitude BETWEEN :min_lat AND :max_lat AND Longitude BETWEEN :min_lon AND :max_lon '
+                             'AND #ts BETWEEN :start AND :end'),
+        'ExpressionAttributeNames': {'#ts': 'Timestamp'},
+        'ExpressionAttributeValues': {
+            ':min_lat': Decimal(str(min_lat)), ':max_lat': Decimal(str(max_lat)),
+            ':min_lon': Decimal(str(min_lon)), ':max_lon': Decimal(str(max_lon)),
+            ':start': start, ':end': end,
+        },
+    }
+    found, scanned = 0, 0
+    while True:
+        response = table.scan(**kwargs)
+        found += response['Count']
+        scanned += response['ScannedCount']
+        if 'LastEvaluatedKey' not in response:
+            return found, scanned
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def bbox_request(client, bbox, start, end):
+    """Call /gps-data/bbox and return (items, trailer)."""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    url = (f'/gps-data/bbox?min_lat={min_lat}&min_lon={min_lon}&max_lat={max_lat}&max_lon={max_lon}'
+           f'&start={start}&end={end}&limit=50000')
+    lines = [json.loads(line) for line in client.get(url).get_data(as_text=True).splitlines()]
+    return lines[:-1], lines[-1]
+
+
+def check_truncation(backend, client, bbox, start, end, limit=10, workers=2):
+    """A request that hits `limit` early must not run every queued cell query."""
+    started = []
+    query_cell, max_workers = backend.query_cell, backend.BBOX_WORKERS
+
+    def counted(*args):
+        started.append(args[3])
+        return query_cell(*args)
+
+    backend.query_cell, backend.BBOX_WORKERS = counted, workers  # Few workers, so most queries queue
+    try:
+        min_lat, min_lon, max_lat, max_lon = bbox
+        url = (f'/gps-data/bbox?min_lat={min_lat}&min_lon={min_lon}&max_lat={max_lat}&max_lon={max_lon}'
+               f'&start={start}&end={end}&limit={limit}')
+        lines = [json.loads(line) for line in client.get(url).get_data(as_text=True).splitlines()]
+    finally:
+        backend.query_cell, backend.BBOX_WORKERS = query_cell, max_workers
+    items, trailer = lines[:-1], lines[-1]
+    assert len(items) == limit and trailer['truncated'], trailer
+    assert len(started) < trailer['queries'], (len(started), trailer['queries'])
+    print(f"✅ limit={limit} reached after {len(started)} of {trailer['queries']} cell queries; the rest were cancelled")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=1_000_000, help='Final table size')
+    parser.add_argument('--elk', type=int, default=500, help='Collars the points are spread across')
+    parser.add_argument('--steps', type=int, default=2, help='Measurements taken while the table grows')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--endpoint-url', help='DynamoDB Local endpoint; moto is used when omitted')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with (contextlib.nullcontext() if args.endpoint_url else mock_aws()):
+        resource = boto3.resource('dynamodb', endpoint_url=args.endpoint_url)
+        if args.endpoint_url and 'GpsDataTable' in resource.meta.client.list_tables()['TableNames']:
+            resource.Table('GpsDataTable').delete()
+            resource.meta.client.get_waiter('table_not_exists').wait(TableName='GpsDataTable')
+        table = create_table(resource)
+        table.wait_until_exists()
+        import app as backend
+        backend.table = table
+        client = backend.app.test_client()
+
+        walkers = [[CENTRE[0] + random.gauss(0, 0.1), CENTRE[1] + random.gauss(0, 0.15)] for _ in range(args.elk)]
+        sample = make_item(0, *CENTRE, EPOCH.isoformat())
+        table_item = item_bytes(sample)
+        index_item = item_bytes(sample, {'SensorId', 'Timestamp', 'GeoBucket', 'GeoCell', 'Latitude', 'Longitude'})
+
+        fixes_per_step = max(1, args.points // args.elk // args.steps)
+        print(f"{'rows':>10} {'box':>6} {'found':>7} {'scan ms':>9} {'scan read':>10} {'scan rcu':>9} "
+              f"{'bbox ms':>8} {'cells':>6} {'queries':>8} {'bbox read':>10} {'bbox rcu':>9}")
+        for step in range(args.steps):
+            seed(table, walkers, step * fixes_per_step, fixes_per_step)
+            rows = (step + 1) * fixes_per_step * args.elk
+            last_fix = (step + 1) * fixes_per_step - 1
+            # Ask for the last day of data so the time range stays the same size as the table grows
+            end = (EPOCH + timedelta(seconds=FIX_SECONDS * last_fix)).isoformat()
+            start = (EPOCH + timedelta(seconds=FIX_SECONDS * last_fix) - timedelta(days=1)).isoformat()
+
+            for label, half_lat, half_lon in BOXES:
+                bbox = (CENTRE[0] - half_lat, CENTRE[1] - half_lon, CENTRE[0] + half_lat, CENTRE[1] + half_lon)
+
+                started = time.perf_counter()
+                found, scanned = filtered_scan(table, bbox, start, end)
+                scan_ms = (time.perf_counter() - started) * 1000
+
+                started = time.perf_counter()
+                items, trailer = bbox_request(client, bbox, start, end)
+                bbox_ms = (time.perf_counter() - started) * 1000
+                assert 'error' not in trailer, trailer
+                assert len(items) == found, (len(items), found)
+
+                print(f"{rows:>10,} {label:>6} {found:>7,} {scan_ms:>9.0f} {scanned:>10,} "
+                      f"{estimated_rcu(scanned, table_item):>9,.1f} {bbox_ms:>8.0f} {len(trailer['cells']):>6} "
+                      f"{trailer['queries']:>8} {trailer['scanned']:>10,} "
+                      f"{estimated_rcu(trailer['scanned'], index_item):>9,.1f}")
+
+        check_truncation(backend, client, bbox, start, end)
+
+
+if __name__ == '__main__':
+    main()
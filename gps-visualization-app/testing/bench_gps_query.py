@@ -0,0 +1,129 @@
+"""
+bench_gps_query.py
+
+Seeds a local DynamoDB stand-in (moto) with GPS points in growing steps and, at
+each size, compares the old full-table scan with one page of the Query-based
+/gps-data endpoint. Latency and items read (ScannedCount, which drives consumed
+read capacity) should stay flat for the Query path as the table grows. Also checks that
+/gps-data without elk_id still returns the whole table as JSON arrays, page by page.
+
+Usage:
+    pip install boto3 moto flask
+    python bench_gps_query.py [--points 1000000] [--elk 1000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+
+def create_table(resource):
+    return resource.create_table(
+        TableName='GpsDataTable',
+        KeySchema=[
+            {'AttributeName': 'SensorId', 'KeyType': 'HASH'},
+            {'AttributeName': 'Timestamp', 'KeyType': 'RANGE'},
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'SensorId', 'AttributeType': 'S'},
+            {'AttributeName': 'Timestamp', 'AttributeType': 'S'},
+        ],
+        BillingMode='PAY_PER_REQUEST',
+    )
+
+
+def seed(table, start_index, count, num_elk, epoch):
+    """Write points [start_index, start_index + count) round-robin across `num_elk` collars."""
+    with table.batch_writer() as batch:
+        for i in range(start_index, start_index + count):
+            batch.put_item(Item={
+                'SensorId': str(i % num_elk),
+                'Topic': 'IoT/GPS',
+                'Timestamp': (epoch + timedelta(seconds=15 * (i // num_elk))).isoformat(),
+                'Latitude': Decimal('53.0') + Decimal(i % 1000) / 100000,
+                'Longitude': Decimal('-127.0') - Decimal(i % 777) / 100000,
+            })
+
+
+def full_scan(table):
+    """The pre-change behaviour, but following LastEvaluatedKey to read everything."""
+    scanned, kwargs = 0, {'ReturnConsumedCapacity': 'TOTAL'}
+    while True:
+        response = table.scan(**kwargs)
+        scanned += response['ScannedCount']
+        if 'LastEvaluatedKey' not in response:
+            return scanned
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def query_page(client, elk_id):
+    """Fetch one page from /gps-data and return (items, trailer line)."""
+    body = client.get(f'/gps-data?elk_id={elk_id}&limit=500').get_data(as_text=True)
+    lines = [json.loads(line) for line in body.splitlines()]
+    return lines[:-1], lines[-1]
+
+
+def unfiltered_pages(client, limit=5000):
+    """Follow the X-Next-Cursor header of the unfiltered /gps-data listing; return (items, pages)."""
+    items, pages, cursor = 0, 0, ''
+    while cursor is not None:
+        response = client.get(f'/gps-data?limit={limit}&cursor={cursor}')
+        page = response.get_json()
+        assert isinstance(page, list), page
+        items, pages = items + len(page), pages + 1
+        cursor = response.headers.get('X-Next-Cursor')
+    return items, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=1_000_000, help='Final table size')
+    parser.add_argument('--elk', type=int, default=1000, help='Number of collars the points are spread across')
+    parser.add_argument('--steps', type=int, default=4, help='Measurements taken while the table grows')
+    args = parser.parse_args()
+
+    with mock_aws():
+        resource = boto3.resource('dynamodb')
+        table = create_table(resource)
+        import app as backend
+        backend.table = table
+        client = backend.app.test_client()
+
+        epoch = datetime(2025, 1, 1)
+        step = args.points // args.steps
+        print(f"{'table rows':>10} {'scan ms':>10} {'scan read':>10} {'query ms':>9} {'query read':>11} {'rcu':>6}")
+        for n in range(1, args.steps + 1):
+            seed(table, (n - 1) * step, step, args.elk, epoch)
+
+            started = time.perf_counter()
+            scanned = full_scan(table)
+            scan_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            items, trailer = query_page(client, elk_id=7)
+            query_ms = (time.perf_counter() - started) * 1000
+
+            print(f"{n * step:>10,} {scan_ms:>10.0f} {scanned:>10,} {query_ms:>9.1f} {len(items):>11,} "
+                  f"{trailer.get('consumed_rcu')!s:>6}")
+
+            if n == 1:
+                listed, pages = unfiltered_pages(client)
+                assert listed == step, (listed, step)
+                print(f"{'':>10} unfiltered /gps-data: {listed:,} items in {pages} pages")
+
+
+if __name__ == '__main__':
+    main()